@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import os
 import subprocess
 import sys
@@ -35,6 +36,7 @@ _add_path(_reactive)
 import charms_openstack.charm as charm
 import charmhelpers.core as ch_core
 import charms_openstack.bus
+import charm.openstack.mysql_router as mysql_router
 charms_openstack.bus.discover()
 
 
@@ -113,11 +115,74 @@ def restart_mysqlrouter(args):
             ch_core.hookenv.action_fail("Retart MySQLRouter failed.")
 
 
+def perf_report(args):
+    """Report the recorded charm phase timings and restarts.
+
+    :param args: sys.argv
+    :type args: sys.argv
+    :side effect: Calls mysql_router.perf_report
+    :returns: This function is called for its side effect
+    :rtype: None
+    :action return: JSON encoded count, p50, p95 and max duration in seconds
+                    per phase and the restarts by reason
+    """
+    report = mysql_router.perf_report()
+    ch_core.hookenv.action_set({
+        "report": json.dumps(report, sort_keys=True),
+        "outcome": "Success"})
+
+
+def benchmark_router(args):
+    """Benchmark connections and queries through the router.
+
+    :param args: sys.argv
+    :type args: sys.argv
+    :side effect: Calls instance.benchmark_router
+    :returns: This function is called for its side effect
+    :rtype: None
+    :action return: JSON encoded latency percentiles and connections per
+                    second per endpoint
+    """
+    # Unlike hooks, actions do not run the atstart callbacks of reactive,
+    # which load the relation endpoints holding the db-router credentials.
+    ch_core.hookenv._run_atstart()
+    with charm.provide_charm_instance() as instance:
+        try:
+            targets = instance.benchmark_targets(
+                address=ch_core.hookenv.action_get("address") or None,
+                rw_port=ch_core.hookenv.action_get("rw-port") or None,
+                ro_port=ch_core.hookenv.action_get("ro-port") or None,
+                sockets=ch_core.hookenv.action_get("sockets"),
+                direct=ch_core.hookenv.action_get("direct"),
+                direct_address=(
+                    ch_core.hookenv.action_get("direct-address") or None),
+                direct_port=ch_core.hookenv.action_get("direct-port"))
+            results = instance.benchmark_router(
+                targets,
+                iterations=ch_core.hookenv.action_get("iterations"),
+                concurrency=ch_core.hookenv.action_get("concurrency"),
+                time_limit=ch_core.hookenv.action_get("time-limit"))
+        except ValueError as e:
+            ch_core.hookenv.action_fail(str(e))
+            return
+        except Exception as e:
+            ch_core.hookenv.action_set({
+                "traceback": traceback.format_exc()})
+            ch_core.hookenv.action_fail(
+                "Benchmark router failed: {}".format(e))
+            return
+        ch_core.hookenv.action_set({
+            "results": json.dumps(results, sort_keys=True),
+            "outcome": "Success"})
+
+
 # A dictionary of all the defined actions to callables (which take
 # parsed arguments).
 ACTIONS = {"stop-mysqlrouter": stop_mysqlrouter,
            "start-mysqlrouter": start_mysqlrouter,
-           "restart-mysqlrouter": restart_mysqlrouter}
+           "restart-mysqlrouter": restart_mysqlrouter,
+           "perf-report": perf_report,
+           "benchmark-router": benchmark_router}
 
 
 def main(args):
@@ -129,13 +194,22 @@ def main(args):
     else:
         try:
             action(args)
-        except Exception as e:
+        except subprocess.CalledProcessError as e:
             ch_core.hookenv.action_set({
                 "output": e.output.decode("UTF-8"),
                 "return-code": e.returncode,
                 "traceback": traceback.format_exc()})
             ch_core.hookenv.action_fail(
                 "{} action failed.".format(action_name))
+        except Exception:
+            ch_core.hookenv.action_set({
+                "traceback": traceback.format_exc()})
+            ch_core.hookenv.action_fail(
+                "{} action failed.".format(action_name))
+        finally:
+            # Unlike hooks, actions do not flush unitdata on exit, persist
+            # the recorded timings and restarts.
+            ch_core.unitdata.kv().flush()
 
 
 if __name__ == "__main__":
@@ -13,12 +13,20 @@
 # limitations under the License.
 
 import configparser
+import contextlib
+import copy
+import functools
+import hashlib
+import io
+import ipaddress
 import json
+import math
 import os
 import re
 import shutil
 import subprocess
 import tenacity
+import time
 
 import charms_openstack.charm
 import charms_openstack.adapters
@@ -32,11 +40,15 @@ import charmhelpers.contrib.database.mysql as mysql
 
 import charmhelpers.contrib.openstack.templating as os_templating
 
+import charm.openstack.router_benchmark as router_benchmark
+import charm.openstack.router_probe as router_probe
+
 
 # Flag Strings
 MYSQL_ROUTER_BOOTSTRAPPED = "charm.mysqlrouter.bootstrapped"
 MYSQL_ROUTER_BOOTSTRAP_ATTEMPTED = "charm.mysqlrouter.bootstrap-attempted"
 MYSQL_ROUTER_STARTED = "charm.mysqlrouter.started"
+MYSQL_ROUTER_RESTART_REQUIRED = "charm.mysqlrouter.restart-required"
 DB_ROUTER_AVAILABLE = "db-router.available"
 DB_ROUTER_PROXY_AVAILABLE = "db-router.available.proxy"
 
@@ -44,12 +56,167 @@ DB_ROUTER_PROXY_AVAILABLE = "db-router.available.proxy"
 # Note, mysql object names can contain alphanumeric and $ characters.
 DEFAULT_SECTION = 'DEFAULT'
 LOGGING_SECTION = 'logger'
+CONNECTION_POOL_SECTION = 'connection_pool'
+IO_SECTION = 'io'
 METADATA_CACHE_SECTION = r'metadata_cache:[\w$]+$'
 ROUTING_RW_SECTION = r'routing:[\w$]+_rw(?<!_x_rw)$'
 ROUTING_RO_SECTION = r'routing:[\w$]+_ro(?<!_x_ro)$'
 ROUTING_X_RO_SECTION = r'routing:[\w$]+_x_ro$'
 ROUTING_X_RW_SECTION = r'routing:[\w$]+_x_rw$'
 
+# Unitdata key of the fingerprints of the last forwarded shared-db requests
+SHARED_DB_REQUESTS_KEY = "charm.mysqlrouter.shared-db.requests"
+
+# Unitdata key of the fingerprints of the last published shared-db responses
+SHARED_DB_PUBLISHED_KEY = "charm.mysqlrouter.shared-db.published"
+
+# Unitdata key of the time of the last successful authenticated health check
+LAST_AUTH_CHECK_KEY = "charm.mysqlrouter.last-auth-check"
+
+# Actions needed for a running mysqlrouter to pick up a changed parameter,
+# ordered from the cheapest to the most expensive.
+CHANGE_NONE = "none"
+CHANGE_RESTART = "restart"
+CHANGE_ACTIONS = (CHANGE_NONE, CHANGE_RESTART)
+
+# Unitdata key of the last action taken for a configuration change
+CONFIG_CHANGE_ACTION_KEY = "charm.mysqlrouter.last-config-action"
+
+# Unitdata keys of the ring buffers of timing spans and restart events
+PERF_SPANS_KEY = "charm.mysqlrouter.perf.spans"
+PERF_RESTARTS_KEY = "charm.mysqlrouter.perf.restarts"
+
+# Number of entries kept in each ring buffer
+PERF_HISTORY_LENGTH = 200
+
+# Managed parameters, keyed on (heading, parameter), which do not require a
+# restart. Anything not listed requires a restart. mysqlrouter does not
+# re-read mysqlrouter.conf at runtime, SIGHUP only re-opens the log files,
+# so there is no reload action and [logger] level requires a restart too.
+PARAMETER_CHANGE_ACTIONS = {
+    # Only consulted while parsing the configuration at start up
+    (DEFAULT_SECTION, "unknown_config_option"): CHANGE_NONE,
+}
+
+# Precompiled section search keys
+SECTION_PATTERNS = {
+    heading: re.compile(heading)
+    for heading in (METADATA_CACHE_SECTION,
+                    ROUTING_RW_SECTION,
+                    ROUTING_RO_SECTION,
+                    ROUTING_X_RO_SECTION,
+                    ROUTING_X_RW_SECTION)}
+
+# routing_strategy values accepted by mysqlrouter for the read-write routes,
+# which have a single destination, and for the read-only routes
+RW_ROUTING_STRATEGIES = ("first-available", "round-robin")
+RO_ROUTING_STRATEGIES = ("first-available", "round-robin",
+                         "round-robin-with-fallback")
+
+# Managed routing parameters, with the charm option of the same name, and
+# their valid ranges
+ROUTING_PARAMETER_LIMITS = {
+    "connect_timeout": (1, 65535),
+    "client_connect_timeout": (2, 31536000),
+    "max_connect_errors": (1, 4294967295),
+}
+
+# The dpkg status database changes whenever a package is (re)installed so its
+# mtime is used to detect a change of the installed mysql-router revision.
+DPKG_STATUS = "/var/lib/dpkg/status"
+
+# Unitdata key of the persisted mysql-router capabilities
+ROUTER_CAPABILITIES_KEY = "charm.mysqlrouter.capabilities"
+
+# mysql-router features and the package revision which introduced them
+ROUTER_CAPABILITIES = {
+    # Avoid multiple routers trying to bind to the same api port
+    # Bug #1911907
+    "supports_disable_rest": "8.0.22",
+    "supports_gr_notifications": "8.0.17",
+    "supports_client_ssl_mode": "8.0.23",
+    "supports_max_total_connections": "8.0.27",
+    "supports_connection_pool": "8.0.29",
+    "supports_connection_sharing": "8.3.0",
+    "supports_io_threads": "8.0.22",
+}
+
+# cgroup v2 and v1 CPU bandwidth limits
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_CPU_CFS_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_CPU_CFS_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+# Upper bound of [io] threads accepted by mysqlrouter
+MAX_IO_THREADS = 1024
+
+# Open file limit of the mysqlrouter service. Each routed connection uses a
+# client and a server descriptor, the overhead covers the listeners, unix
+# sockets, metadata cache connections and log files.
+MIN_NOFILE_LIMIT = 65535
+NOFILE_OVERHEAD = 1024
+# Kernel upper bound of a process' open file limit
+NR_OPEN = "/proc/sys/fs/nr_open"
+# Routes created by bootstrap: classic and X protocol, read-write and
+# read-only
+BOOTSTRAP_ROUTES = 4
+
+# Change entry of a changed mysqlrouter systemd unit, see
+# apply_config_changes
+SYSTEMD_UNIT_CHANGE = ("systemd", "service")
+
+# Unitdata key of the managed properties of the mysqlrouter systemd unit
+SYSTEMD_UNIT_KEY = "charm.mysqlrouter.systemd-unit"
+
+# Ports of a router instance: RW, RO, X RW and X RO from its base port. The
+# base port of instance N is base-port + N * ROUTER_PORT_STRIDE.
+ROUTER_PORT_STRIDE = 4
+
+# Unitdata key of the number of router instances last configured
+ROUTER_INSTANCES_KEY = "charm.mysqlrouter.instances"
+
+# Sections of the router REST API managed by the charm, see rest-api-port.
+# The API is bound to localhost and only the users of the instance's
+# mysqlrouter_passwd file can authenticate through the charm's realm.
+REST_API_REALM = "charm"
+REST_API_BACKEND_SECTION = "http_auth_backend:{}".format(REST_API_REALM)
+REST_API_REALM_SECTION = "http_auth_realm:{}".format(REST_API_REALM)
+REST_API_SECTIONS = (
+    "http_server",
+    REST_API_BACKEND_SECTION,
+    REST_API_REALM_SECTION,
+    "rest_api",
+    "rest_router",
+    "rest_routing",
+    "rest_metadata_cache",
+)
+
+# REST API user of the exporter, see metrics-port
+REST_API_USER = "exporter"
+
+# Charm options of the resource controls of the mysqlrouter service, the
+# systemd directives they set and their valid values. numa-node binds the
+# memory allocations of the router to the given NUMA nodes.
+CPU_LIST_PATTERN = r"\d+(-\d+)?([ ,]\d+(-\d+)?)*$"
+MEMORY_PATTERN = r"(\d+[KMGT]?|(100|[1-9]?\d)%|infinity)$"
+SYSTEMD_RESOURCE_OPTIONS = {
+    "cpu-affinity": ("CPUAffinity", re.compile(CPU_LIST_PATTERN)),
+    "cpu-weight": ("CPUWeight", re.compile(r"([1-9]\d{0,3}|10000)$")),
+    "cpu-quota": ("CPUQuota", re.compile(r"[1-9]\d*%$")),
+    "memory-high": ("MemoryHigh", re.compile(MEMORY_PATTERN)),
+    "memory-max": ("MemoryMax", re.compile(MEMORY_PATTERN)),
+    "numa-node": ("NUMAMask", re.compile(CPU_LIST_PATTERN)),
+}
+
+# cgroup resource controls which systemd applies to a running service, and
+# the values resetting them. Changes of any other property of the unit
+# require a restart.
+RUNTIME_SYSTEMD_PROPERTIES = {
+    "CPUWeight": "100",
+    "CPUQuota": "",
+    "MemoryHigh": "infinity",
+    "MemoryMax": "infinity",
+}
+
 
 @charms_openstack.adapters.config_property
 def db_router_address(cls):
@@ -64,6 +231,483 @@ def shared_db_address(cls):
     return "127.0.0.1"
 
 
+def write_file_atomic(path, content):
+    """Atomically replace the contents of a file.
+
+    The content is written to a temporary file in the same directory, synced
+    to disk and renamed over the target so that readers only ever see either
+    the old or the new file. Ownership and mode of an existing file are
+    preserved.
+
+    :param path: Path of the file to write
+    :type path: str
+    :param content: New content of the file
+    :type content: str
+    :side effect: Writes and renames files
+    :returns: This function is called for its side effect
+    :rtype: None
+    """
+    tmp_path = "{}.tmp".format(path)
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            st = os.stat(path)
+            os.chown(tmp_path, st.st_uid, st.st_gid)
+            os.chmod(tmp_path, st.st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.rename(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself
+    dir_fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def fingerprint(data):
+    """Fingerprint JSON serialisable data.
+
+    Fingerprints are persisted instead of the data itself so that secrets
+    such as passwords are not written to unitdata.
+
+    :param data: Data to fingerprint
+    :type data: Any
+    :returns: Hex digest
+    :rtype: str
+    """
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, default=str).encode("UTF-8")
+    ).hexdigest()
+
+
+class SectionIndex(object):
+    """Map section headings to the concrete sections of a configuration.
+
+    Headings may be regular expressions, see update_config_parameters, and
+    are resolved to the first matching section. Results are cached until the
+    index is invalidated.
+    """
+
+    def __init__(self, config):
+        """Initialise the index.
+
+        :param config: Configuration to index
+        :type config: configparser.ConfigParser
+        """
+        self.config = config
+        self._index = {}
+
+    def resolve(self, heading):
+        """Resolve a heading to a section name.
+
+        :param heading: Section name or regular expression
+        :type heading: str
+        :returns: Name of the first matching section or the heading itself
+        :rtype: str
+        """
+        try:
+            return self._index[heading]
+        except KeyError:
+            pass
+
+        pattern = SECTION_PATTERNS.get(heading) or re.compile(heading)
+        for section in self.config.sections():
+            if pattern.match(section):
+                translated = section
+                break
+        else:
+            translated = heading
+        self._index[heading] = translated
+        return translated
+
+    def invalidate(self):
+        """Drop all resolved headings, e.g. after adding a section."""
+        self._index.clear()
+
+
+class RouterConfig(object):
+    """In-memory model of a mysqlrouter.conf file."""
+
+    def __init__(self, path, stamp):
+        """Load the configuration file.
+
+        :param path: Path to the mysqlrouter.conf file
+        :type path: str
+        :param stamp: Modification stamp of the file when it was read
+        :type stamp: Union[Tuple[int, int], None]
+        """
+        self.path = path
+        self.stamp = stamp
+        self.parser = configparser.ConfigParser()
+        self.parser.read(path)
+        self.sections = SectionIndex(self.parser)
+
+    def has_parameter(self, heading, parameter):
+        """Check whether the configuration sets a parameter.
+
+        :param heading: Section name or search key, see SectionIndex
+        :type heading: str
+        :param parameter: Parameter name
+        :type parameter: str
+        :returns: True if the parameter is set in the matching section
+        :rtype: bool
+        """
+        try:
+            section = self.parser[self.sections.resolve(heading)]
+        except KeyError:
+            return False
+        return parameter in section
+
+
+class RouterNotReadyError(Exception):
+    """Raised when mysqlrouter does not accept connections after a restart."""
+
+
+def stop_at_deadline(retry_state):
+    """Tenacity stop condition for the deadline argument of the call.
+
+    :param retry_state: State of the retried call
+    :type retry_state: tenacity.RetryCallState
+    :returns: True once the monotonic deadline keyword argument has passed
+    :rtype: bool
+    """
+    deadline = retry_state.kwargs.get("deadline")
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def wait_until_deadline(wait):
+    """Cap a tenacity wait strategy at the deadline argument of the call.
+
+    :param wait: Tenacity wait strategy
+    :type wait: Callable
+    :returns: Wait strategy that never sleeps past the deadline
+    :rtype: Callable
+    """
+    def _wait(retry_state):
+        delay = wait(retry_state)
+        deadline = retry_state.kwargs.get("deadline")
+        if deadline is None:
+            return delay
+        return max(0, min(delay, deadline - time.monotonic()))
+    return _wait
+
+
+def router_endpoint_ready(address, port=None, timeout=1.0):
+    """Check whether mysqlrouter accepts connections on an endpoint.
+
+    :param address: IP address, or path of a unix socket if port is None
+    :type address: str
+    :param port: TCP port
+    :type port: Union[int, None]
+    :param timeout: Connect timeout in seconds
+    :type timeout: float
+    :returns: True if a connection could be established
+    :rtype: bool
+    """
+    try:
+        router_probe.open_connection(address, port, timeout).close()
+    except OSError:
+        return False
+    return True
+
+
+def classify_config_changes(changes):
+    """Determine the cheapest action that applies all changes.
+
+    :param changes: Changed parameters as (heading, parameter) tuples
+    :type changes: Iterable[Tuple[str, str]]
+    :returns: One of CHANGE_ACTIONS
+    :rtype: str
+    """
+    action = CHANGE_NONE
+    for change in changes:
+        required = PARAMETER_CHANGE_ACTIONS.get(change, CHANGE_RESTART)
+        if CHANGE_ACTIONS.index(required) > CHANGE_ACTIONS.index(action):
+            action = required
+    return action
+
+
+def cgroup_cpu_quota():
+    """Determine the CPU bandwidth limit of this unit's cgroup.
+
+    :returns: Limit in CPUs or None if unlimited or unknown
+    :rtype: Union[float, None]
+    """
+    try:
+        with open(CGROUP_CPU_MAX) as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open(CGROUP_CPU_CFS_QUOTA) as f:
+                quota = f.read().strip()
+            with open(CGROUP_CPU_CFS_PERIOD) as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    try:
+        quota, period = int(quota), int(period)
+    except ValueError:
+        # "max" quota
+        return None
+    if quota <= 0 or period <= 0:
+        return None
+    return quota / period
+
+
+def available_cpus():
+    """Determine the number of CPUs available to this unit.
+
+    Honours the CPU affinity of the charm process and the CPU bandwidth limit
+    of its cgroup, e.g. of a LXD container, which mysqlrouter is subject to
+    as well.
+
+    :returns: Number of CPUs
+    :rtype: int
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count()
+    cpus = max(1, cpus or 1)
+    quota = cgroup_cpu_quota()
+    if quota:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def cpu_list_count(value):
+    """Count the CPUs of a systemd CPU list, e.g. "0-3 8" lists 5 CPUs.
+
+    :param value: CPU list matching CPU_LIST_PATTERN
+    :type value: str
+    :returns: Number of distinct CPUs
+    :rtype: int
+    """
+    cpus = set()
+    for item in re.split(r"[ ,]+", value.strip()):
+        first, _, last = item.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return len(cpus)
+
+
+def kernel_nr_open():
+    """Determine the kernel's upper bound of the open file limit.
+
+    :returns: fs.nr_open or None if unknown
+    :rtype: Union[int, None]
+    """
+    try:
+        with open(NR_OPEN) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def file_stamp(path):
+    """Determine the modification stamp of a file.
+
+    :param path: Path to the file
+    :type path: str
+    :returns: Tuple of mtime in ns and size, or None if the file is missing
+    :rtype: Union[Tuple[int, int], None]
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _append_bounded(key, entry, length=PERF_HISTORY_LENGTH):
+    """Append an entry to a ring buffer persisted in unitdata.
+
+    :param key: Unitdata key of the ring buffer
+    :type key: str
+    :param entry: Entry to append
+    :type entry: dict
+    :param length: Maximum number of entries kept
+    :type length: int
+    :returns: This function is called for its side effect
+    :rtype: None
+    """
+    kv = ch_core.unitdata.kv()
+    entries = kv.get(key)
+    if not isinstance(entries, list):
+        entries = []
+    entries.append(entry)
+    kv.set(key, entries[-length:])
+
+
+@contextlib.contextmanager
+def timing_span(phase):
+    """Time a phase of the charm and record it in unitdata.
+
+    The span is recorded whether or not the phase raises, ok records which.
+
+    :param phase: Name of the phase
+    :type phase: str
+    :returns: Context manager
+    :rtype: contextlib.contextmanager
+    """
+    started = time.time()
+    start = time.monotonic()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        _append_bounded(PERF_SPANS_KEY, {
+            "phase": phase,
+            "start": round(started, 3),
+            "duration": round(time.monotonic() - start, 6),
+            "ok": ok})
+
+
+def timed(phase):
+    """Decorate a function to record a timing span for each call.
+
+    :param phase: Name of the phase
+    :type phase: str
+    :returns: Decorator
+    :rtype: Callable
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with timing_span(phase):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_restart_event(service, reason):
+    """Record a restart of a service and what triggered it in unitdata.
+
+    :param service: Name of the restarted service
+    :type service: str
+    :param reason: What triggered the restart
+    :type reason: str
+    :returns: This function is called for its side effect
+    :rtype: None
+    """
+    ch_core.hookenv.log(
+        "Restarting {}: {}".format(service, reason), "DEBUG")
+    _append_bounded(PERF_RESTARTS_KEY, {
+        "time": round(time.time(), 3),
+        "service": service,
+        "reason": reason})
+
+
+def perf_report():
+    """Summarise the recorded timing spans and restart events.
+
+    :returns: Count, p50, p95 and max duration in seconds per phase and the
+              restart count per reason with the most recent restarts
+    :rtype: dict
+    """
+    kv = ch_core.unitdata.kv()
+    spans = kv.get(PERF_SPANS_KEY) or []
+    restarts = kv.get(PERF_RESTARTS_KEY) or []
+
+    durations = {}
+    failures = {}
+    for span in spans:
+        durations.setdefault(span["phase"], []).append(span["duration"])
+        if not span.get("ok", True):
+            failures[span["phase"]] = failures.get(span["phase"], 0) + 1
+    phases = {
+        phase: {
+            "count": len(values),
+            "failed": failures.get(phase, 0),
+            "p50": router_benchmark.percentile(values, 50),
+            "p95": router_benchmark.percentile(values, 95),
+            "max": max(values),
+        } for phase, values in durations.items()}
+
+    reasons = {}
+    for restart in restarts:
+        reasons[restart["reason"]] = reasons.get(restart["reason"], 0) + 1
+    return {
+        "phases": phases,
+        "restarts": {
+            "count": len(restarts),
+            "reasons": reasons,
+            "recent": restarts[-10:],
+        },
+    }
+
+
+class DBRouterSnapshot(object):
+    """Decoded view of the db-router relation data.
+
+    Each value is read from the endpoint and JSON decoded at most once for
+    the lifetime of the snapshot.
+    """
+
+    def __init__(self, endpoint, prefix):
+        """Initialise the snapshot.
+
+        :param endpoint: DB-Router interface
+        :type endpoint: MySQLRouterRequires object
+        :param prefix: Prefix used on the db-router relation
+        :type prefix: str
+        """
+        self.endpoint = endpoint
+        self.prefix = prefix
+        self._values = {}
+
+    def _decode(self, key, getter):
+        if key not in self._values:
+            self._values[key] = getter()
+        return self._values[key]
+
+    @property
+    def password(self):
+        """Password for the MySQL InnoDB Cluster.
+
+        :returns: Password
+        :rtype: str
+        """
+        return self._decode(
+            "password",
+            lambda: json.loads(self.endpoint.password(prefix=self.prefix)))
+
+    @property
+    def cluster_address(self):
+        """Address of the MySQL InnoDB Cluster.
+
+        :returns: Address
+        :rtype: str
+        """
+        return self._decode(
+            "cluster_address",
+            lambda: json.loads(self.endpoint.db_host()))
+
+    @property
+    def ssl_ca(self):
+        """SSL Certificate Authority of the MySQL InnoDB Cluster.
+
+        :returns: SSL CA or None
+        :rtype: Union[str, None]
+        """
+        def _get():
+            if self.endpoint:
+                if self.endpoint.ssl_ca():
+                    return json.loads(self.endpoint.ssl_ca())
+        return self._decode("ssl_ca", _get)
+
+
 class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
     """Charm class for the MySQLRouter charm."""
     name = ch_core.hookenv.service_name()
@@ -73,6 +717,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
     required_relations = ["db-router", "shared-db"]
     source_config_key = "source"
     mysql_connect_timeout = 30
+    handshake_probe_timeout = 5
 
     systemd_file = os.path.join(
         "/etc/systemd/system",
@@ -83,10 +728,16 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         "{}".format(name)
     )
 
-    services = [name]
-    restart_map = {
-        "/var/lib/mysql/{}/mysqlrouter.conf".format(name): services
-    }
+    monitor_service = "{}-monitor".format(name)
+    monitor_systemd_file = os.path.join(
+        "/etc/systemd/system",
+        "{}.service".format(monitor_service))
+
+    exporter_service = "{}-exporter".format(name)
+    exporter_systemd_file = os.path.join(
+        "/etc/systemd/system",
+        "{}.service".format(exporter_service))
+
     # TODO Pick group owner
     group = "mysql"
 
@@ -101,16 +752,124 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
     # LP Bug #1973177
     _cannot_connect_via_ip = 2003
 
+    # Hook scoped cache of the db-router relation data
+    _db_router_snapshot = None
+    _db_router_snapshot_hits = 0
+    _db_router_snapshot_misses = 0
+
+    # Configuration model of mysqlrouter.conf, invalidated by mtime
+    _router_config = None
+
+    # What triggered restarts by custom_restart_function, see
+    # record_restart_event
+    restart_reason = "restart_on_change"
+
+    # Index of the router instance, see router_instance
+    instance_index = 0
+
+    @property
+    def router_instance_count(self):
+        """Determine the number of router instances from router-instances.
+
+        :returns: Number of instances
+        :rtype: int
+        """
+        return max(1, int(self.options.router_instances))
+
+    def router_instance(self, index):
+        """Get a view of a router instance.
+
+        Instance 0 is this object, with the name, working directory and
+        systemd unit of a unit running a single router. Instance N is a copy
+        named <name>-N, with its own working directory and systemd unit, and
+        ports from base-port + N * ROUTER_PORT_STRIDE.
+
+        :param index: Index of the instance
+        :type index: int
+        :returns: The router instance
+        :rtype: MySQLRouterCharm
+        """
+        if not index:
+            return self
+        router = copy.copy(self)
+        router.instance_index = index
+        router.name = "{}-{}".format(self.name, index)
+        router.systemd_file = os.path.join(
+            "/etc/systemd/system", "{}.service".format(router.name))
+        router._router_config = None
+        return router
+
+    @property
+    def router_instances(self):
+        """Get the configured router instances, see router_instance.
+
+        :returns: The instances, or only itself for an instance N > 0
+        :rtype: List[MySQLRouterCharm]
+        """
+        if self.instance_index:
+            return [self]
+        return [self.router_instance(index)
+                for index in range(self.router_instance_count)]
+
+    @property
+    def services(self):
+        """Get the systemd services of the router instances."""
+        return [router.name for router in self.router_instances]
+
+    @property
+    def restart_map(self):
+        """Map the mysqlrouter.conf of each router instance to its service."""
+        return {router.mysqlrouter_conf: [router.name]
+                for router in self.router_instances}
+
+    @property
+    def router_started(self):
+        """Determine whether the charm has started this router instance.
+
+        :returns: Whether the router instance was started
+        :rtype: bool
+        """
+        if self.instance_index:
+            return os.path.exists(self.mysqlrouter_conf)
+        return reactive.flags.is_flag_set(MYSQL_ROUTER_STARTED)
+
+    def unitdata_key(self, key):
+        """Determine the unitdata key of a router instance's state.
+
+        :param key: Unitdata key of instance 0
+        :type key: str
+        :returns: Unitdata key
+        :rtype: str
+        """
+        if self.instance_index:
+            return "{}.{}".format(key, self.instance_index)
+        return key
+
+    @property
+    def mysqlrouter_runtime_directory(self):
+        """Determine the systemd RuntimeDirectory of this instance.
+
+        Every instance has its own, systemd removes it when the service
+        stops.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Directory name relative to /run
+        :rtype: str
+        """
+        return "mysqlrouter-{}".format(self.name)
+
     @property
     def mysqlrouter_pid_file(self):
         """Determine the path for the mysqlrouter PID file.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
-        :returns: Path to the PID file in /run
+        :returns: Path to the PID file in the runtime directory
         :rtype: str
         """
-        return "/run/mysql/mysqlrouter-{}.pid".format(self.name)
+        return "/run/{}/mysqlrouter.pid".format(
+            self.mysqlrouter_runtime_directory)
 
     @property
     def mysqlrouter_bin(self):
@@ -123,6 +882,15 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         """
         return "/usr/bin/mysqlrouter"
 
+    @property
+    def mysqlrouter_passwd_bin(self):
+        """Determine the path to the mysqlrouter_passwd binary.
+
+        :returns: Path to the binary
+        :rtype: str
+        """
+        return "/usr/bin/mysqlrouter_passwd"
+
     @property
     def db_router_endpoint(self):
         """Get the MySQL Router (db-router) interface.
@@ -134,6 +902,41 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         """
         return reactive.relations.endpoint_from_flag("db-router.available")
 
+    @property
+    def db_router_snapshot(self):
+        """Get the hook scoped snapshot of the db-router relation data.
+
+        Juju presents the relation data as of the start of the hook, so it
+        cannot change while the charm instance exists and the snapshot is
+        built once, as soon as the db-router relation is available. The hit
+        and miss counters are logged at the end of the hook.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Snapshot of the db-router relation data
+        :rtype: DBRouterSnapshot
+        """
+        if (self._db_router_snapshot is not None and
+                self._db_router_snapshot.endpoint is not None):
+            self._db_router_snapshot_hits += 1
+            return self._db_router_snapshot
+
+        if not (self._db_router_snapshot_hits or
+                self._db_router_snapshot_misses):
+            ch_core.hookenv.atexit(self.log_db_router_snapshot_stats)
+        self._db_router_snapshot_misses += 1
+        self._db_router_snapshot = DBRouterSnapshot(
+            self.db_router_endpoint, self.db_prefix)
+        return self._db_router_snapshot
+
+    def log_db_router_snapshot_stats(self):
+        """Log the db-router snapshot hit and miss counters of the hook."""
+        ch_core.hookenv.log(
+            "db-router snapshot hits: {}, misses: {}"
+            .format(self._db_router_snapshot_hits,
+                    self._db_router_snapshot_misses),
+            "DEBUG")
+
     @property
     def db_prefix(self):
         """Determine the prefix to use on the db-router relation.
@@ -168,8 +971,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :returns: Password
         :rtype: str
         """
-        return json.loads(
-            self.db_router_endpoint.password(prefix=self.db_prefix))
+        return self.db_router_snapshot.password
 
     @property
     def db_router_address(self):
@@ -197,7 +999,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :returns: Address
         :rtype: str
         """
-        return json.loads(self.db_router_endpoint.db_host())
+        return self.db_router_snapshot.cluster_address
 
     @property
     def shared_db_address(self):
@@ -215,7 +1017,58 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
 
     @property
     def mysqlrouter_port(self):
-        return self.options.base_port
+        """Determine the read-write classic protocol port.
+
+        :returns: Port
+        :rtype: int
+        """
+        return (int(self.options.base_port) +
+                ROUTER_PORT_STRIDE * self.instance_index)
+
+    @property
+    def mysqlrouter_ro_port(self):
+        """Determine the read-only classic protocol port.
+
+        Bootstrap with --conf-base-port assigns RW, RO, xRW and xRO ports
+        incrementally from base-port.
+
+        :returns: Port
+        :rtype: int
+        """
+        return self.mysqlrouter_port + 1
+
+    @property
+    def mysqlrouter_x_port(self):
+        """Determine the read-write X protocol port.
+
+        :returns: Port
+        :rtype: int
+        """
+        return self.mysqlrouter_port + 2
+
+    @property
+    def mysqlrouter_x_ro_port(self):
+        """Determine the read-only X protocol port.
+
+        :returns: Port
+        :rtype: int
+        """
+        return self.mysqlrouter_port + 3
+
+    @property
+    def routing_sections(self):
+        """Determine the routing section search keys managed by the charm.
+
+        The X protocol sections are only managed when they are published to
+        clients, see publish-x-protocol.
+
+        :returns: Section search keys
+        :rtype: List[str]
+        """
+        sections = [ROUTING_RW_SECTION, ROUTING_RO_SECTION]
+        if self.options.publish_x_protocol:
+            sections += [ROUTING_X_RW_SECTION, ROUTING_X_RO_SECTION]
+        return sections
 
     @property
     def mysqlrouter_working_dir(self):
@@ -248,6 +1101,94 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         """
         return "{}/mysqlrouter.conf".format(self.mysqlrouter_working_dir)
 
+    @property
+    def router_config(self):
+        """Get the in-memory model of the mysqlrouter.conf file.
+
+        The file is parsed once and the model is shared by every reader and
+        writer until the file changes on disk.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Configuration model
+        :rtype: RouterConfig
+        """
+        stamp = file_stamp(self.mysqlrouter_conf)
+        cached = self._router_config
+        if (cached is None or stamp is None or
+                cached.path != self.mysqlrouter_conf or
+                cached.stamp != stamp):
+            ch_core.hookenv.log(
+                "Loading {}".format(self.mysqlrouter_conf), "DEBUG")
+            self._router_config = RouterConfig(self.mysqlrouter_conf, stamp)
+        return self._router_config
+
+    @property
+    def mysqlrouter_socket(self):
+        """Determine the path to the mysqlrouter RW unix socket.
+
+        :returns: Path to the unix socket
+        :rtype: str
+        """
+        return "{}/mysql.sock".format(self.mysqlrouter_working_dir)
+
+    @property
+    def mysqlrouter_ro_socket(self):
+        """Determine the path to the mysqlrouter RO unix socket.
+
+        :returns: Path to the unix socket
+        :rtype: str
+        """
+        return "{}/mysqlro.sock".format(self.mysqlrouter_working_dir)
+
+    @property
+    def mysqlrouter_x_socket(self):
+        """Determine the path to the mysqlrouter X protocol RW unix socket.
+
+        :returns: Path to the unix socket
+        :rtype: str
+        """
+        return "{}/mysqlx.sock".format(self.mysqlrouter_working_dir)
+
+    @property
+    def mysqlrouter_x_ro_socket(self):
+        """Determine the path to the mysqlrouter X protocol RO unix socket.
+
+        :returns: Path to the unix socket
+        :rtype: str
+        """
+        return "{}/mysqlxro.sock".format(self.mysqlrouter_working_dir)
+
+    @property
+    def monitor_status_file(self):
+        """Determine the path to the status file written by the monitor.
+
+        :returns: Path to the status file
+        :rtype: str
+        """
+        return "{}/monitor.json".format(self.mysqlrouter_working_dir)
+
+    @property
+    def rest_api_passwd_file(self):
+        """Determine the path to the REST API users file of this instance.
+
+        :returns: Path to the mysqlrouter_passwd file
+        :rtype: str
+        """
+        return "{}/rest_api.passwd".format(self.mysqlrouter_working_dir)
+
+    @property
+    def exporter_password_file(self):
+        """Determine the path to the file holding the exporter's password.
+
+        The file is shared by all router instances, as is the exporter.
+
+        :returns: Path to the password file
+        :rtype: str
+        """
+        return "{}/{}.passwd".format(self.mysqlrouter_home_dir,
+                                     self.exporter_service)
+
     @property
     def mysqlrouter_user(self):
         return "mysql"
@@ -266,13 +1207,48 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :rtype: str
         :rtype: Union[str, None]
         """
-        if self.db_router_endpoint:
-            if self.db_router_endpoint.ssl_ca():
-                return json.loads(self.db_router_endpoint.ssl_ca())
+        return self.db_router_snapshot.ssl_ca
+
+    @property
+    def router_capabilities(self):
+        """Determine the features supported by the installed mysql-router.
+
+        The capabilities are computed once per installed package revision and
+        persisted in unitdata so that version dependent code paths do not need
+        to query the package database on every hook.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Dictionary of capability name to boolean
+        :rtype: Dict[str, bool]
+        """
+        try:
+            revision = str(os.path.getmtime(DPKG_STATUS))
+        except OSError:
+            revision = None
+
+        kv = ch_core.unitdata.kv()
+        cached = kv.get(ROUTER_CAPABILITIES_KEY)
+        if (revision is not None and isinstance(cached, dict) and
+                cached.get("revision") == revision and
+                set(cached.get("capabilities", {})) ==
+                set(ROUTER_CAPABILITIES)):
+            return cached["capabilities"]
+
+        capabilities = {
+            name: ch_core.host.cmp_pkgrevno("mysql-router", version) >= 0
+            for name, version in ROUTER_CAPABILITIES.items()}
+        ch_core.hookenv.log(
+            "mysql-router capabilities: {}".format(capabilities), "DEBUG")
+        kv.set(ROUTER_CAPABILITIES_KEY, {
+            "revision": revision,
+            "capabilities": capabilities})
+        return capabilities
 
     @property
     def restart_functions(self):
-        return {self.name: self.custom_restart_function}
+        return {router.name: router.custom_restart_function
+                for router in self.router_instances}
 
     def install(self):
         """Custom install function.
@@ -310,15 +1286,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                 perms=0o755)
 
         # Systemd File
-        ch_core.templating.render(
-            source="mysqlrouter.service",
-            template_loader=os_templating.get_loader(
-                'templates/', self.release),
-            target=self.systemd_file,
-            context=self.adapters_instance,
-            group=self.group,
-            perms=0o755,
-        )
+        self.render_systemd_file()
         cmd = ["systemctl", "enable", self.name]
         subprocess.check_output(cmd, stderr=subprocess.STDOUT)
 
@@ -337,8 +1305,8 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
 
     def upgrade_charm(self):
         """Custom upgrade charm function to handle special upgrade logic."""
-        config = configparser.ConfigParser()
-        config.read(self.mysqlrouter_conf)
+        config = self.router_config.parser
+        self.restart_reason = "upgrade-charm"
 
         with ch_core.host.restart_on_change(
                 self.restart_map,
@@ -368,10 +1336,279 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                                     'metadata_cache:jujuCluster section',
                                     'INFO')
                 config.remove_section('metadata_cache:jujuCluster')
+                self.router_config.sections.invalidate()
 
+            # The unit is rendered first as config_changed is skipped within
+            # this hook (LP: #1980693) and the pid_file written below may be
+            # in a RuntimeDirectory the installed unit does not create yet
+            self.update_systemd_unit()
             parameters = self._get_config_parameters()
             self.update_config_parameters(parameters, config=config)
 
+    def render_systemd_file(self):
+        """Render the mysqlrouter systemd unit.
+
+        :returns: Whether the content of the unit file changed
+        :rtype: bool
+        """
+        before = ch_core.host.file_hash(self.systemd_file)
+        ch_core.templating.render(
+            source="mysqlrouter.service",
+            template_loader=os_templating.get_loader(
+                'templates/', self.release),
+            target=self.systemd_file,
+            context={
+                "name": self.name,
+                "working_dir": self.mysqlrouter_working_dir,
+                "runtime_directory": self.mysqlrouter_runtime_directory,
+                "properties": self.systemd_unit_properties,
+            },
+            group=self.group,
+            perms=0o755,
+        )
+        return before != ch_core.host.file_hash(self.systemd_file)
+
+    @property
+    def systemd_unit_properties(self):
+        """Determine the managed properties of the mysqlrouter systemd unit.
+
+        Invalid resource control options are left out, see
+        invalid_config_options.
+
+        :returns: Ordered systemd directives and their values
+        :rtype: Dict[str, str]
+        """
+        properties = {"LimitNOFILE": str(self.mysqlrouter_nofile_limit)}
+        for option, (directive, pattern) in SYSTEMD_RESOURCE_OPTIONS.items():
+            value = (getattr(self.options, option.replace("-", "_")) or
+                     "").strip()
+            if not value:
+                continue
+            if not pattern.match(value):
+                ch_core.hookenv.log(
+                    "Ignoring invalid {} {}".format(option, value),
+                    "WARNING")
+                continue
+            if directive == "NUMAMask":
+                properties["NUMAPolicy"] = "bind"
+            properties[directive] = value
+        return properties
+
+    def update_systemd_unit(self):
+        """Render the systemd unit and apply its changes to the service.
+
+        Changes of cgroup resource controls only, see
+        RUNTIME_SYSTEMD_PROPERTIES, are applied to the running router with
+        systemctl set-property. Any other change requires a restart.
+
+        :side effect: Renders the unit, reloads systemd and may change the
+                      resource controls of the running service
+        :returns: Changes requiring a restart, see apply_config_changes
+        :rtype: List[Tuple[str, str]]
+        """
+        kv = ch_core.unitdata.kv()
+        previous = kv.get(self.unitdata_key(SYSTEMD_UNIT_KEY))
+        properties = self.systemd_unit_properties
+        kv.set(self.unitdata_key(SYSTEMD_UNIT_KEY), properties)
+        if not self.render_systemd_file():
+            return []
+        self.systemd_daemon_reload()
+        if not self.router_started:
+            return []
+
+        if isinstance(previous, dict):
+            changed = sorted(
+                directive for directive in set(previous) | set(properties)
+                if previous.get(directive) != properties.get(directive))
+            if changed and set(changed) <= set(RUNTIME_SYSTEMD_PROPERTIES):
+                cmd = ["systemctl", "set-property", "--runtime", self.name]
+                for directive in changed:
+                    cmd.append("{}={}".format(directive, properties.get(
+                        directive, RUNTIME_SYSTEMD_PROPERTIES[directive])))
+                ch_core.hookenv.log(
+                    "Applying {} to the running router"
+                    .format(", ".join(cmd[4:])), "INFO")
+                subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+                return []
+        return [SYSTEMD_UNIT_CHANGE]
+
+    @property
+    def mysqlrouter_nofile_limit(self):
+        """Determine the open file limit (LimitNOFILE) of the router service.
+
+        The limit is derived from the connection budget: max_connections is
+        shared by every route with max_total_connections, and applies to each
+        route otherwise. It is capped at the kernel's fs.nr_open, which a
+        service cannot exceed.
+
+        :returns: Open file limit
+        :rtype: int
+        """
+        connections = int(self.options.max_connections)
+        if not self.router_capabilities["supports_max_total_connections"]:
+            connections *= BOOTSTRAP_ROUTES
+        limit = max(MIN_NOFILE_LIMIT, 2 * connections + NOFILE_OVERHEAD)
+        nr_open = kernel_nr_open()
+        if nr_open and limit > nr_open:
+            ch_core.hookenv.log(
+                "max_connections {} needs {} file descriptors, more than "
+                "the host allows (fs.nr_open {}); limiting LimitNOFILE to {}"
+                .format(self.options.max_connections, limit, nr_open,
+                        nr_open),
+                "WARNING")
+            return nr_open
+        return limit
+
+    def systemd_daemon_reload(self):
+        """Reload the systemd manager configuration."""
+        subprocess.check_output(
+            ["systemctl", "daemon-reload"], stderr=subprocess.STDOUT)
+
+    def configure_monitor_service(self):
+        """Install, update or remove the router monitor service.
+
+        The monitor continuously probes the RW and RO unix sockets and writes
+        a status file which is read by check_router_health. The TCP
+        ports are not probed as every unauthenticated connection counts
+        towards the router's max_connect_errors. It is disabled when
+        monitor-interval is 0.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :side effect: Renders the monitor systemd unit and (re)starts it
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        interval = self.options.monitor_interval
+        if not interval:
+            self.remove_monitor_service()
+            return
+
+        before = ch_core.host.file_hash(self.monitor_systemd_file)
+        ch_core.templating.render(
+            source="mysqlrouter-monitor.service",
+            template_loader=os_templating.get_loader(
+                "templates/", self.release),
+            target=self.monitor_systemd_file,
+            context={
+                "service": self.name,
+                "user": self.mysqlrouter_user,
+                "group": self.mysqlrouter_group,
+                "lib_dir": os.path.join(ch_core.hookenv.charm_dir(), "lib"),
+                "status_file": self.monitor_status_file,
+                "interval": interval,
+                "endpoints": [
+                    "rw={}".format(self.mysqlrouter_socket),
+                    "ro={}".format(self.mysqlrouter_ro_socket)],
+            },
+            perms=0o644,
+        )
+        if before != ch_core.host.file_hash(self.monitor_systemd_file):
+            self.systemd_daemon_reload()
+            ch_core.host.service("enable", self.monitor_service)
+            ch_core.host.service_restart(self.monitor_service)
+        elif not ch_core.host.service_running(self.monitor_service):
+            ch_core.host.service_start(self.monitor_service)
+
+    def remove_monitor_service(self):
+        """Stop and remove the router monitor service, if installed."""
+        if not os.path.exists(self.monitor_systemd_file):
+            return
+        ch_core.host.service_stop(self.monitor_service)
+        ch_core.host.service("disable", self.monitor_service)
+        os.remove(self.monitor_systemd_file)
+        self.systemd_daemon_reload()
+
+    def configure_exporter_service(self):
+        """Install, update or remove the Prometheus exporter service.
+
+        The exporter serves the metrics of the REST API of every router
+        instance on metrics-port of metrics-address. It is disabled when
+        metrics-port or rest-api-port is 0.
+
+        :side effect: Renders the exporter systemd unit and (re)starts it
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        port = self.options.metrics_port
+        if not port or self.rest_api_port is None:
+            self.remove_exporter_service()
+            return
+        # The password file is written along with the REST API user file of
+        # the bootstrapped router, see configure_rest_api
+        if not os.path.exists(self.mysqlrouter_working_dir):
+            return
+
+        before = ch_core.host.file_hash(self.exporter_systemd_file)
+        ch_core.templating.render(
+            source="mysqlrouter-exporter.service",
+            template_loader=os_templating.get_loader(
+                "templates/", self.release),
+            target=self.exporter_systemd_file,
+            context={
+                "service": self.name,
+                "user": self.mysqlrouter_user,
+                "group": self.mysqlrouter_group,
+                "lib_dir": os.path.join(ch_core.hookenv.charm_dir(), "lib"),
+                "address": self.options.metrics_address,
+                "port": port,
+                "rest_api_user": REST_API_USER,
+                "password_file": self.exporter_password_file,
+                "targets": [
+                    "{}=127.0.0.1:{}".format(router.name,
+                                             router.rest_api_port)
+                    for router in self.router_instances],
+            },
+            perms=0o644,
+        )
+        if before != ch_core.host.file_hash(self.exporter_systemd_file):
+            self.systemd_daemon_reload()
+            ch_core.host.service("enable", self.exporter_service)
+            ch_core.host.service_restart(self.exporter_service)
+        elif not ch_core.host.service_running(self.exporter_service):
+            ch_core.host.service_start(self.exporter_service)
+
+    def remove_exporter_service(self):
+        """Stop and remove the Prometheus exporter service, if installed."""
+        if not os.path.exists(self.exporter_systemd_file):
+            return
+        ch_core.host.service_stop(self.exporter_service)
+        ch_core.host.service("disable", self.exporter_service)
+        os.remove(self.exporter_systemd_file)
+        self.systemd_daemon_reload()
+
+    def monitored_router_health(self):
+        """Determine router health from the monitor's status file.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: True or False if the monitor reported recently on the RW
+                  endpoint, None if no fresh status is available
+        :rtype: Union[bool, None]
+        """
+        interval = self.options.monitor_interval
+        if not interval:
+            return None
+        try:
+            with open(self.monitor_status_file) as f:
+                status = json.load(f)
+            endpoint = status["endpoints"]["rw"]
+            age = time.time() - status["timestamp"]
+        except (OSError, ValueError, KeyError, TypeError):
+            ch_core.hookenv.log("No usable router monitor status", "DEBUG")
+            return None
+        # Allow for a few missed probes before falling back
+        if age > 3 * interval + self.handshake_probe_timeout:
+            ch_core.hookenv.log(
+                "Router monitor status is stale ({:.0f}s old)".format(age),
+                "DEBUG")
+            return None
+        ch_core.hookenv.log(
+            "Router monitor: rw ok={ok} consecutive_failures="
+            "{consecutive_failures} success_ratio={success_ratio}"
+            .format(**endpoint), "DEBUG")
+        return endpoint["consecutive_failures"] == 0
+
     def get_db_helper(self):
         """Get an instance of the MySQLDB8Helper class.
 
@@ -440,6 +1677,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                              self.shared_db_address,
                              port=self.mysqlrouter_port,
                              connect_timeout=self.mysql_connect_timeout)
+            m_helper.connection.close()
             return True
         except mysql.MySQLdb._exceptions.OperationalError as e:
             ch_core.hookenv.log("Could not connect to db", "DEBUG")
@@ -449,6 +1687,159 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                 if e.args[0] in reraise_on:
                     raise e
 
+    def benchmark_targets(self, address=None, rw_port=None, ro_port=None,
+                          sockets=True, direct=True, direct_address=None,
+                          direct_port=3306):
+        """Determine the endpoints to benchmark.
+
+        By default the router's RW and RO ports and unix sockets are used and,
+        if known, the cluster address directly. Each may be overridden, e.g. to
+        point the benchmark at a local MySQL stand-in.
+
+        :param address: Address of the router, defaults to shared_db_address
+        :type address: Union[str, None]
+        :param rw_port: RW port, defaults to mysqlrouter_port
+        :type rw_port: Union[int, None]
+        :param ro_port: RO port, defaults to mysqlrouter_ro_port
+        :type ro_port: Union[int, None]
+        :param sockets: Include the router's unix sockets
+        :type sockets: bool
+        :param direct: Include a direct connection to the cluster
+        :type direct: bool
+        :param direct_address: Address for the direct connection, defaults to
+                               cluster_address if the db-router relation is
+                               available
+        :type direct_address: Union[str, None]
+        :param direct_port: Port for the direct connection
+        :type direct_port: int
+        :returns: MySQLdb.connect keyword arguments per endpoint name
+        :rtype: Dict[str, dict]
+        """
+        address = address or self.shared_db_address
+        targets = {
+            "rw": {"host": address,
+                   "port": int(rw_port or self.mysqlrouter_port)},
+            "ro": {"host": address,
+                   "port": int(ro_port or self.mysqlrouter_ro_port)},
+        }
+        if sockets:
+            targets["rw-socket"] = {"unix_socket": self.mysqlrouter_socket}
+            targets["ro-socket"] = {
+                "unix_socket": self.mysqlrouter_ro_socket}
+        if direct:
+            if not direct_address and self.db_router_endpoint is not None:
+                direct_address = self.cluster_address
+            if direct_address:
+                targets["direct"] = {"host": direct_address,
+                                     "port": int(direct_port)}
+        return targets
+
+    def benchmark_router(self, targets, iterations=100, concurrency=4,
+                         time_limit=60):
+        """Benchmark connections and queries through the router.
+
+        Connect as db_router_user to each target, see benchmark_targets, and
+        measure connect latency, simple query round trips and connections per
+        second. When the cluster was benchmarked directly the router's
+        overhead on the median connect and query latency is reported too.
+
+        :param targets: MySQLdb.connect keyword arguments per endpoint name
+        :type targets: Dict[str, dict]
+        :param iterations: Number of operations per measurement
+        :type iterations: int
+        :param concurrency: Concurrent connections for the throughput
+                            measurement
+        :type concurrency: int
+        :param time_limit: Time budget in seconds per endpoint
+        :type time_limit: float
+        :raises: ValueError on out of range parameters or if the db-router
+                 relation, which holds the credentials, is not available
+        :returns: Results per endpoint name
+        :rtype: Dict[str, dict]
+        """
+        if self.db_router_endpoint is None:
+            raise ValueError("The db-router relation is not available")
+        results = {}
+        for name, target in sorted(targets.items()):
+            ch_core.hookenv.log(
+                "Benchmarking {}: {}".format(name, target), "DEBUG")
+            connect = functools.partial(
+                mysql.MySQLdb.connect,
+                user=self.db_router_user,
+                passwd=self.db_router_password,
+                connect_timeout=self.mysql_connect_timeout,
+                **target)
+            results[name] = router_benchmark.benchmark(
+                connect, iterations=iterations, concurrency=concurrency,
+                time_limit=time_limit)
+
+        direct = results.get("direct")
+        if direct:
+            for name, result in results.items():
+                if name == "direct":
+                    continue
+                overhead = {}
+                for measurement in ("connect", "query"):
+                    routed = result[measurement]["p50_ms"]
+                    baseline = direct[measurement]["p50_ms"]
+                    if routed is not None and baseline is not None:
+                        overhead[measurement] = round(routed - baseline, 3)
+                result["overhead_p50_ms"] = overhead
+        return results
+
+    def probe_router_handshake(self):
+        """Check that the router completes a MySQL protocol handshake.
+
+        Open a connection to the router's RW unix socket, read and parse the
+        initial handshake packet and close the connection without
+        authenticating. The TCP port is not used as an unauthenticated
+        connection counts towards the router's max_connect_errors.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: True if a valid handshake was received or False if not
+        :rtype: boolean
+        """
+        try:
+            handshake = router_probe.read_handshake(
+                self.mysqlrouter_socket, timeout=self.handshake_probe_timeout)
+        except (OSError, router_probe.HandshakeError) as e:
+            ch_core.hookenv.log(
+                "Handshake probe failed: {}".format(e), "DEBUG")
+            return False
+        ch_core.hookenv.log(
+            "Handshake probe succeeded, server version {}"
+            .format(handshake["server_version"]), "DEBUG")
+        return True
+
+    def check_router_health(self):
+        """Check the health of the router.
+
+        A full authenticated connection through the router is only made every
+        healthcheck-auth-interval seconds. In between, the monitor's recent
+        view of the router is used or, if unavailable, the cheaper handshake
+        probe.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: True if the router is healthy or False if not
+        :rtype: boolean
+        """
+        interval = self.options.healthcheck_auth_interval
+        kv = ch_core.unitdata.kv()
+        last_auth_check = kv.get(LAST_AUTH_CHECK_KEY)
+        now = time.time()
+        if (not interval or last_auth_check is None or
+                now - last_auth_check >= interval):
+            if not self.check_mysql_connection():
+                return False
+            kv.set(LAST_AUTH_CHECK_KEY, now)
+            return True
+        healthy = self.monitored_router_health()
+        if healthy is None:
+            healthy = self.probe_router_handshake()
+        return healthy
+
     def custom_assess_status_check(self):
         """Custom assess status check.
 
@@ -466,15 +1857,16 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         # Start with default checks
         for f in [self.check_if_paused,
                   self.check_interfaces,
-                  self.check_mandatory_config]:
+                  self.check_mandatory_config,
+                  self.check_charm_config]:
             state, message = f()
             if state is not None:
                 ch_core.hookenv.status_set(state, message)
                 return state, message
 
         # We should not get here until there is a connection to the
-        # cluster (db-router available)
-        if not self.check_mysql_connection():
+        # cluster (db-router available).
+        if not self.check_router_health():
             return "blocked", "Failed to connect to MySQL"
 
         return None, None
@@ -497,6 +1889,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                 "mysql router configuration file is not exist yet.",
                 "WARNING")
 
+    @timed("bootstrap")
     def bootstrap_mysqlrouter(self, force=False):
         """Bootstrap MySQL Router.
 
@@ -505,6 +1898,10 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         Cluster about the cluster's schema. Configuration and working files
         live in self.mysqlrouter_bin.
 
+        The charm managed parameters are applied to the bootstrapped
+        configuration straight away so that the first start of the router
+        is not followed by a restart from config_changed.
+
         :param self: Self
         :type self: MySQLRouterCharm instance
         :side effect: Executes the mysqlrouter bootstrap command
@@ -521,22 +1918,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                 "WARNING")
             return
 
-        cmd = [self.mysqlrouter_bin,
-               "--user", self.mysqlrouter_user,
-               "--name", self.name,
-               "--bootstrap",
-               "{}:{}@{}".format(self.db_router_user,
-                                 self.db_router_password,
-                                 self.cluster_address),
-               "--directory", self.mysqlrouter_working_dir,
-               "--conf-use-sockets",
-               "--conf-bind-address", self.shared_db_address,
-               "--report-host", self.db_router_address,
-               "--conf-base-port", str(self.mysqlrouter_port)]
-        # Avoid multiple routers trying to bind to the same api port
-        # Bug #1911907
-        if ch_core.host.cmp_pkgrevno('mysql-router', '8.0.22') >= 0:
-            cmd.append("--disable-rest")
+        cmd = self.bootstrap_command()
 
         # If we have attempted to bootstrap before but unsuccessfully,
         # use the force option to avoid LP Bug#1919560
@@ -569,6 +1951,120 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         # Set that we have been bootstrapped
         reactive.flags.set_flag(MYSQL_ROUTER_BOOTSTRAPPED)
 
+        # Apply the charm managed parameters before the router is started.
+        # --conf-set-option cannot be used for this as the metadata cache
+        # and routing sections are named after the cluster.
+        self.configure_rest_api()
+        self.update_config_parameters(self._get_config_parameters())
+        if is_bootstrap_attempted or force:
+            # A router which is already running has to pick up the new
+            # configuration, start_mysqlrouter or the restart in
+            # apply_config_changes clears this again.
+            reactive.flags.set_flag(MYSQL_ROUTER_RESTART_REQUIRED)
+
+    def bootstrap_command(self):
+        """Determine the mysqlrouter bootstrap command of this instance.
+
+        :returns: Command
+        :rtype: List[str]
+        """
+        cmd = [self.mysqlrouter_bin,
+               "--user", self.mysqlrouter_user,
+               "--name", self.name,
+               "--bootstrap",
+               "{}:{}@{}".format(self.db_router_user,
+                                 self.db_router_password,
+                                 self.cluster_address),
+               "--directory", self.mysqlrouter_working_dir,
+               "--conf-use-sockets",
+               "--conf-bind-address", self.shared_db_address,
+               "--report-host", self.db_router_address,
+               "--conf-base-port", str(self.mysqlrouter_port)]
+        # Avoid multiple routers trying to bind to the same api port
+        # Bug #1911907
+        if self.router_capabilities["supports_disable_rest"]:
+            cmd.append("--disable-rest")
+        if (self.options.use_gr_notifications and
+                self.router_capabilities["supports_gr_notifications"]):
+            cmd.append("--conf-use-gr-notifications")
+        return cmd
+
+    @timed("bootstrap")
+    def bootstrap_router_instance(self):
+        """Install and bootstrap an additional router instance.
+
+        See router_instance. Unlike instance 0 the additional instances are
+        not tracked by flags, an instance is bootstrapped once its
+        mysqlrouter.conf exists.
+
+        :side effect: Renders and enables the systemd unit and executes the
+                      mysqlrouter bootstrap command
+        :returns: Whether the bootstrap succeeded
+        :rtype: bool
+        """
+        if self.render_systemd_file():
+            self.systemd_daemon_reload()
+        subprocess.check_output(
+            ["systemctl", "enable", self.name], stderr=subprocess.STDOUT)
+
+        cmd = self.bootstrap_command()
+        # A working directory without a configuration is left over from a
+        # failed attempt, see LP Bug#1919560
+        if os.path.exists(self.mysqlrouter_working_dir):
+            cmd.append("--force")
+        try:
+            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+            ch_core.hookenv.log(output, "DEBUG")
+        except subprocess.CalledProcessError as e:
+            ch_core.hookenv.log(
+                "Failed to bootstrap mysqlrouter {}: {}"
+                .format(self.name, e.output.decode("UTF-8")), "ERROR")
+            return False
+        self.configure_rest_api()
+        self.update_config_parameters(self._get_config_parameters())
+        return True
+
+    def configure_router_instances(self):
+        """Bootstrap and start the additional router instances.
+
+        Instances which are no longer configured, see router-instances, are
+        stopped and removed.
+
+        :side effect: Bootstraps, starts and removes router instances
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        kv = ch_core.unitdata.kv()
+        count = self.router_instance_count
+        for router in self.router_instances[1:]:
+            if (not os.path.exists(router.mysqlrouter_conf) and
+                    not router.bootstrap_router_instance()):
+                continue
+            ch_core.host.service_start(router.name)
+
+        for index in range(count, kv.get(ROUTER_INSTANCES_KEY) or 1):
+            self.router_instance(index).remove_router_instance()
+        kv.set(ROUTER_INSTANCES_KEY, count)
+
+    def remove_router_instance(self):
+        """Stop and remove an additional router instance.
+
+        :side effect: Stops the router, removes its systemd unit and working
+                      directory
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        ch_core.hookenv.log(
+            "Removing router instance {}".format(self.name), "INFO")
+        ch_core.host.service_stop(self.name)
+        ch_core.host.service("disable", self.name)
+        if os.path.exists(self.systemd_file):
+            os.remove(self.systemd_file)
+            self.systemd_daemon_reload()
+        ch_core.unitdata.kv().unset(self.unitdata_key(SYSTEMD_UNIT_KEY))
+        self.config_cleanup()
+
+    @timed("start")
     def start_mysqlrouter(self):
         """Start MySQL Router.
 
@@ -582,6 +2078,8 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         """
         ch_core.host.service_start(self.name)
         reactive.flags.set_flag(MYSQL_ROUTER_STARTED)
+        reactive.flags.clear_flag(MYSQL_ROUTER_RESTART_REQUIRED)
+        self.configure_router_instances()
 
     def stop_mysqlrouter(self):
         """Stop MySQL Router.
@@ -594,7 +2092,8 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :returns: This function is called for its side effect
         :rtype: None
         """
-        ch_core.host.service_stop(self.name)
+        for router in self.router_instances:
+            ch_core.host.service_stop(router.name)
 
     def restart_mysqlrouter(self):
         """Restart MySQL Router.
@@ -608,14 +2107,18 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :returns: This function is called for its side effect
         :rtype: None
         """
-        ch_core.host.service_restart(self.name)
+        for router in self.router_instances:
+            record_restart_event(router.name, "restart-mysqlrouter action")
+            ch_core.host.service_restart(router.name)
 
     def proxy_db_and_user_requests(
             self, receiving_interface, sending_interface):
         """Proxy database and user requests to the MySQL InnoDB Cluster.
 
         Take requests from the shared-db relation and proxy them to the
-        db-router relation using their respective endpoints.
+        db-router relation using their respective endpoints. Only added or
+        changed requests are forwarded, the keys of removed requests are
+        cleared from the db-router relation.
 
         :param self: Self
         :type self: MySQLRouterCharm instance
@@ -623,7 +2126,8 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :type receiving_interface: MySQLSharedProvides object
         :param sending_interface: DB-Router interface
         :type sending_interface: MySQLRouterRequires object
-        :side effect: Executes sending interface's set function
+        :side effect: Executes sending interface's set function and clears
+                      the keys of removed prefixes
         :returns: This function is called for its side effect
         :rtype: None
         """
@@ -633,13 +2137,61 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
             dict(receiving_interface.all_joined_units.received),
             unprefixed=self._unprefixed)
 
-        for prefix in db_data:
+        requests = {
+            prefix: {
+                "database": db_data[prefix].get("database"),
+                "username": db_data[prefix].get("username"),
+                "hostname": db_data[prefix].get("hostname"),
+            } for prefix in db_data}
+        fingerprints = {
+            prefix: fingerprint(request)
+            for prefix, request in requests.items()}
+
+        # Requests need to be forwarded again to a new db-router relation
+        db_router_relations = sorted(
+            str(relation.relation_id)
+            for relation in sending_interface.relations)
+        kv = ch_core.unitdata.kv()
+        forwarded = kv.get(SHARED_DB_REQUESTS_KEY)
+        if (isinstance(forwarded, dict) and
+                forwarded.get("db_router") == db_router_relations):
+            forwarded = forwarded.get("requests", {})
+        else:
+            forwarded = {}
+
+        unchanged = []
+        for prefix, request in requests.items():
+            if forwarded.get(prefix) == fingerprints[prefix]:
+                unchanged.append(prefix)
+                continue
             sending_interface.configure_proxy_db(
-                db_data[prefix].get("database"),
-                db_data[prefix].get("username"),
-                db_data[prefix].get("hostname"),
+                request["database"],
+                request["username"],
+                request["hostname"],
                 prefix=prefix)
 
+        if unchanged:
+            ch_core.hookenv.log(
+                "Skipped forwarding unchanged shared-db requests: {}"
+                .format(", ".join(sorted(unchanged))), "DEBUG")
+
+        # The interface has no API to withdraw a request, clear the keys
+        # configure_proxy_db published for it
+        removed = sorted(set(forwarded) - set(requests))
+        if removed:
+            ch_core.hookenv.log(
+                "Withdrawing removed shared-db requests: {}"
+                .format(", ".join(removed)), "DEBUG")
+        for relation in sending_interface.relations:
+            for prefix in removed:
+                for key in ("database", "username", "hostname"):
+                    relation.to_publish_raw[
+                        "{}_{}".format(prefix, key)] = None
+        kv.set(SHARED_DB_REQUESTS_KEY, {
+            "db_router": db_router_relations,
+            "requests": fingerprints})
+
+    @timed("proxy-responses")
     def proxy_db_and_user_responses(
             self, receiving_interface, sending_interface):
         """Proxy database and user responses to clients.
@@ -665,6 +2217,16 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
             # lp:1881596. Let's just silently give up:
             return
 
+        relation_id = unit.relation.relation_id
+        kv = ch_core.unitdata.kv()
+        published = kv.get(SHARED_DB_PUBLISHED_KEY)
+        if isinstance(published, dict) and relation_id in published:
+            published = published[relation_id]
+        else:
+            # Nothing known to be published on this relation yet
+            published = None
+
+        responses = {}
         for prefix in receiving_interface.get_prefixes():
 
             if prefix in self.db_prefix:
@@ -689,29 +2251,111 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
             _ssl_ca = receiving_interface.ssl_ca()
             if _ssl_ca:
                 _ssl_ca = json.loads(_ssl_ca)
-            else:
-                # Reset ssl_ca in case we previously had it set
-                ch_core.hookenv.log("Proactively resetting ssl_ca", "DEBUG")
-                sending_interface.relations[
-                    unit.relation.relation_id].to_publish_raw["ssl_ca"] = None
 
             if ch_core.hookenv.local_unit() in (json.loads(
                     receiving_interface.allowed_units(prefix=prefix))):
                 _allowed_hosts = unit.unit_name
             else:
                 _allowed_hosts = None
-            if prefix in self._unprefixed:
-                prefix = None
 
+            responses[prefix] = {
+                "db_host": self.shared_db_address,
+                "password": _password,
+                "allowed_units": _allowed_hosts,
+                "prefix": None if prefix in self._unprefixed else prefix,
+                "wait_timeout": _wait_timeout,
+                "db_port": self.mysqlrouter_port,
+                "ssl_ca": _ssl_ca,
+            }
+
+        fingerprints = {
+            prefix: fingerprint(response)
+            for prefix, response in responses.items()}
+        changed = [
+            prefix for prefix in responses
+            if published is None or
+            published.get("responses", {}).get(prefix) !=
+            fingerprints[prefix]]
+
+        # Reset ssl_ca in case we previously had it set, the interface only
+        # publishes it when set.
+        has_ssl_ca = any(r["ssl_ca"] for r in responses.values())
+        if not has_ssl_ca and (published is None or
+                               published.get("ssl_ca", True)):
+            ch_core.hookenv.log("Proactively resetting ssl_ca", "DEBUG")
+            sending_interface.relations[
+                relation_id].to_publish_raw["ssl_ca"] = None
+
+        # All writes end up in the relation's to_publish data which is sent
+        # as a single relation-set at the end of the hook.
+        for prefix in changed:
+            response = responses[prefix]
             sending_interface.set_db_connection_info(
-                unit.relation.relation_id,
-                self.shared_db_address,
-                _password,
-                allowed_units=_allowed_hosts,
-                prefix=prefix,
-                wait_timeout=_wait_timeout,
-                db_port=self.mysqlrouter_port,
-                ssl_ca=_ssl_ca)
+                relation_id,
+                response["db_host"],
+                response["password"],
+                allowed_units=response["allowed_units"],
+                prefix=response["prefix"],
+                wait_timeout=response["wait_timeout"],
+                db_port=response["db_port"],
+                ssl_ca=response["ssl_ca"])
+
+        ch_core.hookenv.log(
+            "Published shared-db responses for prefixes: {}; unchanged: {}"
+            .format(", ".join(sorted(changed)) or "none",
+                    ", ".join(sorted(set(responses) - set(changed))) or
+                    "none"),
+            "DEBUG")
+
+        # Settings which set_db_connection_info does not know about are
+        # published unprefixed as they are the same for every prefix.
+        extra = self.shared_db_extra_settings()
+        published_extra = (published or {}).get("extra") or {}
+        to_publish_raw = sending_interface.relations[
+            relation_id].to_publish_raw
+        for key in sorted(set(published_extra) - set(extra)):
+            to_publish_raw[key] = None
+        for key, value in sorted(extra.items()):
+            if published_extra.get(key) != value:
+                to_publish_raw[key] = value
+
+        kv.set(SHARED_DB_PUBLISHED_KEY, {
+            relation_id: {
+                "responses": fingerprints,
+                "ssl_ca": has_ssl_ca,
+                "extra": extra,
+            }})
+
+    def shared_db_extra_settings(self):
+        """Determine the settings published besides the connection info.
+
+        The read-only port is always published so that clients can send
+        reads to the cluster's secondaries, the read-only unix socket only if
+        publish-ro-socket is set. The X protocol ports and unix sockets are
+        published if publish-x-protocol is set.
+
+        :param self: Self
+        :type self: MySQLRouterCharm instance
+        :returns: Relation settings as strings
+        :rtype: Dict[str, str]
+        """
+        settings = {"db_ro_port": str(self.mysqlrouter_ro_port)}
+        routers = self.router_instances
+        if len(routers) > 1:
+            settings["db_ports"] = ",".join(
+                str(router.mysqlrouter_port) for router in routers)
+            settings["db_ro_ports"] = ",".join(
+                str(router.mysqlrouter_ro_port) for router in routers)
+        if self.options.publish_ro_socket:
+            settings["db_ro_socket"] = self.mysqlrouter_ro_socket
+        if self.options.publish_x_protocol:
+            settings.update({
+                "db_x_port": str(self.mysqlrouter_x_port),
+                "db_x_ro_port": str(self.mysqlrouter_x_ro_port),
+                "db_x_socket": self.mysqlrouter_x_socket,
+                "db_x_ro_socket": self.mysqlrouter_x_ro_socket,
+            })
+        return settings
 
     def update_config_parameters(self, parameters, config=None):
         """Update configuration parameters using ConfigParser.
@@ -737,8 +2381,9 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         :param config: an optional existing ConfigParser object
         :type config: configparser.ConfigParser
         :side effect: Writes the mysqlrouter.conf file
-        :returns: This function is called for its side effect
-        :rtype: None
+        :returns: Changed parameters as (heading, parameter) tuples, empty if
+                  the file was not written
+        :rtype: List[Tuple[str, str]]
         """
         # No reason to write the file if it does not exist due to
         # mysql-router not having been bootstrapped yet
@@ -746,42 +2391,95 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
             ch_core.hookenv.log(
                 "mysqlrouter.conf does not yet exist. "
                 "Skipping config-changed.", "DEBUG")
-            return
+            return []
 
         ch_core.hookenv.log("Updating configuration parameters", "DEBUG")
         if not config:
-            config = configparser.ConfigParser()
-            config.read(self.mysqlrouter_conf)
+            config = self.router_config.parser
+        if (self._router_config is not None and
+                config is self._router_config.parser):
+            sections = self._router_config.sections
+        else:
+            sections = SectionIndex(config)
 
+        changes = []
         for heading, settings in parameters.items():
-            for section in config.sections():
-                if re.match(heading, section):
-                    translated = section
-                    break
-            else:
-                translated = heading
+            translated = sections.resolve(heading)
+            if not settings and translated not in config:
+                # Plugins without parameters are loaded by an empty section
+                config[translated] = {}
+                sections.invalidate()
+                changes.append((heading, ""))
 
             for param, value in settings.items():
                 # BUG LP#1927981 - heading may not exist during a charm upgrade
                 # Handle missing heading via direct assignment in except.
                 try:
-                    config[translated][param] = value
+                    section = config[translated]
                 except KeyError:
                     config[translated] = {param: value}
+                    sections.invalidate()
+                    changes.append((heading, param))
+                    continue
+                if section.get(param) != value:
+                    changes.append((heading, param))
+                section[param] = value
+
+        if not self.write_mysqlrouter_conf(config):
+            return []
+        return changes
+
+    def write_mysqlrouter_conf(self, config):
+        """Write the mysqlrouter.conf file if its content changed.
+
+        The configuration is serialised and compared with the current file.
+        The file is only replaced, atomically, when the content differs so
+        that unchanged configuration neither costs disk I/O nor triggers a
+        restart.
+
+        :param config: Configuration to write
+        :type config: configparser.ConfigParser
+        :side effect: Writes the mysqlrouter.conf file
+        :returns: True if the file was written, False if it was unchanged
+        :rtype: bool
+        """
+        buf = io.StringIO()
+        config.write(buf)
+        content = buf.getvalue()
+
+        try:
+            with open(self.mysqlrouter_conf, "r") as configfile:
+                current = configfile.read()
+        except OSError:
+            current = None
+
+        if current == content:
+            ch_core.hookenv.log(
+                "{} is unchanged, skipping write"
+                .format(self.mysqlrouter_conf), "DEBUG")
+            return False
 
         ch_core.hookenv.log("Writing {}".format(self.mysqlrouter_conf))
-        with open(self.mysqlrouter_conf, 'w') as configfile:
-            config.write(configfile)
+        write_file_atomic(self.mysqlrouter_conf, content)
+        # Keep the model valid if it is what was just written
+        if (self._router_config is not None and
+                self._router_config.parser is config):
+            self._router_config.stamp = file_stamp(self.mysqlrouter_conf)
+        else:
+            self._router_config = None
+        return True
 
     def config_changed(self):
         """Config changed.
 
         Custom config changed as we are not using templates we need to update
         config via ConfigParser. We only update after the mysql-router service
-        has bootstrapped.
+        has bootstrapped. The systemd unit is rendered again as its resource
+        limits derive from the config.
 
         :side effect: Calls update_config_parameters and restarts mysql-router
-                      if the config file has changed.
+                      if a changed parameter, a changed systemd unit or a
+                      forced bootstrap requires it.
         :returns: This function is called for its side effect
         :rtype: None
         """
@@ -793,26 +2491,85 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                 "within the upgrade-charm hook.", "DEBUG")
             return
 
-        parameters = self._get_config_parameters()
-        with ch_core.host.restart_on_change(
-                self.restart_map,
-                restart_functions=self.restart_functions):
-            self.update_config_parameters(parameters)
+        self.configure_monitor_service()
+        restart = reactive.flags.is_flag_set(MYSQL_ROUTER_RESTART_REQUIRED)
+        for router in self.router_instances:
+            # Additional instances are configured once bootstrapped, see
+            # configure_router_instances
+            if router.instance_index and not router.router_started:
+                continue
+            unit_changes = router.update_systemd_unit()
+            changes = (router.configure_rest_api() +
+                       router.update_config_parameters(
+                           router._get_config_parameters()) +
+                       unit_changes)
+            # Only instance 0 is bootstrapped again by the charm
+            router.apply_config_changes(
+                changes, restart=restart and not router.instance_index)
+        if reactive.flags.is_flag_set(MYSQL_ROUTER_STARTED):
+            self.configure_router_instances()
+        self.configure_exporter_service()
+
+    def apply_config_changes(self, changes, restart=False):
+        """Apply changed configuration parameters to the running router.
+
+        Take the cheapest action which is sufficient for every changed
+        parameter, see PARAMETER_CHANGE_ACTIONS, and record it in unitdata.
+
+        :param changes: Changed parameters as (heading, parameter) tuples
+        :type changes: List[Tuple[str, str]]
+        :param restart: Restart regardless of the changed parameters
+        :type restart: bool
+        :side effect: May restart the mysql-router service(s)
+        :returns: The action taken, one of CHANGE_ACTIONS
+        :rtype: str
+        """
+        changes = list(changes)
+        if not changes and not restart:
+            return CHANGE_NONE
+
+        if restart:
+            action = CHANGE_RESTART
+            self.restart_reason = "bootstrap"
+            ch_core.hookenv.log(
+                "mysqlrouter was bootstrapped again; applying via {}"
+                .format(action), "INFO")
+        else:
+            action = classify_config_changes(changes)
+            self.restart_reason = "config-changed: {}".format(
+                ", ".join("{}.{}".format(*c) for c in changes))
+            ch_core.hookenv.log(
+                "mysqlrouter.conf parameters changed: {}; applying via {}"
+                .format(", ".join("[{}] {}".format(*c) for c in changes),
+                        action),
+                "INFO")
+        if action == CHANGE_RESTART:
+            self.custom_restart_function(self.name)
+        if restart:
+            # The router now runs with the bootstrapped configuration
+            reactive.flags.clear_flag(MYSQL_ROUTER_RESTART_REQUIRED)
+        ch_core.unitdata.kv().set(
+            self.unitdata_key(CONFIG_CHANGE_ACTION_KEY), {
+                "action": action,
+                "changes": ["{}.{}".format(*c) for c in changes]})
+        return action
 
     def config_cleanup(self):
-        """Cleanup configuration files."""
+        """Cleanup configuration files of the router instances."""
         ch_core.hookenv.log(
             "Cleaning up (removing) existing configuration files", "INFO")
-        if os.path.exists(self.mysqlrouter_working_dir):
-            try:
-                shutil.rmtree(self.mysqlrouter_working_dir)
-            except Exception as e:
+        for router in self.router_instances:
+            working_dir = router.mysqlrouter_working_dir
+            if os.path.exists(working_dir):
+                try:
+                    shutil.rmtree(working_dir)
+                except Exception as e:
+                    ch_core.hookenv.log(
+                        f"cannot remove configuration files: {e}", "WARNING")
+            else:
                 ch_core.hookenv.log(
-                    f"cannot remove configuration files: {e}", "WARNING")
-        else:
-            ch_core.hookenv.log(
-                "mysqlrouter config dir does not exist. "
-                "Skipping removal.", "DEBUG")
+                    "mysqlrouter config dir does not exist. "
+                    "Skipping removal.", "DEBUG")
 
     def _get_config_parameters(self):
 
@@ -832,11 +2589,21 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
             },
         }
 
+        capabilities = self.router_capabilities
+        router_config = self.router_config
+        # The router default (disabled) is only written where it replaces an
+        # earlier value, so that an upgrade does not change every config
+        if capabilities["supports_gr_notifications"] and (
+                self.options.use_gr_notifications or
+                router_config.has_parameter(
+                    METADATA_CACHE_SECTION, "use_gr_notifications")):
+            _parameters[METADATA_CACHE_SECTION]["use_gr_notifications"] = (
+                "1" if self.options.use_gr_notifications else "0")
+
         # mysql-router pkg version check
         # < 8.0.23, don't add client_ssl_mode
-        if ch_core.host.cmp_pkgrevno("mysql-router", "8.0.23") >= 0:
-            config = configparser.ConfigParser()
-            config.read(self.mysqlrouter_conf)
+        if capabilities["supports_client_ssl_mode"]:
+            config = router_config.parser
             if 'client_ssl_cert' in config['DEFAULT']:
                 if self.ssl_ca:
                     ch_core.hookenv.log("TLS mode PASSTHROUGH", "DEBUG")
@@ -849,7 +2616,7 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                                     "delete client_ssl_mode", "DEBUG")
                 _parameters["DEFAULT"].pop("client_ssl_mode", None)
 
-        if ch_core.host.cmp_pkgrevno('mysql-router', '8.0.27') >= 0:
+        if capabilities["supports_max_total_connections"]:
             _parameters[DEFAULT_SECTION]["max_total_connections"] = str(
                 self.options.max_connections
             )
@@ -858,16 +2625,400 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                 self.options.max_connections
             )
 
+        if capabilities["supports_connection_pool"]:
+            pool = self._get_connection_pool_parameters()
+            if pool:
+                _parameters[CONNECTION_POOL_SECTION] = pool
+
+        if capabilities["supports_io_threads"]:
+            threads = self.io_threads
+            if threads:
+                _parameters[IO_SECTION] = {"threads": str(threads)}
+
+        sharing = {}
+        if capabilities["supports_connection_sharing"]:
+            sharing = self._get_connection_sharing_parameters(
+                _parameters[DEFAULT_SECTION].get("client_ssl_mode"))
+
+        for heading in self.routing_sections:
+            routing = self._get_routing_parameters(heading)
+            # Connection sharing is only implemented for the classic protocol
+            if heading in (ROUTING_RW_SECTION, ROUTING_RO_SECTION):
+                routing = dict(routing, **sharing)
+                # Leave the router default (disabled) alone rather than
+                # changing every mysqlrouter.conf, and restarting every
+                # router, on upgrade
+                if (routing.get("connection_sharing") == "0" and
+                        not router_config.has_parameter(
+                            heading, "connection_sharing")):
+                    routing.pop("connection_sharing")
+            if routing:
+                _parameters[heading] = routing
+
+        if self.rest_api_port is not None:
+            _parameters.update(self._get_rest_api_parameters())
+
+        return _parameters
+
+    @property
+    def rest_api_port(self):
+        """Determine the REST API port of this instance from rest-api-port.
+
+        Instance N listens on rest-api-port + N. The REST API is only managed
+        where the bootstrap can disable the router's default one.
+
+        :returns: Port or None if the REST API is disabled
+        :rtype: Union[int, None]
+        """
+        port = self.options.rest_api_port
+        if not port or not self.router_capabilities["supports_disable_rest"]:
+            return None
+        return int(port) + self.instance_index
+
+    @property
+    def rest_api_password(self):
+        """Get the REST API password of the exporter, generated once.
+
+        The password is only kept in exporter_password_file, readable by the
+        mysql user alone, from which the exporter reads it.
+
+        :side effect: Writes exporter_password_file if missing
+        :returns: Password
+        :rtype: str
+        """
+        try:
+            with open(self.exporter_password_file) as f:
+                password = f.read().strip()
+        except FileNotFoundError:
+            password = None
+        if not password:
+            password = ch_core.host.pwgen(32)
+            ch_core.host.write_file(
+                self.exporter_password_file, password,
+                owner=self.mysqlrouter_user, group=self.mysqlrouter_group,
+                perms=0o600)
+        return password
+
+    def _get_rest_api_parameters(self):
+        """Determine the REST API sections of this instance.
+
+        :returns: Parameters of the REST API sections
+        :rtype: Dict[str, Dict[str, str]]
+        """
+        require_realm = {"require_realm": REST_API_REALM}
+        return {
+            "http_server": {
+                "bind_address": "127.0.0.1",
+                "port": str(self.rest_api_port),
+                "ssl": "0",
+            },
+            REST_API_BACKEND_SECTION: {
+                "backend": "file",
+                "filename": self.rest_api_passwd_file,
+            },
+            REST_API_REALM_SECTION: {
+                "backend": REST_API_REALM,
+                "method": "basic",
+                "name": REST_API_REALM,
+            },
+            "rest_api": {},
+            "rest_router": require_realm,
+            "rest_routing": require_realm,
+            "rest_metadata_cache": require_realm,
+        }
+
+    def configure_rest_api(self):
+        """Set up or remove the REST API of this instance, see rest-api-port.
+
+        The REST API user file is written before the REST API sections, see
+        _get_rest_api_parameters, as the router refuses to start without it.
+
+        :side effect: Writes the mysqlrouter_passwd file or removes the REST
+                      API sections from mysqlrouter.conf
+        :returns: Changed parameters as (heading, parameter) tuples
+        :rtype: List[Tuple[str, str]]
+        """
+        if not os.path.exists(self.mysqlrouter_conf):
+            return []
+        if self.rest_api_port is None:
+            return self.remove_rest_api_sections()
+        if not os.path.exists(self.rest_api_passwd_file):
+            subprocess.check_output(
+                [self.mysqlrouter_passwd_bin, "set",
+                 self.rest_api_passwd_file, REST_API_USER],
+                input="{}\n".format(self.rest_api_password).encode("UTF-8"),
+                stderr=subprocess.STDOUT)
+            shutil.chown(self.rest_api_passwd_file,
+                         self.mysqlrouter_user, self.mysqlrouter_group)
+            os.chmod(self.rest_api_passwd_file, 0o600)
+        return []
+
+    def remove_rest_api_sections(self):
+        """Remove the REST API sections from mysqlrouter.conf.
+
+        Nothing is removed unless the charm's REST API realm is configured so
+        that REST API sections written by the bootstrap are kept.
+
+        :side effect: Writes the mysqlrouter.conf file
+        :returns: Removed sections as (heading, "") tuples
+        :rtype: List[Tuple[str, str]]
+        """
+        router_config = self.router_config
+        config = router_config.parser
+        if not config.has_section(REST_API_REALM_SECTION):
+            return []
+        removed = [(heading, "") for heading in REST_API_SECTIONS
+                   if config.remove_section(heading)]
+        router_config.sections.invalidate()
+        if not self.write_mysqlrouter_conf(config):
+            return []
+        return removed
+
+    @property
+    def router_cpus(self):
+        """Determine the number of CPUs the router service may use.
+
+        The CPUs available to the unit, see available_cpus, further limited
+        by the cpu-affinity and cpu-quota resource controls of the service.
+
+        :returns: Number of CPUs
+        :rtype: int
+        """
+        cpus = available_cpus()
+        properties = self.systemd_unit_properties
+        affinity = properties.get("CPUAffinity")
+        if affinity:
+            cpus = min(cpus, max(1, cpu_list_count(affinity)))
+        quota = properties.get("CPUQuota")
+        if quota:
+            cpus = min(cpus, math.ceil(int(quota.rstrip("%")) / 100))
+        return cpus
+
+    @property
+    def io_threads(self):
+        """Determine the number of mysqlrouter I/O threads from io-threads.
+
+        :returns: Number of threads or None to leave the router default in
+                  place, also when io-threads is invalid
+        :rtype: Union[int, None]
+        """
+        value = (self.options.io_threads or "").strip()
+        if not value:
+            return None
+        if value == "auto":
+            return min(self.router_cpus, MAX_IO_THREADS)
+        try:
+            threads = int(value)
+        except ValueError:
+            threads = None
+        if threads is None or not 1 <= threads <= MAX_IO_THREADS:
+            ch_core.hookenv.log(
+                "Ignoring invalid io-threads {}".format(value), "WARNING")
+            return None
+        return threads
+
+    def _get_connection_pool_parameters(self):
+        """Determine the parameters of the connection_pool section.
+
+        Negative option values leave the router's defaults in place.
+
+        :returns: Parameters
+        :rtype: Dict[str, str]
+        """
+        _parameters = {}
+        for option in ("max_idle_server_connections", "idle_timeout"):
+            value = getattr(self.options, option)
+            if value is not None and value >= 0:
+                _parameters[option] = str(value)
+        return _parameters
+
+    def _get_connection_sharing_parameters(self, client_ssl_mode):
+        """Determine the connection sharing parameters of the classic routes.
+
+        The router cannot share connections whose TLS session it does not
+        terminate, so sharing is disabled with client_ssl_mode PASSTHROUGH.
+
+        :param client_ssl_mode: Managed client_ssl_mode, if any
+        :type client_ssl_mode: Union[str, None]
+        :returns: Parameters
+        :rtype: Dict[str, str]
+        """
+        enabled = self.options.connection_sharing
+        if enabled and client_ssl_mode == "PASSTHROUGH":
+            ch_core.hookenv.log(
+                "Connection sharing is not possible with client_ssl_mode "
+                "PASSTHROUGH, disabling it", "WARNING")
+            enabled = False
+        _parameters = {"connection_sharing": "1" if enabled else "0"}
+        delay = self.options.connection_sharing_delay
+        if enabled and delay is not None and delay >= 0:
+            _parameters["connection_sharing_delay"] = str(delay)
         return _parameters
 
+    def _get_routing_parameters(self, heading):
+        """Determine the parameters of a managed routing section.
+
+        See routing_sections. Invalid option values are left out so that the
+        router keeps its current value, see invalid_config_options.
+
+        :param heading: Routing section search key
+        :type heading: str
+        :returns: Parameters
+        :rtype: Dict[str, str]
+        """
+        _parameters = {}
+        option, valid = self._routing_strategy_option(heading)
+        strategy = getattr(self.options, option)
+        if strategy:
+            if strategy in valid:
+                _parameters["routing_strategy"] = strategy
+            else:
+                ch_core.hookenv.log(
+                    "Ignoring invalid {} {}".format(option, strategy),
+                    "WARNING")
+        for option in ROUTING_PARAMETER_LIMITS:
+            value = getattr(self.options, option)
+            if self._routing_parameter_valid(option, value):
+                if value is not None and value >= 0:
+                    _parameters[option] = str(value)
+            else:
+                ch_core.hookenv.log(
+                    "Ignoring invalid {} {}".format(option, value),
+                    "WARNING")
+        return _parameters
+
+    @staticmethod
+    def _routing_parameter_valid(option, value):
+        """Check the value of a routing parameter option.
+
+        Negative values leave the router default in place and are valid.
+
+        :param option: Option name, see ROUTING_PARAMETER_LIMITS
+        :type option: str
+        :param value: Option value
+        :type value: Union[int, None]
+        :returns: Whether the value is valid
+        :rtype: bool
+        """
+        if value is None or value < 0:
+            return True
+        low, high = ROUTING_PARAMETER_LIMITS[option]
+        return low <= value <= high
+
+    @staticmethod
+    def _routing_strategy_option(heading):
+        """Determine the routing strategy option of a routing section.
+
+        :param heading: Routing section search key
+        :type heading: str
+        :returns: Option name and its valid values
+        :rtype: Tuple[str, Tuple[str]]
+        """
+        if heading in (ROUTING_RO_SECTION, ROUTING_X_RO_SECTION):
+            return "ro_routing_strategy", RO_ROUTING_STRATEGIES
+        return "rw_routing_strategy", RW_ROUTING_STRATEGIES
+
+    def invalid_config_options(self):
+        """Determine the charm options with invalid values.
+
+        :returns: Names of the invalid options
+        :rtype: List[str]
+        """
+        invalid = []
+        for heading in (ROUTING_RW_SECTION, ROUTING_RO_SECTION):
+            option, valid = self._routing_strategy_option(heading)
+            value = getattr(self.options, option)
+            if value and value not in valid:
+                invalid.append(option)
+        for option in ROUTING_PARAMETER_LIMITS:
+            if not self._routing_parameter_valid(
+                    option, getattr(self.options, option)):
+                invalid.append(option)
+        value = (self.options.io_threads or "").strip()
+        if value and value != "auto" and not (
+                value.isdigit() and 1 <= int(value) <= MAX_IO_THREADS):
+            invalid.append("io-threads")
+        for option, (_, pattern) in SYSTEMD_RESOURCE_OPTIONS.items():
+            value = (getattr(self.options, option.replace("-", "_")) or
+                     "").strip()
+            if value and not pattern.match(value):
+                invalid.append(option)
+        port = self.options.rest_api_port
+        if port and not (
+                1 <= port <= 65536 - self.router_instance_count):
+            invalid.append("rest-api-port")
+        port = self.options.metrics_port
+        if port and not (1 <= port <= 65535 and self.options.rest_api_port):
+            invalid.append("metrics-port")
+        if port:
+            try:
+                ipaddress.ip_address(self.options.metrics_address)
+            except ValueError:
+                invalid.append("metrics-address")
+        return invalid
+
+    def check_charm_config(self):
+        """Check the values of the charm options.
+
+        :returns: Either (state, message) or (None, None)
+        :rtype: Union[tuple(str, str), tuple(None, None)]
+        """
+        invalid = self.invalid_config_options()
+        if invalid:
+            return "blocked", "Invalid config: {}".format(", ".join(invalid))
+        return None, None
+
+    def wait_for_router_ready(self, timeout=None):
+        """Wait until mysqlrouter accepts connections.
+
+        Poll the RW unix socket with an exponential backoff, starting at
+        sub-second intervals, until it accepts a connection or the time
+        budget is exhausted. The TCP ports are not polled: a connection that
+        is closed before completing a login counts towards the router's
+        max_connect_errors and would eventually get the local host blocked.
+
+        :param timeout: Time budget in seconds, defaults to the
+                        restart-ready-timeout config option
+        :type timeout: Union[float, None]
+        :returns: Measured time-to-ready in seconds or None on timeout
+        :rtype: Union[float, None]
+        """
+        if timeout is None:
+            timeout = self.options.restart_ready_timeout
+        delay = 0.05
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            if router_endpoint_ready(self.mysqlrouter_socket):
+                elapsed = time.monotonic() - start
+                ch_core.hookenv.log(
+                    "mysqlrouter ready after {:.3f}s".format(elapsed),
+                    "INFO")
+                return elapsed
+            now = time.monotonic()
+            if now >= deadline:
+                ch_core.hookenv.log(
+                    "mysqlrouter not ready after {}s".format(timeout),
+                    "WARNING")
+                return None
+            time.sleep(min(delay, deadline - now))
+            delay = min(delay * 2, 2.0)
+
+    @timed("connection-check")
     @tenacity.retry(
-        wait=tenacity.wait_fixed(10),
+        wait=wait_until_deadline(
+            tenacity.wait_exponential(multiplier=0.1, max=10)),
         retry=tenacity.retry_if_exception_type(
             mysql.MySQLdb._exceptions.OperationalError),
         reraise=True,
-        stop=tenacity.stop_after_attempt(5))
-    def retry_conection_check(self):
-        """Retry database connection check."""
+        stop=tenacity.stop_after_attempt(10) | stop_at_deadline)
+    def retry_conection_check(self, deadline=None):
+        """Retry database connection check.
+
+        :param deadline: Monotonic time after which no further attempt is
+                         made
+        :type deadline: Union[float, None]
+        """
         ch_core.hookenv.log("Checking connection through router", "DEBUG")
         # Only raise an exception if it matches
         # mysql.MySQLdb._exceptions.OperationalError error 2003 or 2013
@@ -877,19 +3028,40 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
                 self._waiting_for_initial_communication_packet_error,
                 self._cannot_connect_via_ip])
 
+    @timed("restart")
+    def custom_restart_function(self, service_name):
+        """Custom restart function for restart_on_change
+
+        Custom restart function for use in restart_on_change contexts. The
+        restart is recorded with self.restart_reason. The whole restart,
+        including its retries, is bounded by restart-ready-timeout.
+
+        :side effect: Calls service_stop and service_start on the mysql-router
+                      service(s).
+        :returns: This function is called for its side effect
+        :rtype: None
+        """
+        record_restart_event(service_name, self.restart_reason)
+        self._restart_and_check(
+            service_name,
+            deadline=time.monotonic() + self.options.restart_ready_timeout)
+
     @tenacity.retry(
         retry=tenacity.retry_if_exception_type(
             mysql.MySQLdb._exceptions.OperationalError),
         reraise=True,
-        stop=tenacity.stop_after_attempt(5))
-    def custom_restart_function(self, service_name):
-        """Tenacity retry custom restart function for restart_on_change
-
-        Custom restart function for use in restart_on_change contexts. Tenacity
-        retry enabled based on verification of connectivity.
-
+        stop=tenacity.stop_after_attempt(5) | stop_at_deadline)
+    def _restart_and_check(self, service_name, *, deadline):
+        """Tenacity retried restart and connectivity check.
+
+        :param service_name: Name of the service to restart
+        :type service_name: str
+        :param deadline: Monotonic time by which the restart has to complete
+        :type deadline: float
         :side effect: Calls service_stop and service_start on the mysql-router
                       service(s).
+        :raises: RouterNotReadyError if the router does not accept
+                 connections in time
         :returns: This function is called for its side effect
         :rtype: None
         """
@@ -898,6 +3070,11 @@ class MySQLRouterCharm(charms_openstack.charm.OpenStackCharm):
         self.service_stop(service_name)
         self.service_start(service_name)
         # In the case of the db-router service it reports itself as having
-        # started prior to being fully initialised. So when checking the
-        # connection retry a few times.
-        self.retry_conection_check()
+        # started prior to being fully initialised. So wait for it to accept
+        # connections and then check the connection, retrying a few times.
+        if self.wait_for_router_ready(
+                timeout=max(0, deadline - time.monotonic())) is None:
+            raise RouterNotReadyError(
+                "{} did not accept connections within {}s"
+                .format(service_name, self.options.restart_ready_timeout))
+        self.retry_conection_check(deadline=deadline)
@@ -0,0 +1,252 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bounded connection and query latency benchmark of a MySQL endpoint.
+
+The benchmark is driven through a connect callable returning a DB-API
+connection, e.g. a functools.partial of MySQLdb.connect, so that the same
+code measures the router's TCP ports, its unix sockets and the cluster
+directly.
+"""
+
+import concurrent.futures
+import math
+import threading
+import time
+
+
+# Query used for the round trip measurements
+QUERY = "SELECT 1"
+
+# Upper bounds of the benchmark parameters
+MAX_ITERATIONS = 10000
+MAX_CONCURRENCY = 64
+
+
+def percentile(values, pct):
+    """Nearest rank percentile.
+
+    :param values: Values
+    :type values: Iterable[float]
+    :param pct: Percentile between 0 and 100
+    :type pct: float
+    :returns: The percentile or None if there are no values
+    :rtype: Union[float, None]
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+
+def summarise(latencies, errors=0):
+    """Summarise latencies.
+
+    :param latencies: Latencies in seconds
+    :type latencies: List[float]
+    :param errors: Number of failed operations
+    :type errors: int
+    :returns: Count, errors and p50, p95, p99 and max latency in milliseconds
+    :rtype: dict
+    """
+    def _ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "max_ms": _ms(max(latencies) if latencies else None),
+    }
+
+
+def _query(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(QUERY)
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def measure_connect(connect, iterations, deadline):
+    """Measure the latency of opening a connection.
+
+    :param connect: Callable returning a new DB-API connection
+    :type connect: Callable
+    :param iterations: Number of connections to open
+    :type iterations: int
+    :param deadline: time.monotonic() value after which to stop early
+    :type deadline: float
+    :returns: Latencies in seconds, number of errors and the last error
+    :rtype: Tuple[List[float], int, Union[str, None]]
+    """
+    latencies = []
+    errors = 0
+    last_error = None
+    for _ in range(iterations):
+        if time.monotonic() > deadline:
+            break
+        start = time.monotonic()
+        try:
+            connection = connect()
+        except Exception as e:
+            errors += 1
+            last_error = str(e)
+            continue
+        latencies.append(time.monotonic() - start)
+        connection.close()
+    return latencies, errors, last_error
+
+
+def measure_queries(connect, iterations, deadline):
+    """Measure the round trip latency of a simple query on one connection.
+
+    :param connect: Callable returning a new DB-API connection
+    :type connect: Callable
+    :param iterations: Number of queries to run
+    :type iterations: int
+    :param deadline: time.monotonic() value after which to stop early
+    :type deadline: float
+    :returns: Latencies in seconds, number of errors and the last error
+    :rtype: Tuple[List[float], int, Union[str, None]]
+    """
+    latencies = []
+    errors = 0
+    last_error = None
+    try:
+        connection = connect()
+    except Exception as e:
+        return latencies, 1, str(e)
+    try:
+        for _ in range(iterations):
+            if time.monotonic() > deadline:
+                break
+            start = time.monotonic()
+            try:
+                _query(connection)
+            except Exception as e:
+                errors += 1
+                last_error = str(e)
+                continue
+            latencies.append(time.monotonic() - start)
+    finally:
+        connection.close()
+    return latencies, errors, last_error
+
+
+def measure_throughput(connect, iterations, concurrency, deadline):
+    """Measure connections per second at a given concurrency.
+
+    Each operation opens a connection, runs a simple query and closes it.
+
+    :param connect: Callable returning a new DB-API connection
+    :type connect: Callable
+    :param iterations: Total number of operations
+    :type iterations: int
+    :param concurrency: Number of concurrent workers
+    :type concurrency: int
+    :param deadline: time.monotonic() value after which to stop early
+    :type deadline: float
+    :returns: Operations per second, number of errors and the last error
+    :rtype: Tuple[float, int, Union[str, None]]
+    """
+    lock = threading.Lock()
+    state = {"remaining": iterations, "done": 0, "errors": 0,
+             "last_error": None}
+
+    def _worker():
+        while time.monotonic() <= deadline:
+            with lock:
+                if state["remaining"] <= 0:
+                    return
+                state["remaining"] -= 1
+            try:
+                connection = connect()
+                try:
+                    _query(connection)
+                finally:
+                    connection.close()
+            except Exception as e:
+                with lock:
+                    state["errors"] += 1
+                    state["last_error"] = str(e)
+                continue
+            with lock:
+                state["done"] += 1
+
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        for future in [executor.submit(_worker)
+                       for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.monotonic() - start
+    rate = round(state["done"] / elapsed, 1) if elapsed > 0 else None
+    return rate, state["errors"], state["last_error"]
+
+
+def benchmark(connect, iterations=100, concurrency=4, time_limit=60):
+    """Benchmark an endpoint.
+
+    :param connect: Callable returning a new DB-API connection
+    :type connect: Callable
+    :param iterations: Number of operations per measurement
+    :type iterations: int
+    :param concurrency: Number of concurrent workers for the throughput
+                        measurement
+    :type concurrency: int
+    :param time_limit: Time budget in seconds for the whole endpoint
+    :type time_limit: float
+    :raises: ValueError on out of range parameters
+    :returns: Connect and query latency summaries and connections per
+              second
+    :rtype: dict
+    """
+    if not 1 <= iterations <= MAX_ITERATIONS:
+        raise ValueError(
+            "iterations must be between 1 and {}".format(MAX_ITERATIONS))
+    if not 1 <= concurrency <= MAX_CONCURRENCY:
+        raise ValueError(
+            "concurrency must be between 1 and {}".format(MAX_CONCURRENCY))
+
+    deadline = time.monotonic() + time_limit
+    result = {}
+    last_errors = []
+
+    latencies, errors, last_error = measure_connect(
+        connect, iterations, deadline)
+    result["connect"] = summarise(latencies, errors)
+    last_errors.append(last_error)
+
+    latencies, errors, last_error = measure_queries(
+        connect, iterations, deadline)
+    result["query"] = summarise(latencies, errors)
+    last_errors.append(last_error)
+
+    rate, errors, last_error = measure_throughput(
+        connect, iterations, concurrency, deadline)
+    result["throughput"] = {
+        "concurrency": concurrency,
+        "connections_per_second": rate,
+        "errors": errors,
+    }
+    last_errors.append(last_error)
+
+    result["timed_out"] = time.monotonic() > deadline
+    errors = [e for e in last_errors if e]
+    if errors:
+        result["last_error"] = errors[-1]
+    return result
@@ -0,0 +1,355 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Prometheus exporter of the MySQL Router REST API.
+
+Run by the charm managed <application>-exporter systemd service:
+
+    python3 -m charm.openstack.router_exporter \\
+        --address 127.0.0.1 --port 9152 --user exporter \\
+        --password-file /var/lib/mysql/<application>-exporter.passwd \\
+        <application>=127.0.0.1:8443
+
+Every request of /metrics scrapes the REST API of each router instance and
+returns route, connection and metadata cache metrics in the Prometheus text
+format, labelled with the router instance. Only the standard library is used
+as this runs outside of the charm's virtualenv.
+"""
+
+import argparse
+import base64
+import datetime
+import http.client
+import http.server
+import json
+import socket
+import sys
+import time
+import urllib.parse
+
+import charm.openstack.router_monitor as router_monitor
+
+
+# Path prefix of the REST API version served by mysqlrouter 8.0
+REST_API_PATH = "/api/20190715"
+
+# Exported metric families: type and help text
+METRICS = {
+    "mysqlrouter_up": (
+        "gauge", "Whether the router REST API could be scraped."),
+    "mysqlrouter_scrape_duration_seconds": (
+        "gauge", "Time taken to scrape the router REST API."),
+    "mysqlrouter_info": (
+        "gauge", "Router version, always 1."),
+    "mysqlrouter_start_time_seconds": (
+        "gauge", "Start time of the router since the epoch."),
+    "mysqlrouter_route_up": (
+        "gauge", "Whether the route is alive."),
+    "mysqlrouter_route_active_connections": (
+        "gauge", "Client connections currently open on the route."),
+    "mysqlrouter_route_connections_total": (
+        "counter", "Client connections accepted by the route."),
+    "mysqlrouter_route_blocked_hosts": (
+        "gauge", "Hosts blocked by the route after max_connect_errors."),
+    "mysqlrouter_metadata_refresh_succeeded_total": (
+        "counter", "Successful refreshes of the cluster metadata."),
+    "mysqlrouter_metadata_refresh_failed_total": (
+        "counter", "Failed refreshes of the cluster metadata."),
+    "mysqlrouter_metadata_last_refresh_succeeded_timestamp_seconds": (
+        "gauge", "Time of the last successful metadata refresh."),
+    "mysqlrouter_metadata_last_refresh_failed_timestamp_seconds": (
+        "gauge", "Time of the last failed metadata refresh."),
+}
+
+
+class RestError(Exception):
+    """Unexpected response of the REST API."""
+
+
+def parse_timestamp(value):
+    """Parse a REST API timestamp, e.g. 2019-07-15T10:38:31.123456Z.
+
+    :param value: Timestamp
+    :type value: Union[str, None]
+    :returns: Seconds since the epoch or None if unset or unknown
+    :rtype: Union[float, None]
+    """
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"):
+        try:
+            parsed = datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.replace(tzinfo=datetime.timezone.utc).timestamp()
+    return None
+
+
+class RestClient(object):
+    """Client of the router REST API.
+
+    A single keep-alive connection is used for all requests of a scrape.
+    """
+
+    def __init__(self, address, port, user, password, timeout):
+        self.connection = http.client.HTTPConnection(
+            address, port, timeout=timeout)
+        credentials = "{}:{}".format(user, password).encode("UTF-8")
+        self.headers = {
+            "Authorization": "Basic {}".format(
+                base64.b64encode(credentials).decode("ascii")),
+            "Accept": "application/json",
+        }
+
+    def get(self, path):
+        """Get a REST API resource.
+
+        :param path: Path below REST_API_PATH
+        :type path: str
+        :raises: RestError on a failed request, OSError on connection errors
+        :returns: Decoded resource
+        :rtype: dict
+        """
+        self.connection.request(
+            "GET", REST_API_PATH + path, headers=self.headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RestError("GET {} returned {}".format(path, response.status))
+        try:
+            return json.loads(body.decode("UTF-8"))
+        except ValueError:
+            raise RestError("GET {} returned invalid JSON".format(path))
+
+    def close(self):
+        self.connection.close()
+
+
+def _quote(name):
+    return urllib.parse.quote(name, safe="")
+
+
+def collect(client):
+    """Collect the metrics of a router.
+
+    :param client: REST API client of the router
+    :type client: RestClient
+    :raises: RestError or OSError if the REST API could not be scraped
+    :returns: Samples as (metric, labels, value) tuples
+    :rtype: List[Tuple[str, dict, float]]
+    """
+    samples = []
+    status = client.get("/router/status")
+    samples.append(("mysqlrouter_info",
+                    {"version": str(status.get("version", ""))}, 1))
+    started = parse_timestamp(status.get("timeStarted"))
+    if started is not None:
+        samples.append(("mysqlrouter_start_time_seconds", {}, started))
+
+    for item in client.get("/routes").get("items", []):
+        route = item["name"]
+        labels = {"route": route}
+        health = client.get("/routes/{}/health".format(_quote(route)))
+        samples.append(("mysqlrouter_route_up", labels,
+                        1 if health.get("isAlive") else 0))
+        route_status = client.get("/routes/{}/status".format(_quote(route)))
+        for metric, key in (
+                ("mysqlrouter_route_active_connections", "activeConnections"),
+                ("mysqlrouter_route_connections_total", "totalConnections"),
+                ("mysqlrouter_route_blocked_hosts", "blockedHosts")):
+            samples.append((metric, labels, route_status.get(key, 0)))
+
+    for item in client.get("/metadata").get("items", []):
+        cluster = item["name"]
+        labels = {"metadata": cluster}
+        cache = client.get("/metadata/{}/status".format(_quote(cluster)))
+        samples.append(("mysqlrouter_metadata_refresh_succeeded_total",
+                        labels, cache.get("refreshSucceeded", 0)))
+        samples.append(("mysqlrouter_metadata_refresh_failed_total",
+                        labels, cache.get("refreshFailed", 0)))
+        for metric, key in (
+                ("mysqlrouter_metadata_last_refresh_succeeded_"
+                 "timestamp_seconds", "timeLastRefreshSucceeded"),
+                ("mysqlrouter_metadata_last_refresh_failed_"
+                 "timestamp_seconds", "timeLastRefreshFailed")):
+            value = parse_timestamp(cache.get(key))
+            if value is not None:
+                samples.append((metric, labels, value))
+    return samples
+
+
+def scrape(targets, user, password, timeout):
+    """Scrape all router instances.
+
+    A router whose REST API can not be scraped is reported with
+    mysqlrouter_up 0 and without any other metrics.
+
+    :param targets: REST API endpoints as (router, address, port) tuples
+    :type targets: List[Tuple[str, str, int]]
+    :param user: REST API user
+    :type user: str
+    :param password: REST API password
+    :type password: str
+    :param timeout: Timeout of each request in seconds
+    :type timeout: float
+    :returns: Samples as (metric, labels, value) tuples
+    :rtype: List[Tuple[str, dict, float]]
+    """
+    samples = []
+    for router, address, port in targets:
+        start = time.monotonic()
+        client = RestClient(address, port, user, password, timeout)
+        try:
+            collected = collect(client)
+            up = 1
+        except (OSError, RestError, http.client.HTTPException,
+                KeyError) as e:
+            print("Unable to scrape {}: {}".format(router, e),
+                  file=sys.stderr)
+            collected = []
+            up = 0
+        finally:
+            client.close()
+        samples.append(("mysqlrouter_up", {"router": router}, up))
+        samples.append(("mysqlrouter_scrape_duration_seconds",
+                        {"router": router},
+                        round(time.monotonic() - start, 6)))
+        samples.extend((metric, dict(labels, router=router), value)
+                       for metric, labels, value in collected)
+    return samples
+
+
+def _escape(value):
+    return (str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def format_metrics(samples):
+    """Format samples in the Prometheus text exposition format.
+
+    :param samples: Samples as (metric, labels, value) tuples
+    :type samples: List[Tuple[str, dict, float]]
+    :returns: Metrics, grouped by family in the order of METRICS
+    :rtype: str
+    """
+    families = {}
+    for metric, labels, value in samples:
+        families.setdefault(metric, []).append((labels, value))
+    lines = []
+    for metric, (metric_type, text) in METRICS.items():
+        if metric not in families:
+            continue
+        lines.append("# HELP {} {}".format(metric, text))
+        lines.append("# TYPE {} {}".format(metric, metric_type))
+        for labels, value in families[metric]:
+            label_text = ",".join(
+                '{}="{}"'.format(k, _escape(v))
+                for k, v in sorted(labels.items()))
+            lines.append("{}{{{}}} {}".format(metric, label_text, value))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Serve /metrics, scraping the routers on every request."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        exporter = self.server.exporter
+        body = format_metrics(scrape(
+            exporter["targets"], exporter["user"], exporter["password"],
+            exporter["timeout"])).encode("UTF-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Every scrape would be logged to the journal otherwise
+        pass
+
+
+class MetricsServer(http.server.ThreadingHTTPServer):
+    """Metrics HTTP server listening on an IPv4 address."""
+
+    daemon_threads = True
+
+
+class MetricsServer6(MetricsServer):
+    """Metrics HTTP server listening on an IPv6 address."""
+
+    address_family = socket.AF_INET6
+
+
+def make_server(address, port, targets, user, password, timeout=5.0):
+    """Create the metrics HTTP server.
+
+    :param address: IPv4 or IPv6 address to listen on, e.g. 0.0.0.0 or ::
+                    for all addresses
+    :type address: str
+    :param port: Port to listen on, 0 for an ephemeral port
+    :type port: int
+    :param targets: REST API endpoints as (router, address, port) tuples
+    :type targets: List[Tuple[str, str, int]]
+    :param user: REST API user
+    :type user: str
+    :param password: REST API password
+    :type password: str
+    :param timeout: Timeout of each REST API request in seconds
+    :type timeout: float
+    :returns: The server, call serve_forever() to run it
+    :rtype: MetricsServer
+    """
+    server_class = MetricsServer6 if ":" in address else MetricsServer
+    server = server_class((address, port), MetricsHandler)
+    server.exporter = {"targets": targets, "user": user,
+                       "password": password, "timeout": timeout}
+    return server
+
+
+def parse_target(spec):
+    """Parse a REST API endpoint specification.
+
+    :param spec: router=address:port
+    :type spec: str
+    :raises: ValueError on an invalid specification
+    :returns: Tuple of (router, address, port)
+    :rtype: Tuple[str, str, int]
+    """
+    target = router_monitor.parse_endpoint(spec)
+    if target[2] is None:
+        raise ValueError("Invalid endpoint {}".format(spec))
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password-file", required=True)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("targets", nargs="+", type=parse_target)
+    args = parser.parse_args(argv)
+
+    with open(args.password_file) as f:
+        password = f.read().strip()
+    make_server(args.address, args.port, args.targets, args.user, password,
+                args.timeout).serve_forever()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
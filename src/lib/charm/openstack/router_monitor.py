@@ -0,0 +1,183 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Background monitor of the MySQL Router routing endpoints.
+
+Run by the charm managed <application>-monitor systemd service:
+
+    python3 -m charm.openstack.router_monitor \\
+        --status-file /var/lib/mysql/<application>/monitor.json \\
+        --interval 10 rw=/var/lib/mysql/<application>/mysql.sock \\
+        ro=/var/lib/mysql/<application>/mysqlro.sock
+
+Every interval each endpoint is probed with a MySQL handshake and a compact
+status file is written atomically for the charm to read during
+update-status. Only the standard library is used as this runs outside of the
+charm's virtualenv.
+"""
+
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+
+import charm.openstack.router_probe as router_probe
+
+
+# Number of probes kept per endpoint to summarise recent history
+HISTORY_LENGTH = 30
+
+
+def parse_endpoint(spec):
+    """Parse an endpoint specification.
+
+    :param spec: name=address:port or name=/path/to/unix.sock
+    :type spec: str
+    :raises: ValueError on an invalid specification
+    :returns: Tuple of (name, address, port), port is None for unix sockets
+    :rtype: Tuple[str, str, Union[int, None]]
+    """
+    name, sep, target = spec.partition("=")
+    if not sep or not name or not target:
+        raise ValueError("Invalid endpoint {}".format(spec))
+    if target.startswith("/"):
+        return name, target, None
+    address, sep, port = target.rpartition(":")
+    if not sep:
+        raise ValueError("Invalid endpoint {}".format(spec))
+    return name, address, int(port)
+
+
+def probe_endpoint(address, port, timeout):
+    """Probe an endpoint once.
+
+    :param address: IP address or unix socket path
+    :type address: str
+    :param port: TCP port or None for a unix socket
+    :type port: Union[int, None]
+    :param timeout: Probe timeout in seconds
+    :type timeout: float
+    :returns: Probe result
+    :rtype: dict
+    """
+    start = time.monotonic()
+    try:
+        handshake = router_probe.read_handshake(address, port, timeout)
+    except (OSError, router_probe.HandshakeError) as e:
+        return {
+            "ok": False,
+            "latency_ms": round((time.monotonic() - start) * 1000, 3),
+            "error": str(e) or e.__class__.__name__,
+        }
+    return {
+        "ok": True,
+        "latency_ms": round((time.monotonic() - start) * 1000, 3),
+        "server_version": handshake["server_version"],
+    }
+
+
+def summarise(history):
+    """Summarise the probe history of an endpoint.
+
+    :param history: Probe results, oldest first
+    :type history: Iterable[dict]
+    :returns: Latest result with consecutive failures, success ratio and
+              latency statistics over the history
+    :rtype: dict
+    """
+    history = list(history)
+    summary = dict(history[-1])
+    failures = 0
+    for result in reversed(history):
+        if result["ok"]:
+            break
+        failures += 1
+    latencies = sorted(r["latency_ms"] for r in history if r["ok"])
+    summary.update({
+        "consecutive_failures": failures,
+        "probes": len(history),
+        "success_ratio": round(
+            sum(1 for r in history if r["ok"]) / len(history), 3),
+        "latency_ms_max": latencies[-1] if latencies else None,
+        "latency_ms_median": (latencies[len(latencies) // 2]
+                              if latencies else None),
+    })
+    return summary
+
+
+def write_status(path, status):
+    """Atomically write the status file.
+
+    :param path: Path of the status file
+    :type path: str
+    :param status: Status to write
+    :type status: dict
+    :returns: This function is called for its side effect
+    :rtype: None
+    """
+    tmp_path = "{}.tmp".format(path)
+    with open(tmp_path, "w") as f:
+        json.dump(status, f, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def run_once(endpoints, histories, interval, timeout):
+    """Probe all endpoints once and build the status.
+
+    :param endpoints: Endpoints as (name, address, port) tuples
+    :type endpoints: List[Tuple[str, str, Union[int, None]]]
+    :param histories: Probe history per endpoint name, updated in place
+    :type histories: Dict[str, collections.deque]
+    :param interval: Probe interval in seconds
+    :type interval: float
+    :param timeout: Probe timeout in seconds
+    :type timeout: float
+    :returns: Status
+    :rtype: dict
+    """
+    status = {"timestamp": time.time(), "interval": interval,
+              "endpoints": {}}
+    for name, address, port in endpoints:
+        history = histories.setdefault(
+            name, collections.deque(maxlen=HISTORY_LENGTH))
+        history.append(probe_endpoint(address, port, timeout))
+        status["endpoints"][name] = summarise(history)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--status-file", required=True)
+    parser.add_argument("--interval", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("endpoints", nargs="+", type=parse_endpoint)
+    args = parser.parse_args(argv)
+
+    histories = {}
+    while True:
+        start = time.monotonic()
+        status = run_once(args.endpoints, histories,
+                          args.interval, args.timeout)
+        try:
+            write_status(args.status_file, status)
+        except OSError as e:
+            print("Unable to write {}: {}".format(args.status_file, e),
+                  file=sys.stderr)
+        time.sleep(max(0, args.interval - (time.monotonic() - start)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Lightweight MySQL protocol probes of a MySQL Router endpoint.
+
+This module only depends on the standard library so that it can also be used
+outside of the charm's virtualenv.
+"""
+
+import socket
+
+
+# MySQL classic protocol constants
+PROTOCOL_VERSION = 10
+ERR_PACKET = 0xff
+HEADER_LENGTH = 4
+
+
+class HandshakeError(Exception):
+    """Raised when an endpoint does not send a valid initial handshake."""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def _recv_exact(sock, length):
+    """Receive exactly length bytes from a socket.
+
+    :param sock: Connected socket
+    :type sock: socket.socket
+    :param length: Number of bytes to receive
+    :type length: int
+    :raises: HandshakeError if the connection is closed early
+    :returns: Received bytes
+    :rtype: bytes
+    """
+    data = b""
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise HandshakeError(
+                "Connection closed after {} of {} bytes"
+                .format(len(data), length))
+        data += chunk
+    return data
+
+
+def parse_handshake(payload):
+    """Parse the payload of a MySQL initial handshake packet.
+
+    :param payload: Packet payload without the packet header
+    :type payload: bytes
+    :raises: HandshakeError if the payload is an error packet or is not a
+             protocol version 10 handshake
+    :returns: Dictionary with protocol_version, server_version and
+              connection_id
+    :rtype: dict
+    """
+    if not payload:
+        raise HandshakeError("Empty handshake packet")
+
+    if payload[0] == ERR_PACKET:
+        code = int.from_bytes(payload[1:3], "little")
+        message = payload[3:]
+        # Skip the SQL state marker and SQL state if present
+        if message[:1] == b"#":
+            message = message[6:]
+        raise HandshakeError(message.decode("UTF-8", "replace"), code=code)
+
+    if payload[0] != PROTOCOL_VERSION:
+        raise HandshakeError(
+            "Unsupported protocol version {}".format(payload[0]))
+
+    try:
+        end = payload.index(b"\0", 1)
+    except ValueError:
+        raise HandshakeError("Truncated server version")
+    connection_id = payload[end + 1:end + 5]
+    if len(connection_id) != 4:
+        raise HandshakeError("Truncated connection id")
+
+    return {
+        "protocol_version": payload[0],
+        "server_version": payload[1:end].decode("UTF-8", "replace"),
+        "connection_id": int.from_bytes(connection_id, "little"),
+    }
+
+
+def open_connection(address, port=None, timeout=5.0):
+    """Open a stream connection to a TCP or unix socket endpoint.
+
+    :param address: IP address, or path of a unix socket if port is None
+    :type address: str
+    :param port: TCP port
+    :type port: Union[int, None]
+    :param timeout: Timeout in seconds for connecting and later operations
+    :type timeout: float
+    :raises: OSError on connection failure
+    :returns: Connected socket
+    :rtype: socket.socket
+    """
+    if port is None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        target = address
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        target = (address, int(port))
+    sock.settimeout(timeout)
+    try:
+        sock.connect(target)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def read_handshake(address, port=None, timeout=5.0):
+    """Connect to an endpoint and read its MySQL initial handshake.
+
+    The connection is closed straight after the handshake has been read, no
+    authentication is attempted.
+
+    :param address: IP address, or path of a unix socket if port is None
+    :type address: str
+    :param port: TCP port
+    :type port: Union[int, None]
+    :param timeout: Timeout in seconds for connecting and reading
+    :type timeout: float
+    :raises: OSError on connection failure, HandshakeError on an invalid
+             handshake
+    :returns: Parsed handshake, see parse_handshake
+    :rtype: dict
+    """
+    sock = open_connection(address, port, timeout)
+    try:
+        header = _recv_exact(sock, HEADER_LENGTH)
+        length = int.from_bytes(header[:3], "little")
+        return parse_handshake(_recv_exact(sock, length))
+    finally:
+        sock.close()
@@ -110,6 +110,8 @@ def stop_charm():
     some cleanup.
     """
     with charm.provide_charm_instance() as instance:
+        instance.remove_monitor_service()
+        instance.remove_exporter_service()
         instance.stop_mysqlrouter()
         instance.config_cleanup()
 
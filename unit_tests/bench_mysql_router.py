@@ -0,0 +1,405 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Micro-benchmarks of the charm's hot hook paths.
+
+The charm functions are driven with synthetic shared-db relations of 1 to 500
+prefixes and with large mysqlrouter.conf files, using the same mocks as the
+unit tests. For each case the fastest time and the peak traced allocations per
+call are reported and compared with bench_baselines.json. The fastest time is
+used, not the median, as it is the least affected by a busy machine.
+
+Each function is measured warm, the steady state of a hook where the parsed
+configuration and the unitdata fingerprints are reused, and cold, where every
+call parses, diffs and writes or publishes again.
+
+This module is not collected by stestr. Run it from the top of the repository
+with the test requirements installed:
+
+    python -m unit_tests.bench_mysql_router [--update-baselines] [case ...]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+import charm.openstack.mysql_router as mysql_router
+
+import unit_tests.test_lib_charm_openstack_mysql_router as tests
+
+
+BASELINES = os.path.join(os.path.dirname(__file__), "bench_baselines.json")
+
+# Prefix counts and mysqlrouter.conf sizes, in routing sections, benchmarked
+PREFIXES = (1, 10, 100, 500)
+SECTIONS = (4, 100, 1000)
+
+# A case regresses when it allocates more than its baseline by this factor.
+# Allocations are deterministic, timings vary with the load of the machine so
+# they are allowed a larger factor which still catches complexity regressions.
+DEFAULT_TOLERANCE = 1.5
+DEFAULT_TIME_TOLERANCE = 3.0
+
+
+class FakeDBRouter(object):
+    """Minimal db-router endpoint, cheaper than a MagicMock per call."""
+
+    def __init__(self, prefixes):
+        self.prefixes = prefixes
+        relation = mock.MagicMock()
+        relation.relation_id = "db-router:1"
+        self.relations = [relation]
+
+    def configure_proxy_db(self, database, username, hostname, prefix=None):
+        pass
+
+    def get_prefixes(self):
+        return self.prefixes
+
+    def password(self, prefix=None):
+        return json.dumps("password-{}".format(prefix))
+
+    def allowed_units(self, prefix=None):
+        return json.dumps(["mysql-router/0"])
+
+    def wait_timeout(self):
+        return "3600"
+
+    def ssl_ca(self):
+        return None
+
+    def db_host(self):
+        return json.dumps("10.0.0.10")
+
+
+class FakeJoinedUnits(list):
+
+    def __init__(self, units, received):
+        super().__init__(units)
+        self.received = received
+
+
+class FakeSharedDB(object):
+    """Minimal shared-db endpoint with a single principal unit."""
+
+    def __init__(self, prefixes):
+        relation = mock.MagicMock()
+        relation.relation_id = "shared-db:2"
+        unit = mock.MagicMock()
+        unit.unit_name = "app/0"
+        unit.relation = relation
+        received = {}
+        for prefix in prefixes:
+            received.update({
+                "{}_database".format(prefix): prefix,
+                "{}_username".format(prefix): prefix,
+                "{}_hostname".format(prefix): "10.0.1.10",
+            })
+        self.all_joined_units = FakeJoinedUnits([unit], received)
+        self.relations = {relation.relation_id: relation}
+
+    def set_db_connection_info(self, relation_id, db_host, password,
+                               **kwargs):
+        pass
+
+
+def prefixes(count):
+    return ["db{}".format(i) for i in range(count)]
+
+
+def write_router_conf(path, sections):
+    """Write a bootstrapped looking mysqlrouter.conf.
+
+    :param path: Path of the file
+    :type path: str
+    :param sections: Number of routing sections
+    :type sections: int
+    """
+    lines = ["[DEFAULT]", "name=bench", "user=mysql",
+             "unknown_config_option=warning", "",
+             "[logger]", "level=INFO", "",
+             "[metadata_cache:jujuCluster]", "cluster_type=gr",
+             "router_id=1", "user=mysql_router1_bench", "ttl=5", ""]
+    suffixes = ("rw", "ro", "x_rw", "x_ro")
+    for i in range(sections):
+        heading = "[routing:jujuCluster{}_{}]".format(
+            i // len(suffixes), suffixes[i % len(suffixes)])
+        lines += [heading,
+                  "bind_address=127.0.0.1",
+                  "bind_port={}".format(3306 + i),
+                  "destinations=metadata-cache://jujuCluster/?role=PRIMARY",
+                  "routing_strategy=first-available",
+                  "protocol=classic", ""]
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+
+def measure(func, repeat):
+    """Measure a callable.
+
+    :param func: Callable to measure
+    :type func: Callable
+    :param repeat: Number of timed calls
+    :type repeat: int
+    :returns: Fastest time per call in microseconds and peak traced memory of
+              a single call in KiB
+    :rtype: dict
+    """
+    # Warm up imports and caches, cold cases reset their state in func
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "time_us": round(min(timings) * 1e6, 1),
+        "peak_kib": round((peak - baseline) / 1024, 1),
+    }
+
+
+class Bench(object):
+    """Benchmark cases sharing the unit test mocks."""
+
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.patches = []
+
+    def patch(self, *args, **kwargs):
+        patcher = mock.patch.object(*args, **kwargs)
+        self.patches.append(patcher)
+        return patcher.start()
+
+    def __enter__(self):
+        self.kv = tests.FakeKV()
+        self.patch(mysql_router.ch_core.unitdata, "kv", return_value=self.kv)
+        self.patch(mysql_router.ch_core.hookenv, "log")
+        self.patch(mysql_router.ch_core.hookenv, "local_unit",
+                   return_value="mysql-router/0")
+        self.patch(mysql_router.ch_core.host, "cmp_pkgrevno", return_value=1)
+        self.patch(mysql_router.mysql, "get_db_data",
+                   side_effect=lambda data, unprefixed=None: (
+                       tests.TestMySQLRouterCharm._fake_get_db_data(
+                           None, data, unprefixed)))
+        self.patch(mysql_router.MySQLRouterCharm, "mysqlrouter_working_dir",
+                   new_callable=mock.PropertyMock,
+                   return_value=self.workdir)
+        self.patch(mysql_router.MySQLRouterCharm, "db_router_endpoint",
+                   new_callable=mock.PropertyMock,
+                   return_value=FakeDBRouter([]))
+        return self
+
+    def __exit__(self, *args):
+        for patcher in reversed(self.patches):
+            patcher.stop()
+
+    def charm(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.ttl = 5
+        mrc.options.auth_cache_ttl = -1
+        mrc.options.auth_cache_refresh_interval = 2
+        mrc.options.max_connections = 1000
+        mrc.options.debug = False
+        mrc.options.use_gr_notifications = False
+        mrc.options.base_port = 3306
+        mrc.options.publish_ro_socket = False
+        mrc.options.publish_x_protocol = False
+        mrc.options.router_instances = 1
+        mrc.options.rw_routing_strategy = ""
+        mrc.options.ro_routing_strategy = ""
+        mrc.options.max_idle_server_connections = -1
+        mrc.options.idle_timeout = -1
+        mrc.options.connection_sharing = False
+        mrc.options.connection_sharing_delay = -1
+        mrc.options.connect_timeout = -1
+        mrc.options.client_connect_timeout = -1
+        mrc.options.max_connect_errors = -1
+        mrc.options.io_threads = ""
+        mrc.options.rest_api_port = 0
+        return mrc
+
+    def cases(self):
+        """Yield (name, setup) for every case.
+
+        setup returns the callable to measure.
+        """
+        for cold in (False, True):
+            suffix = ",cold" if cold else ""
+            for count in SECTIONS:
+                yield ("get_config_parameters[sections={}{}]"
+                       .format(count, suffix),
+                       lambda count=count, cold=cold:
+                       self.get_config_parameters(count, cold))
+                yield ("update_config_parameters[sections={}{}]"
+                       .format(count, suffix),
+                       lambda count=count, cold=cold:
+                       self.update_config_parameters(count, cold))
+            for count in PREFIXES:
+                yield ("proxy_db_and_user_requests[prefixes={}{}]"
+                       .format(count, suffix),
+                       lambda count=count, cold=cold:
+                       self.requests(count, cold))
+                yield ("proxy_db_and_user_responses[prefixes={}{}]"
+                       .format(count, suffix),
+                       lambda count=count, cold=cold:
+                       self.responses(count, cold))
+
+    def get_config_parameters(self, sections, cold):
+        write_router_conf(
+            os.path.join(self.workdir, "mysqlrouter.conf"), sections)
+        mrc = self.charm()
+        if not cold:
+            return mrc._get_config_parameters
+
+        def _cold():
+            # Parse mysqlrouter.conf again
+            mrc._router_config = None
+            mrc._get_config_parameters()
+        return _cold
+
+    def update_config_parameters(self, sections, cold):
+        write_router_conf(
+            os.path.join(self.workdir, "mysqlrouter.conf"), sections)
+        mrc = self.charm()
+        parameters = mrc._get_config_parameters()
+        if not cold:
+            return lambda: mrc.update_config_parameters(parameters)
+
+        # Alternate a parameter so that every call writes the file
+        changed = dict(parameters, logger={"level": "DEBUG"})
+        calls = [parameters, changed]
+
+        def _cold():
+            mrc._router_config = None
+            calls.reverse()
+            mrc.update_config_parameters(calls[0])
+        return _cold
+
+    def forget_fingerprints(self, func, cold):
+        if not cold:
+            return func
+
+        def _cold():
+            # Forward or publish every prefix again
+            self.kv.clear()
+            func()
+        return _cold
+
+    def requests(self, count, cold):
+        shared_db = FakeSharedDB(prefixes(count))
+        db_router = FakeDBRouter(prefixes(count))
+        mrc = self.charm()
+        return self.forget_fingerprints(
+            lambda: mrc.proxy_db_and_user_requests(shared_db, db_router),
+            cold)
+
+    def responses(self, count, cold):
+        shared_db = FakeSharedDB(prefixes(count))
+        db_router = FakeDBRouter(prefixes(count))
+        mrc = self.charm()
+        return self.forget_fingerprints(
+            lambda: mrc.proxy_db_and_user_responses(db_router, shared_db),
+            cold)
+
+
+def compare(results, baselines, tolerance, time_tolerance):
+    """Compare results with baselines.
+
+    A case without a baseline is a failure too, record its baseline with
+    --update-baselines.
+
+    :returns: Names of the regressed cases and of the cases without baseline
+    :rtype: List[str]
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            regressions.append("{} has no baseline".format(name))
+            continue
+        for metric, factor in (("time_us", time_tolerance),
+                               ("peak_kib", tolerance)):
+            # Ignore noise on tiny values
+            if (result[metric] > baseline[metric] * factor and
+                    result[metric] - baseline[metric] > 1):
+                regressions.append("{} {}".format(name, metric))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*",
+                        help="Only run cases whose name contains these")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--time-tolerance", type=float,
+                        default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args(argv)
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+
+    results = {}
+    workdir = tempfile.mkdtemp()
+    try:
+        with Bench(workdir) as bench:
+            for name, setup in bench.cases():
+                if args.cases and not any(c in name for c in args.cases):
+                    continue
+                bench.kv.clear()
+                results[name] = measure(setup(), args.repeat)
+                baseline = baselines.get(name, {})
+                print("{:<48} {:>10.1f} us {:>10.1f} KiB   "
+                      "(baseline {} us {} KiB)".format(
+                          name, results[name]["time_us"],
+                          results[name]["peak_kib"],
+                          baseline.get("time_us", "-"),
+                          baseline.get("peak_kib", "-")))
+    finally:
+        shutil.rmtree(workdir)
+
+    if args.update_baselines:
+        baselines.update(results)
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+            f.write("\n")
+        return 0
+
+    regressions = compare(results, baselines, args.tolerance,
+                          args.time_tolerance)
+    for regression in regressions:
+        print("REGRESSION: {}".format(regression))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
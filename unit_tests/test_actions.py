@@ -0,0 +1,106 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import subprocess
+from unittest import mock
+
+import charms_openstack.test_utils as test_utils
+
+import actions.actions as actions
+
+
+class TestMySQLRouterActions(test_utils.PatchHelper):
+
+    def setUp(self):
+        super().setUp()
+        self.patch_object(actions.ch_core.hookenv, "_run_atstart")
+        self.patch_object(actions.ch_core.hookenv, "action_get")
+        self.patch_object(actions.ch_core.hookenv, "action_set")
+        self.patch_object(actions.ch_core.hookenv, "action_fail")
+        self.patch_object(actions.ch_core.unitdata, "kv")
+        self.instance = mock.MagicMock()
+        self.patch_object(actions.charm, "provide_charm_instance")
+        self.provide_charm_instance.return_value.__enter__.return_value = (
+            self.instance)
+        self._params = {
+            "address": "", "rw-port": 0, "ro-port": 0, "sockets": True,
+            "direct": True, "direct-address": "", "direct-port": 3306,
+            "iterations": 100, "concurrency": 4, "time-limit": 60}
+        self.action_get.side_effect = self._params.get
+
+    def test_benchmark_router(self):
+        _calls = mock.MagicMock()
+        self._run_atstart.side_effect = _calls._run_atstart
+        self.provide_charm_instance.side_effect = (
+            _calls.provide_charm_instance)
+        _calls.provide_charm_instance.return_value.__enter__.return_value = (
+            self.instance)
+        self.instance.benchmark_router.return_value = {"rw": {"errors": 0}}
+
+        actions.benchmark_router(["benchmark-router"])
+        # The relation endpoints are loaded before the charm is used
+        self.assertEqual(_calls.mock_calls[:2], [
+            mock.call._run_atstart(), mock.call.provide_charm_instance()])
+        self.instance.benchmark_targets.assert_called_once_with(
+            address=None, rw_port=None, ro_port=None, sockets=True,
+            direct=True, direct_address=None, direct_port=3306)
+        self.instance.benchmark_router.assert_called_once_with(
+            self.instance.benchmark_targets.return_value,
+            iterations=100, concurrency=4, time_limit=60)
+        self.action_set.assert_called_once_with({
+            "results": json.dumps({"rw": {"errors": 0}}),
+            "outcome": "Success"})
+        self.action_fail.assert_not_called()
+
+    def test_benchmark_router_failed(self):
+        self.instance.benchmark_router.side_effect = ValueError(
+            "The db-router relation is not available")
+        actions.benchmark_router(["benchmark-router"])
+        self.action_fail.assert_called_once_with(
+            "The db-router relation is not available")
+        self.action_set.assert_not_called()
+
+        self.action_fail.reset_mock()
+        self.instance.benchmark_targets.side_effect = AttributeError(
+            "'NoneType' object has no attribute 'db_host'")
+        actions.benchmark_router(["benchmark-router"])
+        self.action_fail.assert_called_once_with(
+            "Benchmark router failed: 'NoneType' object has no attribute "
+            "'db_host'")
+        self.assertIn("traceback", self.action_set.call_args[0][0])
+
+    def test_main(self):
+        self.patch_object(actions, "ACTIONS")
+        _action = mock.MagicMock()
+        self.ACTIONS.__getitem__.return_value = _action
+
+        _action.side_effect = subprocess.CalledProcessError(
+            1, "mysqlrouter", output=b"failed")
+        actions.main(["/var/lib/juju/charm/actions/stop-mysqlrouter"])
+        _result = self.action_set.call_args[0][0]
+        self.assertEqual((_result["output"], _result["return-code"]),
+                         ("failed", 1))
+        self.action_fail.assert_called_once_with(
+            "stop-mysqlrouter action failed.")
+        self.kv.return_value.flush.assert_called_once_with()
+
+        # Other exceptions have no output
+        self.action_fail.reset_mock()
+        _action.side_effect = KeyError("rw")
+        actions.main(["/var/lib/juju/charm/actions/stop-mysqlrouter"])
+        self.assertEqual(list(self.action_set.call_args[0][0]),
+                         ["traceback"])
+        self.action_fail.assert_called_once_with(
+            "stop-mysqlrouter action failed.")
@@ -14,9 +14,13 @@
 
 import copy
 import collections
+import configparser
 import json
+import pathlib
 from unittest import mock
 
+import jinja2
+
 import charms_openstack.test_utils as test_utils
 
 import charm.openstack.mysql_router as mysql_router
@@ -72,6 +76,15 @@ class FakeConfigParser(dict):
         self.pop(section, None)
 
 
+class FakeKV(dict):
+
+    def set(self, key, value):
+        self[key] = value
+
+    def unset(self, key):
+        self.pop(key, None)
+
+
 class TestMySQLRouterCharm(test_utils.PatchHelper):
 
     def setUp(self):
@@ -211,6 +224,37 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             mrc.db_router_password,
             _pass)
 
+    def test_db_router_snapshot(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "atexit")
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.endpoint_from_flag.return_value = None
+        self.db_router.password.return_value = '"clusterpass"'
+        self.db_router.db_host.return_value = '"10.10.10.50"'
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Not cached until the relation is available
+        self.assertIsNone(mrc.db_router_snapshot.endpoint)
+        self.endpoint_from_flag.reset_mock()
+        self.endpoint_from_flag.return_value = self.db_router
+
+        # Relation data is only read once per hook
+        for _ in range(3):
+            self.assertEqual(mrc.db_router_password, "clusterpass")
+            self.assertEqual(mrc.cluster_address, "10.10.10.50")
+        self.db_router.password.assert_called_once_with(
+            prefix=mrc.db_prefix)
+        self.db_router.db_host.assert_called_once_with()
+        self.endpoint_from_flag.assert_called_once_with(
+            mysql_router.DB_ROUTER_AVAILABLE)
+        self.assertEqual(mrc._db_router_snapshot_misses, 2)
+        self.assertEqual(mrc._db_router_snapshot_hits, 5)
+
+        # The counters are logged once, at the end of the hook
+        self.atexit.assert_called_once_with(mrc.log_db_router_snapshot_stats)
+        mrc.log_db_router_snapshot_stats()
+        self.log.assert_called_once_with(
+            "db-router snapshot hits: 5, misses: 2", "DEBUG")
+
     def test_db_router_address(self):
         _addr = "10.10.10.30"
         self.get_relation_ip.return_value = _addr
@@ -229,6 +273,31 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             mrc.cluster_address,
             _addr)
 
+    def test_router_capabilities(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+        self.os.path.getmtime.return_value = 100.0
+        self.cmp_pkgrevno.return_value = 1
+        mrc = mysql_router.MySQLRouterCharm()
+        _expected = {name: True for name in mysql_router.ROUTER_CAPABILITIES}
+        self.assertEqual(mrc.router_capabilities, _expected)
+        self.assertEqual(
+            self.cmp_pkgrevno.call_count,
+            len(mysql_router.ROUTER_CAPABILITIES))
+
+        # Same package revision, served from unitdata
+        self.cmp_pkgrevno.reset_mock()
+        self.assertEqual(mrc.router_capabilities, _expected)
+        self.cmp_pkgrevno.assert_not_called()
+
+        # dpkg status changed, recompute
+        self.os.path.getmtime.return_value = 200.0
+        self.cmp_pkgrevno.return_value = -1
+        self.assertFalse(any(mrc.router_capabilities.values()))
+        self.assertEqual(
+            _kv[mysql_router.ROUTER_CAPABILITIES_KEY]["revision"], "200.0")
+
     def test_shared_db_address(self):
         mrc = mysql_router.MySQLRouterCharm()
         self.assertEqual(
@@ -267,9 +336,13 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             "install", "super_install")
         _name = "keystone-mysql-router"
         self.patch_object(mysql_router.ch_core.templating, "render")
+        self.patch_object(mysql_router.ch_core.host, "file_hash")
         self.os.path.exists.return_value = False
         self.group_exists.return_value = False
         self.user_exists.return_value = False
+        self.patch_object(mysql_router.MySQLRouterCharm,
+                          "systemd_unit_properties",
+                          new_callable=mock.PropertyMock)
         mrc = mysql_router.MySQLRouterCharm()
         mrc.configure_source = mock.MagicMock()
         mrc.name = _name
@@ -353,6 +426,70 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         _helper.connect.assert_called_once_with(
             _user, _pass, _addr, port=_port, connect_timeout=_connect_timeout)
 
+    def test_probe_router_handshake(self):
+        self.patch_object(mysql_router.router_probe, "read_handshake")
+        self.read_handshake.return_value = {"server_version": "8.0.36"}
+        mrc = mysql_router.MySQLRouterCharm()
+
+        self.assertTrue(mrc.probe_router_handshake())
+        self.read_handshake.assert_called_once_with(
+            mrc.mysqlrouter_socket, timeout=mrc.handshake_probe_timeout)
+
+        self.read_handshake.side_effect = (
+            mysql_router.router_probe.HandshakeError("no", code=2003))
+        self.assertFalse(mrc.probe_router_handshake())
+
+        self.read_handshake.side_effect = ConnectionRefusedError
+        self.assertFalse(mrc.probe_router_handshake())
+
+    def test_check_router_health(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+        self.patch_object(mysql_router, "time")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.healthcheck_auth_interval = 3600
+        mrc.check_mysql_connection = mock.MagicMock(return_value=True)
+        mrc.probe_router_handshake = mock.MagicMock(return_value=True)
+        mrc.monitored_router_health = mock.MagicMock(return_value=None)
+
+        # No previous authenticated check
+        self.time.time.return_value = 1000
+        self.assertTrue(mrc.check_router_health())
+        mrc.check_mysql_connection.assert_called_once_with()
+        mrc.probe_router_handshake.assert_not_called()
+        self.assertEqual(_kv[mysql_router.LAST_AUTH_CHECK_KEY], 1000)
+
+        # Within the interval only the handshake is probed
+        mrc.check_mysql_connection.reset_mock()
+        self.time.time.return_value = 2000
+        self.assertTrue(mrc.check_router_health())
+        mrc.check_mysql_connection.assert_not_called()
+        mrc.probe_router_handshake.assert_called_once_with()
+
+        # A fresh monitor status replaces the handshake probe
+        mrc.probe_router_handshake.reset_mock()
+        mrc.monitored_router_health.return_value = False
+        self.assertFalse(mrc.check_router_health())
+        mrc.monitored_router_health.return_value = True
+        self.assertTrue(mrc.check_router_health())
+        mrc.check_mysql_connection.assert_not_called()
+        mrc.probe_router_handshake.assert_not_called()
+
+        # Interval elapsed, the authenticated check is made regardless of the
+        # monitor and a failed one is not recorded
+        mrc.check_mysql_connection.return_value = False
+        self.time.time.return_value = 5000
+        self.assertFalse(mrc.check_router_health())
+        self.assertEqual(_kv[mysql_router.LAST_AUTH_CHECK_KEY], 1000)
+
+        # Always authenticate
+        mrc.check_mysql_connection.reset_mock()
+        mrc.options.healthcheck_auth_interval = 0
+        self.time.time.return_value = 1001
+        mrc.check_router_health()
+        mrc.check_mysql_connection.assert_called_once_with()
+
     def test_custom_assess_status_check(self):
         _check = mock.MagicMock()
         _check.return_value = None, None
@@ -364,10 +501,11 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         mrc.check_if_paused = _check
         mrc.check_interfaces = _check
         mrc.check_mandatory_config = _check
-        mrc.check_mysql_connection = _conn_check
+        mrc.check_charm_config = _check
+        mrc.check_router_health = _conn_check
 
         self.assertEqual((None, None), mrc.custom_assess_status_check())
-        self.assertEqual(3, len(_check.mock_calls))
+        self.assertEqual(4, len(_check.mock_calls))
         _conn_check.assert_called_once_with()
 
         # First checks fail
@@ -383,6 +521,176 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             ("blocked", "Failed to connect to MySQL"),
             mrc.custom_assess_status_check())
 
+    def test_monitored_router_health(self):
+        self.patch_object(mysql_router, "time")
+        self.time.time.return_value = 1000
+        _status = {
+            "timestamp": 990,
+            "interval": 10,
+            "endpoints": {
+                "rw": {"ok": True, "consecutive_failures": 0,
+                       "success_ratio": 0.9},
+            },
+        }
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.monitor_interval = 10
+
+        # Fresh and healthy
+        with mock.patch("builtins.open",
+                        mock.mock_open(read_data=json.dumps(_status))):
+            self.assertTrue(mrc.monitored_router_health())
+
+        # Fresh and failing
+        _status["endpoints"]["rw"]["consecutive_failures"] = 2
+        with mock.patch("builtins.open",
+                        mock.mock_open(read_data=json.dumps(_status))):
+            self.assertFalse(mrc.monitored_router_health())
+
+            # Stale
+            self.time.time.return_value = 2000
+            self.assertIsNone(mrc.monitored_router_health())
+
+        # Missing
+        with mock.patch("builtins.open", side_effect=OSError):
+            self.assertIsNone(mrc.monitored_router_health())
+
+        # Disabled
+        mrc.options.monitor_interval = 0
+        self.assertIsNone(mrc.monitored_router_health())
+
+    def test_configure_monitor_service(self):
+        self.patch_object(mysql_router.ch_core.templating, "render")
+        self.patch_object(mysql_router.ch_core.host, "file_hash")
+        self.patch_object(mysql_router.ch_core.host, "service")
+        self.patch_object(mysql_router.ch_core.host, "service_restart")
+        self.patch_object(mysql_router.ch_core.host, "service_start")
+        self.patch_object(mysql_router.ch_core.host, "service_running")
+        self.patch_object(mysql_router.ch_core.hookenv, "charm_dir",
+                          return_value="/var/lib/juju/charm")
+        self.os.path.join.side_effect = lambda *p: "/".join(p)
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.monitor_interval = 10
+
+        # Unit file changed
+        self.file_hash.side_effect = [None, "abc"]
+        mrc.configure_monitor_service()
+        _context = self.render.call_args.kwargs["context"]
+        self.assertEqual(_context["interval"], 10)
+        self.assertEqual(_context["lib_dir"], "/var/lib/juju/charm/lib")
+        # Only the unix sockets are probed, never the TCP ports
+        self.assertEqual(_context["endpoints"], [
+            "rw={}".format(mrc.mysqlrouter_socket),
+            "ro={}".format(mrc.mysqlrouter_ro_socket)])
+        self.subprocess.check_output.assert_called_once_with(
+            ["systemctl", "daemon-reload"], stderr=self.stdout)
+        self.service.assert_called_once_with("enable", mrc.monitor_service)
+        self.service_restart.assert_called_once_with(mrc.monitor_service)
+
+        # Unchanged and running
+        self.subprocess.reset_mock()
+        self.service_restart.reset_mock()
+        self.file_hash.side_effect = ["abc", "abc"]
+        self.service_running.return_value = True
+        mrc.configure_monitor_service()
+        self.subprocess.check_output.assert_not_called()
+        self.service_restart.assert_not_called()
+        self.service_start.assert_not_called()
+
+        # Disabled
+        mrc.options.monitor_interval = 0
+        mrc.remove_monitor_service = mock.MagicMock()
+        mrc.configure_monitor_service()
+        mrc.remove_monitor_service.assert_called_once_with()
+
+    def test_remove_monitor_service(self):
+        self.patch_object(mysql_router.ch_core.host, "service")
+        self.patch_object(mysql_router.ch_core.host, "service_stop")
+        mrc = mysql_router.MySQLRouterCharm()
+
+        self.os.path.exists.return_value = False
+        mrc.remove_monitor_service()
+        self.service_stop.assert_not_called()
+
+        self.os.path.exists.return_value = True
+        mrc.remove_monitor_service()
+        self.service_stop.assert_called_once_with(mrc.monitor_service)
+        self.service.assert_called_once_with("disable", mrc.monitor_service)
+        self.os.remove.assert_called_once_with(mrc.monitor_systemd_file)
+        self.subprocess.check_output.assert_called_once_with(
+            ["systemctl", "daemon-reload"], stderr=self.stdout)
+
+    def test_configure_exporter_service(self):
+        self.patch_object(mysql_router.ch_core.templating, "render")
+        self.patch_object(mysql_router.ch_core.host, "file_hash")
+        self.patch_object(mysql_router.ch_core.host, "service")
+        self.patch_object(mysql_router.ch_core.host, "service_restart")
+        self.patch_object(mysql_router.ch_core.host, "service_start")
+        self.patch_object(mysql_router.ch_core.host, "service_running")
+        self.patch_object(mysql_router.ch_core.hookenv, "charm_dir",
+                          return_value="/var/lib/juju/charm")
+        self.os.path.join.side_effect = lambda *p: "/".join(p)
+        self.cmp_pkgrevno.return_value = 1
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.name = "keystone-mysql-router"
+        mrc.options.metrics_address = "127.0.0.1"
+        mrc.options.metrics_port = 9152
+        mrc.options.rest_api_port = 8443
+        mrc.options.router_instances = 2
+        mrc.remove_exporter_service = mock.MagicMock()
+
+        # Unit file changed
+        self.file_hash.side_effect = [None, "abc"]
+        mrc.configure_exporter_service()
+        _context = self.render.call_args.kwargs["context"]
+        self.assertEqual(_context["address"], "127.0.0.1")
+        self.assertEqual(_context["port"], 9152)
+        # All instances share the password file
+        self.assertEqual(_context["password_file"],
+                         mrc.router_instance(1).exporter_password_file)
+        self.assertEqual(_context["targets"], [
+            "keystone-mysql-router=127.0.0.1:8443",
+            "keystone-mysql-router-1=127.0.0.1:8444"])
+        self.service.assert_called_once_with("enable", mrc.exporter_service)
+        self.service_restart.assert_called_once_with(mrc.exporter_service)
+
+        # Unchanged and running
+        self.service_restart.reset_mock()
+        self.file_hash.side_effect = ["abc", "abc"]
+        self.service_running.return_value = True
+        mrc.configure_exporter_service()
+        self.service_restart.assert_not_called()
+        self.service_start.assert_not_called()
+
+        # Not bootstrapped yet
+        self.os.path.exists.return_value = False
+        self.render.reset_mock()
+        mrc.configure_exporter_service()
+        self.render.assert_not_called()
+        mrc.remove_exporter_service.assert_not_called()
+
+        # Disabled, also without the REST API
+        mrc.options.rest_api_port = 0
+        mrc.configure_exporter_service()
+        mrc.options.rest_api_port = 8443
+        mrc.options.metrics_port = 0
+        mrc.configure_exporter_service()
+        self.assertEqual(mrc.remove_exporter_service.call_count, 2)
+
+    def test_remove_exporter_service(self):
+        self.patch_object(mysql_router.ch_core.host, "service")
+        self.patch_object(mysql_router.ch_core.host, "service_stop")
+        mrc = mysql_router.MySQLRouterCharm()
+
+        self.os.path.exists.return_value = False
+        mrc.remove_exporter_service()
+        self.service_stop.assert_not_called()
+
+        self.os.path.exists.return_value = True
+        mrc.remove_exporter_service()
+        self.service_stop.assert_called_once_with(mrc.exporter_service)
+        self.service.assert_called_once_with("disable", mrc.exporter_service)
+        self.os.remove.assert_called_once_with(mrc.exporter_systemd_file)
+
     def test_bootstrap_mysqlrouter(self):
         _json_addr = '"10.10.10.60"'
         _json_pass = '"clusterpass"'
@@ -397,8 +705,13 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.is_flag_set.return_value = False
 
         mrc = mysql_router.MySQLRouterCharm()
+        mrc.configure_rest_api = mock.MagicMock(return_value=[])
         mrc.options.system_user = _user
         mrc.options.base_port = _port
+        mrc.options.use_gr_notifications = False
+        mrc.update_config_parameters = mock.MagicMock(return_value=[])
+        mrc._get_config_parameters = mock.MagicMock(
+            return_value={"DEFAULT": {"pid_file": "/run/mysql/foo.pid"}})
 
         # Successful < 8.0.22
         self.cmp_pkgrevno.return_value = -1
@@ -418,6 +731,12 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             mock.call(mysql_router.MYSQL_ROUTER_BOOTSTRAPPED)])
         self.clear_flag.assert_called_once_with(
             mysql_router.MYSQL_ROUTER_BOOTSTRAP_ATTEMPTED)
+        mrc.configure_rest_api.assert_called_once_with()
+        mrc.update_config_parameters.assert_called_once_with(
+            {"DEFAULT": {"pid_file": "/run/mysql/foo.pid"}})
+        self.assertNotIn(
+            mock.call(mysql_router.MYSQL_ROUTER_RESTART_REQUIRED),
+            self.set_flag.mock_calls)
 
         # Successful >= 8.0.22
         self.subprocess.reset_mock()
@@ -445,12 +764,14 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         # First attempt fail
         self.subprocess.reset_mock()
         self.set_flag.reset_mock()
+        mrc.update_config_parameters.reset_mock()
         self.subprocess.CalledProcessError = FakeException
         self.subprocess.check_output.side_effect = (
             self.subprocess.CalledProcessError)
         mrc.bootstrap_mysqlrouter()
         self.set_flag.assert_called_once_with(
             mysql_router.MYSQL_ROUTER_BOOTSTRAP_ATTEMPTED)
+        mrc.update_config_parameters.assert_not_called()
 
         # Bail
         self.subprocess.reset_mock()
@@ -480,9 +801,22 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             stderr=self.stdout)
         self.set_flag.assert_has_calls([
             mock.call(mysql_router.MYSQL_ROUTER_BOOTSTRAP_ATTEMPTED),
-            mock.call(mysql_router.MYSQL_ROUTER_BOOTSTRAPPED)])
+            mock.call(mysql_router.MYSQL_ROUTER_BOOTSTRAPPED),
+            mock.call(mysql_router.MYSQL_ROUTER_RESTART_REQUIRED)])
         self.clear_flag.assert_called_once_with(
             mysql_router.MYSQL_ROUTER_BOOTSTRAP_ATTEMPTED)
+        mrc.update_config_parameters.assert_called_once_with(
+            {"DEFAULT": {"pid_file": "/run/mysql/foo.pid"}})
+
+        # Group Replication notifications
+        self.subprocess.reset_mock()
+        self.is_flag_set.side_effect = None
+        self.is_flag_set.return_value = False
+        mrc.options.use_gr_notifications = True
+        mrc.bootstrap_mysqlrouter()
+        self.assertEqual(
+            self.subprocess.check_output.call_args.args[0][-2:],
+            ["--disable-rest", "--conf-use-gr-notifications"])
 
     def test_bootstrap_mysqlrouter_force(self):
         _json_addr = '"10.10.10.60"'
@@ -498,8 +832,13 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.is_flag_set.return_value = False
 
         mrc = mysql_router.MySQLRouterCharm()
+        mrc.configure_rest_api = mock.MagicMock(return_value=[])
         mrc.options.system_user = _user
         mrc.options.base_port = _port
+        mrc.options.use_gr_notifications = False
+        mrc.update_config_parameters = mock.MagicMock(return_value=[])
+        mrc._get_config_parameters = mock.MagicMock(
+            return_value={"DEFAULT": {"pid_file": "/run/mysql/foo.pid"}})
 
         _relations = ["relid"]
 
@@ -536,9 +875,12 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             stderr=self.stdout)
         self.set_flag.assert_has_calls([
             mock.call(mysql_router.MYSQL_ROUTER_BOOTSTRAP_ATTEMPTED),
-            mock.call(mysql_router.MYSQL_ROUTER_BOOTSTRAPPED)])
+            mock.call(mysql_router.MYSQL_ROUTER_BOOTSTRAPPED),
+            mock.call(mysql_router.MYSQL_ROUTER_RESTART_REQUIRED)])
         self.clear_flag.assert_called_once_with(
             mysql_router.MYSQL_ROUTER_BOOTSTRAP_ATTEMPTED)
+        mrc.update_config_parameters.assert_called_once_with(
+            {"DEFAULT": {"pid_file": "/run/mysql/foo.pid"}})
 
     def test_validate_configuration_file_exists_and_small_size(self):
         self.patch_object(mysql_router.os.path, "exists",
@@ -591,30 +933,122 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         _name = "keystone-mysql-router"
         mrc = mysql_router.MySQLRouterCharm()
         mrc.name = _name
+        mrc.configure_router_instances = mock.MagicMock()
 
         mrc.start_mysqlrouter()
         self.service_start.assert_called_once_with(_name)
+        mrc.configure_router_instances.assert_called_once_with()
         self.set_flag.assert_called_once_with(
             mysql_router.MYSQL_ROUTER_STARTED)
+        self.clear_flag.assert_called_once_with(
+            mysql_router.MYSQL_ROUTER_RESTART_REQUIRED)
+
+    def test_configure_router_instances(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+        self.patch_object(mysql_router.ch_core.host, "service_start")
+        self.patch_object(mysql_router.MySQLRouterCharm,
+                          "bootstrap_router_instance")
+        self.patch_object(mysql_router.MySQLRouterCharm,
+                          "remove_router_instance")
+        _name = "keystone-mysql-router"
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.name = _name
+
+        # Instance 1 is bootstrapped, instance 2 fails to bootstrap
+        mrc.options.router_instances = 3
+        self.os.path.exists.return_value = False
+        self.bootstrap_router_instance.side_effect = [True, False]
+        mrc.configure_router_instances()
+        self.assertEqual(self.bootstrap_router_instance.call_count, 2)
+        self.service_start.assert_called_once_with("{}-1".format(_name))
+        self.remove_router_instance.assert_not_called()
+        self.assertEqual(_kv[mysql_router.ROUTER_INSTANCES_KEY], 3)
+
+        # Bootstrapped instances are only started
+        self.os.path.exists.return_value = True
+        self.bootstrap_router_instance.reset_mock()
+        self.service_start.reset_mock()
+        mrc.configure_router_instances()
+        self.bootstrap_router_instance.assert_not_called()
+        self.assertEqual(self.service_start.call_count, 2)
+
+        # Surplus instances are removed
+        mrc.options.router_instances = 1
+        self.service_start.reset_mock()
+        mrc.configure_router_instances()
+        self.service_start.assert_not_called()
+        self.assertEqual(self.remove_router_instance.call_count, 2)
+        self.assertEqual(_kv[mysql_router.ROUTER_INSTANCES_KEY], 1)
+
+    def test_bootstrap_router_instance(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.router_instances = 2
+        _router = mrc.router_instance(1)
+        _router.render_systemd_file = mock.MagicMock(return_value=True)
+        _router.systemd_daemon_reload = mock.MagicMock()
+        _router.bootstrap_command = mock.MagicMock(
+            return_value=["mysqlrouter", "--bootstrap"])
+        _router._get_config_parameters = mock.MagicMock(return_value={})
+        _router.update_config_parameters = mock.MagicMock(return_value=[])
+
+        self.os.path.exists.return_value = False
+        self.assertTrue(_router.bootstrap_router_instance())
+        _router.systemd_daemon_reload.assert_called_once_with()
+        self.subprocess.check_output.assert_has_calls([
+            mock.call(["systemctl", "enable", _router.name],
+                      stderr=self.subprocess.STDOUT),
+            mock.call(["mysqlrouter", "--bootstrap"],
+                      stderr=self.subprocess.STDOUT)])
+        _router.update_config_parameters.assert_called_once_with({})
+
+        # Retried with --force
+        self.os.path.exists.return_value = True
+        self.subprocess.reset_mock()
+        self.subprocess.CalledProcessError = FakeException
+        self.subprocess.check_output.side_effect = [
+            b"", FakeException(1, "bootstrap")]
+        self.assertFalse(_router.bootstrap_router_instance())
+        self.subprocess.check_output.assert_called_with(
+            ["mysqlrouter", "--bootstrap", "--force"],
+            stderr=self.subprocess.STDOUT)
+        self.assertEqual(self.log.call_args.args[1], "ERROR")
 
     def test_stop_mysqlrouter(self):
         _name = "keystone-mysql-router"
         self.patch_object(mysql_router.ch_core.host, "service_stop")
         mrc = mysql_router.MySQLRouterCharm()
         mrc.name = _name
+        mrc.options.router_instances = 1
 
         mrc.stop_mysqlrouter()
         self.service_stop.assert_called_once_with(_name)
 
+        mrc.options.router_instances = 3
+        self.service_stop.reset_mock()
+        mrc.stop_mysqlrouter()
+        self.service_stop.assert_has_calls([
+            mock.call(_name), mock.call("{}-1".format(_name)),
+            mock.call("{}-2".format(_name))])
+
     def test_restart_mysqlrouter(self):
         _name = "keystone-mysql-router"
         mrc = mysql_router.MySQLRouterCharm()
         mrc.name = _name
+        mrc.options.router_instances = 1
         self.patch_object(mysql_router.ch_core.host, "service_restart")
 
         mrc.restart_mysqlrouter()
         self.service_restart.assert_called_once_with(_name)
 
+        mrc.options.router_instances = 2
+        self.service_restart.reset_mock()
+        mrc.restart_mysqlrouter()
+        self.service_restart.assert_has_calls([
+            mock.call(_name), mock.call("{}-1".format(_name))])
+
     def test_proxy_db_and_user_requests_no_prefix(self):
         mrc = mysql_router.MySQLRouterCharm()
         mrc.proxy_db_and_user_requests(self.keystone_shared_db, self.db_router)
@@ -634,6 +1068,57 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.db_router.configure_proxy_db.assert_has_calls(
             _calls, any_order=True)
 
+    def test_proxy_db_and_user_requests_unchanged(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+        _relation = mock.MagicMock()
+        _relation.relation_id = "db-router:3"
+        self.db_router.relations = [_relation]
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # First time everything is forwarded
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.assertEqual(self.db_router.configure_proxy_db.call_count, 3)
+
+        # Unchanged requests are skipped
+        self.db_router.configure_proxy_db.reset_mock()
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.db_router.configure_proxy_db.assert_not_called()
+
+        # Only changed requests are forwarded
+        self.nova_shared_db.all_joined_units.received[
+            "novaapi_hostname"] = "10.20.20.71"
+        self.nova_shared_db.all_joined_units.received.pop(
+            "novacell0_database")
+        self.nova_shared_db.all_joined_units.received.pop(
+            "novacell0_username")
+        self.nova_shared_db.all_joined_units.received.pop(
+            "novacell0_hostname")
+        _relation.to_publish_raw = {
+            "novacell0_database": "nova_cell0",
+            "novacell0_username": "nova",
+            "novacell0_hostname": self.nova_unit_ip,
+            "nova_database": "nova"}
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.db_router.configure_proxy_db.assert_called_once_with(
+            "nova_api", "nova", "10.20.20.71", prefix="novaapi")
+        # The keys of the removed prefix are cleared, once
+        self.assertEqual(_relation.to_publish_raw, {
+            "novacell0_database": None,
+            "novacell0_username": None,
+            "novacell0_hostname": None,
+            "nova_database": "nova"})
+        _relation.to_publish_raw = {}
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.assertEqual(_relation.to_publish_raw, {})
+
+        # A new db-router relation gets everything again
+        self.db_router.configure_proxy_db.reset_mock()
+        _relation.relation_id = "db-router:9"
+        mrc.proxy_db_and_user_requests(self.nova_shared_db, self.db_router)
+        self.assertEqual(self.db_router.configure_proxy_db.call_count, 2)
+
     def test_proxy_db_and_user_responses_unprefixed(self):
         _wait_time = 90
         _json_wait_time = "90"
@@ -648,6 +1133,9 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
 
         mrc = mysql_router.MySQLRouterCharm()
         mrc.options.base_port = _port
+        mrc.options.publish_ro_socket = False
+        mrc.options.router_instances = 1
+        mrc.options.publish_x_protocol = False
         self.db_router.get_prefixes.return_value = [
             mrc._unprefixed, mrc.db_prefix]
 
@@ -698,6 +1186,9 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
 
         mrc = mysql_router.MySQLRouterCharm()
         mrc.options.base_port = _port
+        mrc.options.publish_ro_socket = False
+        mrc.options.router_instances = 1
+        mrc.options.publish_x_protocol = False
         self.db_router.get_prefixes.return_value = [
             mrc.db_prefix, _nova, _novaapi, _novacell0]
 
@@ -751,6 +1242,669 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         for call in self.nova_shared_db.set_db_connection_info.mock_calls:
             self.assertNotEqual(mrc.db_prefix, call.kwargs.get("prefix"))
 
+    def test_proxy_db_and_user_responses_unchanged(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+        _json_pass = '"pass"'
+        _port = 3316
+        self.local_unit.return_value = "nmr/5"
+        self.db_router.password.return_value = _json_pass
+        self.db_router.wait_timeout.return_value = None
+        self.db_router.ssl_ca.return_value = None
+        self.db_router.allowed_units.return_value = '""'
+        _to_publish_raw = (
+            self.nova_shared_db.relations[
+                self.nova_shared_db.relation_id].to_publish_raw)
+
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.base_port = _port
+        mrc.options.publish_ro_socket = False
+        mrc.options.router_instances = 1
+        mrc.options.publish_x_protocol = False
+        self.db_router.get_prefixes.return_value = [
+            mrc.db_prefix, "nova", "novaapi", "novacell0"]
+
+        # First publish sends everything
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.assertEqual(
+            self.nova_shared_db.set_db_connection_info.call_count, 3)
+        self.assertEqual(_to_publish_raw.__setitem__.mock_calls, [
+            mock.call("ssl_ca", None), mock.call("db_ro_port", "3317")])
+
+        # Nothing changed, nothing is sent
+        self.nova_shared_db.set_db_connection_info.reset_mock()
+        _to_publish_raw.reset_mock()
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.nova_shared_db.set_db_connection_info.assert_not_called()
+        _to_publish_raw.__setitem__.assert_not_called()
+
+        # Only the changed prefix is sent
+        self.db_router.password.side_effect = (
+            lambda prefix=None: '"newpass"' if prefix == "novaapi"
+            else _json_pass)
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        self.nova_shared_db.set_db_connection_info.assert_called_once_with(
+            self.nova_shared_db.relation_id, mrc.shared_db_address,
+            "newpass", allowed_units=None, prefix="novaapi",
+            wait_timeout=None, db_port=_port, ssl_ca=None)
+
+        # Stored state does not contain secrets
+        self.assertNotIn("newpass", json.dumps(_kv))
+
+    def test_proxy_db_and_user_responses_extra_settings(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+        self.local_unit.return_value = "nmr/5"
+        self.db_router.password.return_value = '"pass"'
+        self.db_router.wait_timeout.return_value = None
+        self.db_router.ssl_ca.return_value = None
+        self.db_router.allowed_units.return_value = '""'
+        _to_publish_raw = (
+            self.nova_shared_db.relations[
+                self.nova_shared_db.relation_id].to_publish_raw)
+
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.base_port = 3306
+        mrc.options.publish_ro_socket = False
+        mrc.options.router_instances = 1
+        mrc.options.publish_x_protocol = False
+        self.db_router.get_prefixes.return_value = ["nova"]
+        self.assertEqual(mrc.shared_db_extra_settings(),
+                         {"db_ro_port": "3307"})
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        _to_publish_raw.__setitem__.assert_any_call("db_ro_port", "3307")
+
+        # The socket is added
+        _to_publish_raw.reset_mock()
+        mrc.options.publish_ro_socket = True
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        _to_publish_raw.__setitem__.assert_called_once_with(
+            "db_ro_socket", mrc.mysqlrouter_ro_socket)
+
+        # And removed again
+        _to_publish_raw.reset_mock()
+        mrc.options.publish_ro_socket = False
+        mrc.options.router_instances = 1
+        mrc.proxy_db_and_user_responses(self.db_router, self.nova_shared_db)
+        _to_publish_raw.__setitem__.assert_called_once_with(
+            "db_ro_socket", None)
+
+    def test_shared_db_extra_settings_x_protocol(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.base_port = 3306
+        mrc.options.publish_ro_socket = False
+        mrc.options.router_instances = 1
+        mrc.options.publish_x_protocol = True
+        self.assertEqual(mrc.shared_db_extra_settings(), {
+            "db_ro_port": "3307",
+            "db_x_port": "3308",
+            "db_x_ro_port": "3309",
+            "db_x_socket": "{}/mysqlx.sock".format(
+                mrc.mysqlrouter_working_dir),
+            "db_x_ro_socket": "{}/mysqlxro.sock".format(
+                mrc.mysqlrouter_working_dir)})
+
+    def test_shared_db_extra_settings_router_instances(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.base_port = 3306
+        mrc.options.publish_ro_socket = False
+        mrc.options.publish_x_protocol = False
+        mrc.options.router_instances = 3
+        self.assertEqual(mrc.shared_db_extra_settings(), {
+            "db_ro_port": "3307",
+            "db_ports": "3306,3310,3314",
+            "db_ro_ports": "3307,3311,3315"})
+
+    def test_router_instance(self):
+        self.os.path.join.side_effect = lambda *args: "/".join(args)
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.name = "keystone-mysql-router"
+        mrc.options.base_port = 3306
+        mrc.options.router_instances = 0
+        self.assertEqual(mrc.router_instances, [mrc])
+        self.assertIs(mrc.router_instance(0), mrc)
+
+        mrc.options.router_instances = 2
+        _router = mrc.router_instances[1]
+        self.assertEqual(_router.name, "keystone-mysql-router-1")
+        self.assertEqual(_router.systemd_file,
+                         "/etc/systemd/system/keystone-mysql-router-1.service")
+        self.assertEqual(_router.mysqlrouter_working_dir,
+                         "/var/lib/mysql/keystone-mysql-router-1")
+        self.assertEqual(
+            [_router.mysqlrouter_port, _router.mysqlrouter_ro_port,
+             _router.mysqlrouter_x_port, _router.mysqlrouter_x_ro_port],
+            [3310, 3311, 3312, 3313])
+        self.assertEqual(_router.router_instances, [_router])
+        self.assertEqual(_router.unitdata_key("foo"), "foo.1")
+        self.assertEqual(mrc.unitdata_key("foo"), "foo")
+        # Instance 0 is unchanged
+        self.assertEqual(mrc.name, "keystone-mysql-router")
+        self.assertEqual(mrc.mysqlrouter_port, 3306)
+        self.assertEqual(mrc.services, [
+            "keystone-mysql-router", "keystone-mysql-router-1"])
+        self.assertEqual(mrc.restart_map, {
+            "/var/lib/mysql/keystone-mysql-router/mysqlrouter.conf":
+                ["keystone-mysql-router"],
+            "/var/lib/mysql/keystone-mysql-router-1/mysqlrouter.conf":
+                ["keystone-mysql-router-1"]})
+
+    def test_get_config_parameters_routing(self):
+        self.cmp_pkgrevno.return_value = -1
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api_port = 0
+        mrc._get_routing_parameters = mock.MagicMock(
+            return_value={"param": "value"})
+        mrc.options.ttl = 5
+        mrc.options.auth_cache_ttl = 10
+        mrc.options.auth_cache_refresh_interval = 7
+        mrc.options.max_connections = 1000
+        mrc.options.debug = False
+        mrc.options.use_gr_notifications = False
+
+        mrc.options.publish_x_protocol = False
+        _params = mrc._get_config_parameters()
+        self.assertEqual(_params[mysql_router.ROUTING_RW_SECTION],
+                         {"param": "value"})
+        self.assertEqual(_params[mysql_router.ROUTING_RO_SECTION],
+                         {"param": "value"})
+        self.assertNotIn(mysql_router.ROUTING_X_RW_SECTION, _params)
+        self.assertNotIn(mysql_router.ROUTING_X_RO_SECTION, _params)
+
+        mrc.options.publish_x_protocol = True
+        _params = mrc._get_config_parameters()
+        for _heading in (mysql_router.ROUTING_RW_SECTION,
+                         mysql_router.ROUTING_RO_SECTION,
+                         mysql_router.ROUTING_X_RW_SECTION,
+                         mysql_router.ROUTING_X_RO_SECTION):
+            self.assertEqual(_params[_heading], {"param": "value"})
+
+        mrc._get_routing_parameters.assert_any_call(
+            mysql_router.ROUTING_X_RO_SECTION)
+
+        # Nothing is added without routing parameters
+        mrc._get_routing_parameters.return_value = {}
+        self.assertNotIn(mysql_router.ROUTING_RW_SECTION,
+                         mrc._get_config_parameters())
+
+    def test_get_config_parameters_connection_pool(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api_port = 0
+        mrc._get_routing_parameters = mock.MagicMock(return_value={})
+        mrc.options.ttl = 5
+        mrc.options.auth_cache_ttl = 10
+        mrc.options.auth_cache_refresh_interval = 7
+        mrc.options.max_connections = 1000
+        mrc.options.debug = False
+        mrc.options.use_gr_notifications = False
+        mrc.options.publish_x_protocol = True
+        mrc.options.max_idle_server_connections = 64
+        mrc.options.idle_timeout = 0
+        mrc.options.connection_sharing = True
+        mrc.options.connection_sharing_delay = 0.5
+        mrc.options.io_threads = ""
+
+        # Unsupported
+        self.cmp_pkgrevno.return_value = -1
+        _params = mrc._get_config_parameters()
+        self.assertNotIn(mysql_router.CONNECTION_POOL_SECTION, _params)
+        self.assertNotIn(mysql_router.ROUTING_RW_SECTION, _params)
+
+        # Supported, only applied to the classic protocol routes
+        self.cmp_pkgrevno.return_value = 1
+        mrc.router_config.parser["DEFAULT"] = {}
+        _params = mrc._get_config_parameters()
+        self.assertEqual(
+            _params[mysql_router.CONNECTION_POOL_SECTION],
+            {"max_idle_server_connections": "64", "idle_timeout": "0"})
+        for _heading in (mysql_router.ROUTING_RW_SECTION,
+                         mysql_router.ROUTING_RO_SECTION):
+            self.assertEqual(
+                _params[_heading],
+                {"connection_sharing": "1",
+                 "connection_sharing_delay": "0.5"})
+        self.assertNotIn(mysql_router.ROUTING_X_RW_SECTION, _params)
+        self.assertNotIn(mysql_router.ROUTING_X_RO_SECTION, _params)
+
+        # Router defaults
+        mrc.options.max_idle_server_connections = -1
+        mrc.options.idle_timeout = -1
+        mrc.options.connection_sharing_delay = -1
+        _params = mrc._get_config_parameters()
+        self.assertNotIn(mysql_router.CONNECTION_POOL_SECTION, _params)
+        self.assertEqual(_params[mysql_router.ROUTING_RW_SECTION],
+                         {"connection_sharing": "1"})
+
+        # Disabled sharing is only written where it was set before
+        mrc.options.connection_sharing = False
+        _params = mrc._get_config_parameters()
+        self.assertNotIn(mysql_router.ROUTING_RW_SECTION, _params)
+        self.assertNotIn(mysql_router.ROUTING_RO_SECTION, _params)
+        mrc.router_config.parser["routing:jujuCluster_rw"] = {
+            "connection_sharing": "1"}
+        mrc.router_config.sections.invalidate()
+        _params = mrc._get_config_parameters()
+        self.assertEqual(_params[mysql_router.ROUTING_RW_SECTION],
+                         {"connection_sharing": "0"})
+        self.assertNotIn(mysql_router.ROUTING_RO_SECTION, _params)
+
+    def test_get_config_parameters_io_threads(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api_port = 0
+        mrc._get_routing_parameters = mock.MagicMock(return_value={})
+        mrc.options.ttl = 5
+        mrc.options.auth_cache_ttl = 10
+        mrc.options.auth_cache_refresh_interval = 7
+        mrc.options.max_connections = 1000
+        mrc.options.debug = False
+        mrc.options.use_gr_notifications = False
+        mrc.options.publish_x_protocol = False
+        mrc.options.io_threads = "4"
+
+        self.cmp_pkgrevno.return_value = -1
+        self.assertNotIn(mysql_router.IO_SECTION,
+                         mrc._get_config_parameters())
+
+        # Only 8.0.22 is needed, the newer features stay unmanaged
+        self.cmp_pkgrevno.side_effect = lambda pkg, version: (
+            1 if version == "8.0.22" else -1)
+        self.assertEqual(
+            mrc._get_config_parameters()[mysql_router.IO_SECTION],
+            {"threads": "4"})
+
+        mrc.options.io_threads = ""
+        self.assertNotIn(mysql_router.IO_SECTION,
+                         mrc._get_config_parameters())
+
+    def test_get_config_parameters_rest_api(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc._get_routing_parameters = mock.MagicMock(return_value={})
+        mrc.options.ttl = 5
+        mrc.options.auth_cache_ttl = 10
+        mrc.options.auth_cache_refresh_interval = 7
+        mrc.options.max_connections = 1000
+        mrc.options.debug = False
+        mrc.options.use_gr_notifications = False
+        mrc.options.publish_x_protocol = False
+        mrc.options.io_threads = ""
+        mrc.options.rest_api_port = 8443
+        mrc.options.router_instances = 2
+
+        # The bootstrap cannot disable the default REST API
+        self.cmp_pkgrevno.return_value = -1
+        self.assertIsNone(mrc.rest_api_port)
+        self.assertNotIn("http_server", mrc._get_config_parameters())
+
+        self.cmp_pkgrevno.return_value = 1
+        mrc.options.connection_sharing = False
+        mrc.options.connection_sharing_delay = -1
+        mrc.options.max_idle_server_connections = -1
+        mrc.options.idle_timeout = -1
+        self.assertEqual(mrc.rest_api_port, 8443)
+        _router = mrc.router_instance(1)
+        self.assertEqual(_router.rest_api_port, 8444)
+        _parameters = _router._get_config_parameters()
+        self.assertEqual(_parameters["http_server"], {
+            "bind_address": "127.0.0.1", "port": "8444", "ssl": "0"})
+        self.assertEqual(_parameters[mysql_router.REST_API_BACKEND_SECTION], {
+            "backend": "file", "filename": _router.rest_api_passwd_file})
+        self.assertEqual(_parameters["rest_api"], {})
+        for _heading in ("rest_router", "rest_routing", "rest_metadata_cache"):
+            self.assertEqual(_parameters[_heading],
+                             {"require_realm": mysql_router.REST_API_REALM})
+
+        mrc.options.rest_api_port = 0
+        self.assertIsNone(mrc.rest_api_port)
+
+    def test_rest_api_password(self):
+        self.patch_object(mysql_router.ch_core.host, "write_file")
+        self.patch_object(mysql_router.ch_core.host, "pwgen",
+                          return_value="generated")
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Generated into the password file once
+        with mock.patch("builtins.open", side_effect=FileNotFoundError):
+            self.assertEqual(mrc.rest_api_password, "generated")
+        self.write_file.assert_called_once_with(
+            mrc.exporter_password_file, "generated", owner="mysql",
+            group="mysql", perms=0o600)
+        self.pwgen.assert_called_once_with(32)
+
+        self.write_file.reset_mock()
+        with mock.patch("builtins.open",
+                        mock.mock_open(read_data="generated\n")):
+            self.assertEqual(mrc.rest_api_password, "generated")
+        self.write_file.assert_not_called()
+        self.pwgen.assert_called_once_with(32)
+
+    def test_configure_rest_api(self):
+        self.patch_object(mysql_router.shutil, "chown")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api_port = 8443
+        self.cmp_pkgrevno.return_value = 1
+        mrc.remove_rest_api_sections = mock.MagicMock(
+            return_value=[("http_server", "")])
+        self.patch_object(mysql_router.MySQLRouterCharm, "rest_api_password",
+                          new_callable=mock.PropertyMock,
+                          return_value="secret")
+
+        # Not bootstrapped
+        self.os.path.exists.return_value = False
+        self.assertEqual(mrc.configure_rest_api(), [])
+        self.subprocess.check_output.assert_not_called()
+
+        # The user file is written once
+        self.os.path.exists.side_effect = [True, False]
+        self.assertEqual(mrc.configure_rest_api(), [])
+        self.subprocess.check_output.assert_called_once_with(
+            ["/usr/bin/mysqlrouter_passwd", "set", mrc.rest_api_passwd_file,
+             mysql_router.REST_API_USER],
+            input=b"secret\n", stderr=self.subprocess.STDOUT)
+        self.chown.assert_called_once_with(
+            mrc.rest_api_passwd_file, "mysql", "mysql")
+        self.os.chmod.assert_called_once_with(mrc.rest_api_passwd_file, 0o600)
+
+        self.os.path.exists.side_effect = None
+        self.os.path.exists.return_value = True
+        self.subprocess.reset_mock()
+        self.assertEqual(mrc.configure_rest_api(), [])
+        self.subprocess.check_output.assert_not_called()
+        mrc.remove_rest_api_sections.assert_not_called()
+
+        # Disabled
+        mrc.options.rest_api_port = 0
+        self.assertEqual(mrc.configure_rest_api(), [("http_server", "")])
+
+    def test_remove_rest_api_sections(self):
+        _config = configparser.ConfigParser()
+        _config.read_dict({"DEFAULT": {"name": "foo"},
+                           "http_server": {"port": "8443"}})
+        self.patch_object(mysql_router.configparser, "ConfigParser",
+                          return_value=_config)
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.write_mysqlrouter_conf = mock.MagicMock(return_value=True)
+
+        # Written by the bootstrap
+        self.assertEqual(mrc.remove_rest_api_sections(), [])
+        mrc.write_mysqlrouter_conf.assert_not_called()
+
+        # Written by the charm, empty sections included
+        mrc.options.rest_api_port = 8443
+        self.cmp_pkgrevno.return_value = 1
+        self.os.path.exists.return_value = True
+        self.assertIn(("rest_api", ""), mrc.update_config_parameters(
+            mrc._get_rest_api_parameters()))
+        self.assertTrue(_config.has_section("rest_api"))
+        self.assertEqual(
+            mrc.remove_rest_api_sections(),
+            [(_heading, "") for _heading in mysql_router.REST_API_SECTIONS])
+        self.assertEqual(_config.sections(), [])
+        self.assertEqual(_config["DEFAULT"]["name"], "foo")
+
+    def test_get_config_parameters_gr_notifications(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api_port = 0
+        mrc._get_routing_parameters = mock.MagicMock(return_value={})
+        mrc.options.ttl = 300
+        mrc.options.auth_cache_ttl = 10
+        mrc.options.auth_cache_refresh_interval = 7
+        mrc.options.max_connections = 1000
+        mrc.options.debug = False
+        mrc.options.publish_x_protocol = False
+        mrc.options.use_gr_notifications = True
+
+        self.cmp_pkgrevno.return_value = -1
+        self.assertNotIn(
+            "use_gr_notifications",
+            mrc._get_config_parameters()[mysql_router.METADATA_CACHE_SECTION])
+
+        self.cmp_pkgrevno.side_effect = lambda pkg, version: (
+            1 if version == "8.0.17" else -1)
+        self.assertEqual(
+            mrc._get_config_parameters()[mysql_router.METADATA_CACHE_SECTION],
+            {"ttl": "300", "auth_cache_ttl": "10",
+             "auth_cache_refresh_interval": "7",
+             "use_gr_notifications": "1"})
+
+        # Disabled, only written where it was set before
+        mrc.options.use_gr_notifications = False
+        self.assertNotIn(
+            "use_gr_notifications",
+            mrc._get_config_parameters()[mysql_router.METADATA_CACHE_SECTION])
+        mrc.router_config.parser["metadata_cache:jujuCluster"] = {
+            "use_gr_notifications": "1"}
+        mrc.router_config.sections.invalidate()
+        self.assertEqual(
+            mrc._get_config_parameters()[mysql_router.METADATA_CACHE_SECTION][
+                "use_gr_notifications"], "0")
+
+    def test_io_threads(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.patch_object(mysql_router, "available_cpus", return_value=6)
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "systemd_unit_properties",
+            new_callable=mock.PropertyMock)
+        self.systemd_unit_properties.return_value = {"LimitNOFILE": "1024"}
+        mrc = mysql_router.MySQLRouterCharm()
+        for _value, _threads in ((None, None), ("", None), (" 3 ", 3),
+                                 ("auto", 6), ("0", None), ("1025", None),
+                                 ("many", None)):
+            mrc.options.io_threads = _value
+            self.assertEqual(mrc.io_threads, _threads)
+        self.assertEqual(self.log.call_count, 3)
+
+        self.available_cpus.return_value = 2048
+        mrc.options.io_threads = "auto"
+        self.assertEqual(mrc.io_threads, mysql_router.MAX_IO_THREADS)
+
+        # The router's own CPU affinity and quota
+        self.available_cpus.return_value = 6
+        for _properties, _threads in (
+                ({"CPUAffinity": "0-1 4"}, 3),
+                ({"CPUAffinity": "0-15"}, 6),
+                ({"CPUQuota": "150%"}, 2),
+                ({"CPUQuota": "50%"}, 1),
+                ({"CPUAffinity": "0-3", "CPUQuota": "200%"}, 2)):
+            self.systemd_unit_properties.return_value = _properties
+            self.assertEqual(mrc.io_threads, _threads)
+
+    def test_cpu_list_count(self):
+        for _value, _count in (("0", 1), ("0-3 8", 5), ("0,2,4-5", 4),
+                               ("1-2 2-3", 3), ("3-0", 0)):
+            self.assertEqual(mysql_router.cpu_list_count(_value), _count)
+
+    def test_available_cpus(self):
+        self.patch_object(mysql_router, "cgroup_cpu_quota")
+        self.cgroup_cpu_quota.return_value = None
+        self.os.sched_getaffinity.return_value = {0, 1, 2, 3}
+        self.assertEqual(mysql_router.available_cpus(), 4)
+
+        # cgroup limit
+        self.cgroup_cpu_quota.return_value = 2.5
+        self.assertEqual(mysql_router.available_cpus(), 3)
+        self.cgroup_cpu_quota.return_value = 0.5
+        self.assertEqual(mysql_router.available_cpus(), 1)
+        self.cgroup_cpu_quota.return_value = 16
+        self.assertEqual(mysql_router.available_cpus(), 4)
+
+        # No affinity support
+        self.cgroup_cpu_quota.return_value = None
+        self.os.sched_getaffinity.side_effect = AttributeError
+        self.os.cpu_count.return_value = 8
+        self.assertEqual(mysql_router.available_cpus(), 8)
+
+    def test_cgroup_cpu_quota(self):
+        _files = {}
+
+        def _open(path, *args, **kwargs):
+            if path not in _files:
+                raise OSError(path)
+            return mock.mock_open(read_data=_files[path])()
+
+        with mock.patch("builtins.open", side_effect=_open):
+            self.assertIsNone(mysql_router.cgroup_cpu_quota())
+
+            # cgroup v1
+            _files[mysql_router.CGROUP_CPU_CFS_QUOTA] = "-1\n"
+            _files[mysql_router.CGROUP_CPU_CFS_PERIOD] = "100000\n"
+            self.assertIsNone(mysql_router.cgroup_cpu_quota())
+            _files[mysql_router.CGROUP_CPU_CFS_QUOTA] = "150000\n"
+            self.assertEqual(mysql_router.cgroup_cpu_quota(), 1.5)
+
+            # cgroup v2
+            _files[mysql_router.CGROUP_CPU_MAX] = "max 100000\n"
+            self.assertIsNone(mysql_router.cgroup_cpu_quota())
+            _files[mysql_router.CGROUP_CPU_MAX] = "200000 100000\n"
+            self.assertEqual(mysql_router.cgroup_cpu_quota(), 2)
+
+    def test_get_connection_sharing_parameters(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.connection_sharing = True
+        mrc.options.connection_sharing_delay = 2
+        self.assertEqual(
+            mrc._get_connection_sharing_parameters("PREFERRED"),
+            {"connection_sharing": "1", "connection_sharing_delay": "2"})
+        self.log.assert_not_called()
+
+        # TLS passed through to the cluster
+        self.assertEqual(
+            mrc._get_connection_sharing_parameters("PASSTHROUGH"),
+            {"connection_sharing": "0"})
+        self.log.assert_called_once()
+
+        mrc.options.connection_sharing = False
+        self.assertEqual(
+            mrc._get_connection_sharing_parameters(None),
+            {"connection_sharing": "0"})
+
+    def test_get_routing_parameters(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rw_routing_strategy = ""
+        mrc.options.ro_routing_strategy = ""
+        mrc.options.connect_timeout = -1
+        mrc.options.client_connect_timeout = -1
+        mrc.options.max_connect_errors = -1
+        self.assertEqual(
+            mrc._get_routing_parameters(mysql_router.ROUTING_RW_SECTION), {})
+        self.assertEqual(
+            mrc._get_routing_parameters(mysql_router.ROUTING_RO_SECTION), {})
+
+        mrc.options.rw_routing_strategy = "round-robin"
+        mrc.options.ro_routing_strategy = "round-robin-with-fallback"
+        for _heading in (mysql_router.ROUTING_RW_SECTION,
+                         mysql_router.ROUTING_X_RW_SECTION):
+            self.assertEqual(mrc._get_routing_parameters(_heading),
+                             {"routing_strategy": "round-robin"})
+        for _heading in (mysql_router.ROUTING_RO_SECTION,
+                         mysql_router.ROUTING_X_RO_SECTION):
+            self.assertEqual(
+                mrc._get_routing_parameters(_heading),
+                {"routing_strategy": "round-robin-with-fallback"})
+
+        # Invalid values are left out
+        mrc.options.rw_routing_strategy = "round-robin-with-fallback"
+        self.assertEqual(
+            mrc._get_routing_parameters(mysql_router.ROUTING_RW_SECTION), {})
+        self.log.assert_called_once_with(
+            "Ignoring invalid rw_routing_strategy round-robin-with-fallback",
+            "WARNING")
+
+    def test_get_routing_parameters_timeouts(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rw_routing_strategy = ""
+        mrc.options.ro_routing_strategy = ""
+        mrc.options.connect_timeout = 2
+        mrc.options.client_connect_timeout = 5
+        mrc.options.max_connect_errors = 4294967295
+        for _heading in (mysql_router.ROUTING_RW_SECTION,
+                         mysql_router.ROUTING_RO_SECTION,
+                         mysql_router.ROUTING_X_RW_SECTION,
+                         mysql_router.ROUTING_X_RO_SECTION):
+            self.assertEqual(
+                mrc._get_routing_parameters(_heading),
+                {"connect_timeout": "2", "client_connect_timeout": "5",
+                 "max_connect_errors": "4294967295"})
+
+        # Out of range values are left out
+        mrc.options.connect_timeout = 0
+        mrc.options.client_connect_timeout = 1
+        self.assertEqual(
+            mrc._get_routing_parameters(mysql_router.ROUTING_RW_SECTION),
+            {"max_connect_errors": "4294967295"})
+        self.log.assert_has_calls([
+            mock.call("Ignoring invalid connect_timeout 0", "WARNING"),
+            mock.call("Ignoring invalid client_connect_timeout 1",
+                      "WARNING")])
+
+    def test_check_charm_config(self):
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api_port = 0
+        mrc.options.metrics_port = 0
+        mrc.options.metrics_address = "127.0.0.1"
+        mrc.options.router_instances = 1
+        for _option in mysql_router.SYSTEMD_RESOURCE_OPTIONS:
+            setattr(mrc.options, _option.replace("-", "_"), "")
+        mrc.options.rw_routing_strategy = ""
+        mrc.options.ro_routing_strategy = "round-robin"
+        mrc.options.connect_timeout = -1
+        mrc.options.client_connect_timeout = 9
+        mrc.options.max_connect_errors = -1
+        mrc.options.io_threads = "auto"
+        self.assertEqual(mrc.invalid_config_options(), [])
+        self.assertEqual(mrc.check_charm_config(), (None, None))
+
+        mrc.options.rw_routing_strategy = "random"
+        mrc.options.ro_routing_strategy = "random"
+        self.assertEqual(mrc.invalid_config_options(),
+                         ["rw_routing_strategy", "ro_routing_strategy"])
+        self.assertEqual(
+            mrc.check_charm_config(),
+            ("blocked",
+             "Invalid config: rw_routing_strategy, ro_routing_strategy"))
+
+        mrc.options.rw_routing_strategy = ""
+        mrc.options.ro_routing_strategy = ""
+        mrc.options.max_connect_errors = 0
+        self.assertEqual(mrc.invalid_config_options(), ["max_connect_errors"])
+
+        mrc.options.max_connect_errors = -1
+        for _value in ("0", "1025", "-1", "many"):
+            mrc.options.io_threads = _value
+            self.assertEqual(mrc.invalid_config_options(), ["io-threads"])
+        mrc.options.io_threads = "16"
+        self.assertEqual(mrc.invalid_config_options(), [])
+
+        # The REST API ports of all instances must be valid
+        mrc.options.router_instances = 2
+        mrc.options.rest_api_port = 65535
+        mrc.options.metrics_port = 9152
+        self.assertEqual(mrc.invalid_config_options(), ["rest-api-port"])
+        mrc.options.rest_api_port = 65534
+        self.assertEqual(mrc.invalid_config_options(), [])
+        mrc.options.metrics_port = 65536
+        self.assertEqual(mrc.invalid_config_options(), ["metrics-port"])
+        mrc.options.rest_api_port = 0
+        mrc.options.metrics_port = 9152
+        self.assertEqual(mrc.invalid_config_options(), ["metrics-port"])
+
+        mrc.options.rest_api_port = 8443
+        for _value in ("0.0.0.0", "::", "10.0.0.10"):
+            mrc.options.metrics_address = _value
+            self.assertEqual(mrc.invalid_config_options(), [])
+        for _value in ("", "localhost", "10.0.0.10:9152"):
+            mrc.options.metrics_address = _value
+            self.assertEqual(mrc.invalid_config_options(),
+                             ["metrics-address"])
+        # Not in use without the exporter
+        mrc.options.metrics_port = 0
+        self.assertEqual(mrc.invalid_config_options(), [])
+
     def test_proxy_db_and_user_responses_no_data(self):
         self.db_router.password.return_value = None
 
@@ -775,8 +1929,49 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         _mock_config_parser.__getitem__.assert_called_once_with('DEFAULT')
         _mock_config_parser.__getitem__().__setitem__.assert_called_once_with(
             'client_ssl_mode', 'PREFERRED')
-        _mock_config_parser.write.assert_called_once_with(
-            self.mock_open()().__enter__())
+        _mock_config_parser.write.assert_called_once()
+        self.os.rename.assert_called_once_with(
+            "{}.tmp".format(mrc.mysqlrouter_conf), mrc.mysqlrouter_conf)
+
+    def test_write_mysqlrouter_conf(self):
+        self.patch_object(mysql_router, "write_file_atomic")
+        _config = mock.MagicMock()
+        _config.write.side_effect = lambda f: f.write("[DEFAULT]\n")
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Unchanged
+        with mock.patch("builtins.open",
+                        mock.mock_open(read_data="[DEFAULT]\n")):
+            self.assertFalse(mrc.write_mysqlrouter_conf(_config))
+        self.write_file_atomic.assert_not_called()
+
+        # Changed
+        with mock.patch("builtins.open",
+                        mock.mock_open(read_data="[logger]\n")):
+            self.assertTrue(mrc.write_mysqlrouter_conf(_config))
+        self.write_file_atomic.assert_called_once_with(
+            mrc.mysqlrouter_conf, "[DEFAULT]\n")
+
+    def test_write_file_atomic(self):
+        _path = "/var/lib/mysql/foo/mysqlrouter.conf"
+        _tmp = "{}.tmp".format(_path)
+        self.os.stat.return_value.st_uid = 111
+        self.os.stat.return_value.st_gid = 112
+        self.os.stat.return_value.st_mode = 0o100600
+        mysql_router.write_file_atomic(_path, "content")
+        self.mock_open().assert_called_once_with(_tmp, "w")
+        self.os.fsync.assert_called()
+        self.os.chown.assert_called_once_with(_tmp, 111, 112)
+        self.os.chmod.assert_called_once_with(_tmp, 0o600)
+        self.os.rename.assert_called_once_with(_tmp, _path)
+
+        # Failed write leaves the target untouched
+        self.os.reset_mock()
+        self.os.fsync.side_effect = OSError
+        with self.assertRaises(OSError):
+            mysql_router.write_file_atomic(_path, "content")
+        self.os.rename.assert_not_called()
+        self.os.unlink.assert_called_once_with(_tmp)
 
     def test_update_config_parameters_missing_heading(self):
         # test fix for Bug LP#1927981
@@ -848,6 +2043,132 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.assertEqual(fake_config['routing:foo_rw'],
                          {"test": True})
 
+    def test_router_config(self):
+        self.patch_object(mysql_router.configparser, "ConfigParser")
+        self.os.stat.return_value.st_mtime_ns = 1
+        self.os.stat.return_value.st_size = 2048
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # Parsed once while the file is unchanged
+        _model = mrc.router_config
+        self.assertIs(mrc.router_config, _model)
+        self.ConfigParser.assert_called_once_with()
+        self.ConfigParser.return_value.read.assert_called_once_with(
+            mrc.mysqlrouter_conf)
+
+        # Reloaded when the file changes
+        self.os.stat.return_value.st_mtime_ns = 3
+        self.assertIsNot(mrc.router_config, _model)
+        self.assertEqual(self.ConfigParser.call_count, 2)
+
+    def test_section_index(self):
+        config = FakeConfigParser({
+            "DEFAULT": {},
+            "metadata_cache:foo": {},
+            "routing:foo_x_rw": {},
+            "routing:foo_x_ro": {},
+            "routing:foo_rw": {},
+            "routing:foo_ro": {},
+        })
+        index = mysql_router.SectionIndex(config)
+        self.assertEqual(index.resolve(mysql_router.METADATA_CACHE_SECTION),
+                         "metadata_cache:foo")
+        self.assertEqual(index.resolve(mysql_router.ROUTING_RW_SECTION),
+                         "routing:foo_rw")
+        self.assertEqual(index.resolve(mysql_router.ROUTING_RO_SECTION),
+                         "routing:foo_ro")
+        self.assertEqual(index.resolve(mysql_router.ROUTING_X_RW_SECTION),
+                         "routing:foo_x_rw")
+        self.assertEqual(index.resolve(mysql_router.ROUTING_X_RO_SECTION),
+                         "routing:foo_x_ro")
+        self.assertEqual(index.resolve("logger"), "logger")
+
+        # Cached until invalidated
+        config["logger"] = {}
+        config.pop("routing:foo_rw")
+        self.assertEqual(index.resolve(mysql_router.ROUTING_RW_SECTION),
+                         "routing:foo_rw")
+        index.invalidate()
+        self.assertEqual(index.resolve(mysql_router.ROUTING_RW_SECTION),
+                         mysql_router.ROUTING_RW_SECTION)
+
+    def test_update_config_parameters_changes(self):
+        current_config = {
+            "DEFAULT": {"client_ssl_mode": "NONE",
+                        "unknown_config_option": "error"},
+            "logger": {"level": "INFO"},
+        }
+        fake_config = FakeConfigParser(current_config)
+        self.patch_object(mysql_router.configparser, "ConfigParser",
+                          return_value=fake_config)
+        _params = {
+            "DEFAULT": {"client_ssl_mode": "NONE",
+                        "unknown_config_option": "warning"},
+            "logger": {"level": "DEBUG"},
+            "metadata_cache:jujuCluster": {"ttl": "5"},
+        }
+
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.write_mysqlrouter_conf = mock.MagicMock(return_value=True)
+        self.assertEqual(
+            mrc.update_config_parameters(_params),
+            [("DEFAULT", "unknown_config_option"),
+             ("logger", "level"),
+             ("metadata_cache:jujuCluster", "ttl")])
+
+        # Nothing written
+        mrc.write_mysqlrouter_conf.return_value = False
+        self.assertEqual(mrc.update_config_parameters(_params), [])
+
+    def test_classify_config_changes(self):
+        self.assertEqual(
+            mysql_router.classify_config_changes([]),
+            mysql_router.CHANGE_NONE)
+        self.assertEqual(
+            mysql_router.classify_config_changes(
+                [("DEFAULT", "unknown_config_option")]),
+            mysql_router.CHANGE_NONE)
+        self.assertEqual(
+            mysql_router.classify_config_changes(
+                [("DEFAULT", "unknown_config_option"), ("logger", "level")]),
+            mysql_router.CHANGE_RESTART)
+
+    def test_apply_config_changes(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.custom_restart_function = mock.MagicMock()
+
+        # No changes
+        self.assertEqual(mrc.apply_config_changes([]),
+                         mysql_router.CHANGE_NONE)
+        mrc.custom_restart_function.assert_not_called()
+        self.assertNotIn(mysql_router.CONFIG_CHANGE_ACTION_KEY, _kv)
+
+        # Changes which do not need a restart
+        self.assertEqual(
+            mrc.apply_config_changes([("DEFAULT", "unknown_config_option")]),
+            mysql_router.CHANGE_NONE)
+        mrc.custom_restart_function.assert_not_called()
+        self.assertEqual(
+            _kv[mysql_router.CONFIG_CHANGE_ACTION_KEY],
+            {"action": mysql_router.CHANGE_NONE,
+             "changes": ["DEFAULT.unknown_config_option"]})
+
+        # Changes which need a restart
+        self.assertEqual(
+            mrc.apply_config_changes([("logger", "level")]),
+            mysql_router.CHANGE_RESTART)
+        mrc.custom_restart_function.assert_called_once_with(mrc.name)
+
+        # Restart required after a forced bootstrap
+        mrc.custom_restart_function.reset_mock()
+        self.assertEqual(
+            mrc.apply_config_changes([], restart=True),
+            mysql_router.CHANGE_RESTART)
+        mrc.custom_restart_function.assert_called_once_with(mrc.name)
+
     def test_update_config_parameters_not_bootstrapped(self):
         self.patch_object(mysql_router.os.path, "exists",
                           return_value=False)
@@ -865,6 +2186,20 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
             "auth_cache_refresh_interval": '7',
             "max_connections": '1000',
             "debug": False,
+            "publish-x-protocol": False,
+            "rw_routing_strategy": "",
+            "ro_routing_strategy": "",
+            "max_idle_server_connections": -1,
+            "idle_timeout": -1,
+            "connection_sharing": False,
+            "connection_sharing_delay": -1,
+            "connect_timeout": -1,
+            "client_connect_timeout": -1,
+            "max_connect_errors": -1,
+            "io-threads": "",
+            "use_gr_notifications": False,
+            "router-instances": 1,
+            "rest-api-port": 0,
         }
 
         def _fake_config(data=_config_data, key=None):
@@ -875,20 +2210,33 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.patch_object(mysql_router.ch_core.host, "restart_on_change")
         self.config.side_effect = _fake_config
         self.endpoint_from_flag.return_value = self.db_router
+        self.patch_object(mysql_router.reactive.flags, "is_flag_set",
+                          return_value=False)
 
         _mock_update_config_parameters = mock.MagicMock()
         mrc = mysql_router.MySQLRouterCharm()
         mrc.name = 'foobar'
         mrc.update_config_parameters = _mock_update_config_parameters
+        mrc.configure_monitor_service = mock.MagicMock()
+        mrc.update_systemd_unit = mock.MagicMock(return_value=[])
+        mrc.configure_rest_api = mock.MagicMock(return_value=[])
+        mrc.configure_exporter_service = mock.MagicMock()
 
         _metadata_config = copy.deepcopy(_config_data)
-        _metadata_config.pop('max_connections')
-        _metadata_config.pop('debug')
+        for _key in ('max_connections', 'debug', 'publish-x-protocol',
+                     'rw_routing_strategy', 'ro_routing_strategy',
+                     'max_idle_server_connections', 'idle_timeout',
+                     'connection_sharing', 'connection_sharing_delay',
+                     'connect_timeout', 'client_connect_timeout',
+                     'max_connect_errors', 'io-threads',
+                     'use_gr_notifications', 'router-instances',
+                     'rest-api-port'):
+            _metadata_config.pop(_key)
         _params = {
             mysql_router.METADATA_CACHE_SECTION: _metadata_config,
             mysql_router.DEFAULT_SECTION: {
                 'max_total_connections': _config_data['max_connections'],
-                'pid_file': '/run/mysql/mysqlrouter-foobar.pid',
+                'pid_file': '/run/mysqlrouter-foobar/mysqlrouter.pid',
                 'unknown_config_option': 'warning',
             },
             mysql_router.LOGGING_SECTION: {
@@ -918,6 +2266,8 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         _params["DEFAULT"].pop("max_connections")
         _params["DEFAULT"]["max_total_connections"] = \
             _config_data['max_connections']
+        # Disabled GR notifications and connection sharing are left to the
+        # router defaults
 
         # mysql-router pkg >= 8.0.23, no client_ssl_cert
         self.cmp_pkgrevno.return_value = 1
@@ -930,18 +2280,13 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         # mysql-router pkg >= 8.0.23, client_ssl_cert
         self.cmp_pkgrevno.return_value = 1
 
-        class FakeConfigParser(dict):
-            def read(*args, **kwargs):
-                pass
-
-            def write(*args, **kwargs):
-                pass
-
         current_config = {"DEFAULT": {"client_ssl_cert": "cert"}}
         fake_config = FakeConfigParser(current_config)
 
         self.patch_object(mysql_router.configparser, "ConfigParser",
                           return_value=fake_config)
+        # mysqlrouter.conf changed on disk
+        self.os.stat.return_value.st_mtime_ns = 2
 
         # With TLS PASSTHROUGH
         self.db_router.ssl_ca.return_value = '"CACERT"'
@@ -952,27 +2297,519 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         _mock_update_config_parameters.assert_called_once_with(_params)
 
         # With TLS PREFERRED
+        # Relation data of a later hook
         self.db_router.ssl_ca.return_value = None
+        mrc._db_router_snapshot = None
         _params["DEFAULT"]["client_ssl_mode"] = "PREFERRED"
         self.exists.return_value = True
         _mock_update_config_parameters.reset_mock()
         mrc.config_changed()
         _mock_update_config_parameters.assert_called_once_with(_params)
 
+    def test_config_changed_systemd_unit(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "hook_name",
+                          return_value="config-changed")
+        self.patch_object(mysql_router.reactive.flags, "is_flag_set",
+                          return_value=False)
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.configure_rest_api = mock.MagicMock(return_value=[])
+        mrc.configure_exporter_service = mock.MagicMock()
+        mrc.options.router_instances = 1
+        mrc.configure_monitor_service = mock.MagicMock()
+        mrc.update_systemd_unit = mock.MagicMock(
+            return_value=[mysql_router.SYSTEMD_UNIT_CHANGE])
+        mrc._get_config_parameters = mock.MagicMock()
+        mrc.update_config_parameters = mock.MagicMock(
+            return_value=[("logger", "level")])
+        mrc.apply_config_changes = mock.MagicMock()
+
+        mrc.configure_router_instances = mock.MagicMock()
+
+        mrc.config_changed()
+        mrc.apply_config_changes.assert_called_once_with(
+            [("logger", "level"), mysql_router.SYSTEMD_UNIT_CHANGE],
+            restart=False)
+        mrc.configure_router_instances.assert_not_called()
+
+        # Bootstrapped additional instances are configured too, only
+        # instance 0 is restarted after a bootstrap
+        self.is_flag_set.return_value = True
+        self.os.path.exists.return_value = True
+        mrc.options.router_instances = 2
+        mrc.apply_config_changes.reset_mock()
+        mrc.config_changed()
+        self.assertEqual(mrc.apply_config_changes.call_args_list, [
+            mock.call([("logger", "level"), mysql_router.SYSTEMD_UNIT_CHANGE],
+                      restart=True),
+            mock.call([("logger", "level"), mysql_router.SYSTEMD_UNIT_CHANGE],
+                      restart=False)])
+        mrc.configure_router_instances.assert_called_once_with()
+
+    def test_config_changed_restart_required(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "hook_name",
+                          return_value="config-changed")
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=FakeKV())
+        self.patch_object(mysql_router.reactive.flags, "is_flag_set")
+        _flags = {mysql_router.MYSQL_ROUTER_STARTED,
+                  mysql_router.MYSQL_ROUTER_RESTART_REQUIRED}
+        self.is_flag_set.side_effect = lambda flag: flag in _flags
+        self.clear_flag.side_effect = _flags.discard
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.router_instances = 1
+        mrc.configure_monitor_service = mock.MagicMock()
+        mrc.configure_rest_api = mock.MagicMock(return_value=[])
+        mrc.configure_exporter_service = mock.MagicMock()
+        mrc.configure_router_instances = mock.MagicMock()
+        mrc.update_systemd_unit = mock.MagicMock(return_value=[])
+        mrc._get_config_parameters = mock.MagicMock()
+        mrc.update_config_parameters = mock.MagicMock(return_value=[])
+        mrc.custom_restart_function = mock.MagicMock()
+
+        # A started router is restarted once after a forced bootstrap
+        mrc.config_changed()
+        mrc.config_changed()
+        mrc.custom_restart_function.assert_called_once_with(mrc.name)
+        self.assertNotIn(mysql_router.MYSQL_ROUTER_RESTART_REQUIRED, _flags)
+
+        # A failed restart leaves the restart for the next hook
+        _flags.add(mysql_router.MYSQL_ROUTER_RESTART_REQUIRED)
+        mrc.custom_restart_function.side_effect = FakeException
+        with self.assertRaises(FakeException):
+            mrc.config_changed()
+        self.assertIn(mysql_router.MYSQL_ROUTER_RESTART_REQUIRED, _flags)
+
+    def test_update_systemd_unit(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.patch_object(mysql_router.ch_core.unitdata, "kv")
+        self.patch_object(mysql_router.reactive.flags, "is_flag_set")
+        self.kv.return_value = FakeKV()
+        _flags = {mysql_router.MYSQL_ROUTER_STARTED}
+        self.is_flag_set.side_effect = lambda flag: flag in _flags
+        _properties = {"LimitNOFILE": "65535"}
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "systemd_unit_properties",
+            new_callable=mock.PropertyMock)
+        self.systemd_unit_properties.side_effect = lambda: dict(_properties)
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.name = "foobar"
+        mrc.render_systemd_file = mock.MagicMock(return_value=True)
+        mrc.systemd_daemon_reload = mock.MagicMock()
+
+        # Unknown previous unit
+        self.assertEqual(mrc.update_systemd_unit(),
+                         [mysql_router.SYSTEMD_UNIT_CHANGE])
+        mrc.systemd_daemon_reload.assert_called_once_with()
+        self.subprocess.check_output.assert_not_called()
+
+        # cgroup controls only, applied at runtime
+        _properties.update({"CPUWeight": "200", "MemoryMax": "2G"})
+        self.assertEqual(mrc.update_systemd_unit(), [])
+        self.subprocess.check_output.assert_called_once_with(
+            ["systemctl", "set-property", "--runtime", "foobar",
+             "CPUWeight=200", "MemoryMax=2G"],
+            stderr=self.subprocess.STDOUT)
+
+        # Removed controls are reset
+        self.subprocess.check_output.reset_mock()
+        del _properties["MemoryMax"]
+        self.assertEqual(mrc.update_systemd_unit(), [])
+        self.subprocess.check_output.assert_called_once_with(
+            ["systemctl", "set-property", "--runtime", "foobar",
+             "MemoryMax=infinity"],
+            stderr=self.subprocess.STDOUT)
+
+        # Affinity requires a restart
+        self.subprocess.check_output.reset_mock()
+        _properties.update({"CPUWeight": "300", "CPUAffinity": "0-3"})
+        self.assertEqual(mrc.update_systemd_unit(),
+                         [mysql_router.SYSTEMD_UNIT_CHANGE])
+        self.subprocess.check_output.assert_not_called()
+
+        # Not started yet
+        _flags.clear()
+        _properties["LimitNOFILE"] = "100000"
+        self.assertEqual(mrc.update_systemd_unit(), [])
+
+        # Unchanged unit file
+        mrc.systemd_daemon_reload.reset_mock()
+        mrc.render_systemd_file.return_value = False
+        self.assertEqual(mrc.update_systemd_unit(), [])
+        mrc.systemd_daemon_reload.assert_not_called()
+
+    def test_systemd_unit_properties(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, "mysqlrouter_nofile_limit",
+            new_callable=mock.PropertyMock, return_value=65535)
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.rest_api_port = 0
+        mrc.options.metrics_port = 0
+        mrc.options.router_instances = 1
+        mrc.options.rw_routing_strategy = ""
+        mrc.options.ro_routing_strategy = ""
+        for _option in mysql_router.ROUTING_PARAMETER_LIMITS:
+            setattr(mrc.options, _option, -1)
+        mrc.options.io_threads = ""
+        for _option in mysql_router.SYSTEMD_RESOURCE_OPTIONS:
+            setattr(mrc.options, _option.replace("-", "_"), "")
+        self.assertEqual(mrc.systemd_unit_properties,
+                         {"LimitNOFILE": "65535"})
+
+        mrc.options.cpu_affinity = "0-3 8"
+        mrc.options.cpu_weight = "200"
+        mrc.options.cpu_quota = "150%"
+        mrc.options.memory_high = "1G"
+        mrc.options.memory_max = "90%"
+        mrc.options.numa_node = "0"
+        self.assertEqual(
+            list(mrc.systemd_unit_properties.items()),
+            [("LimitNOFILE", "65535"), ("CPUAffinity", "0-3 8"),
+             ("CPUWeight", "200"), ("CPUQuota", "150%"),
+             ("MemoryHigh", "1G"), ("MemoryMax", "90%"),
+             ("NUMAPolicy", "bind"), ("NUMAMask", "0")])
+        self.assertEqual(mrc.invalid_config_options(), [])
+
+        # Invalid values are left out
+        mrc.options.cpu_weight = "0"
+        mrc.options.memory_max = "lots"
+        self.assertNotIn("CPUWeight", mrc.systemd_unit_properties)
+        self.assertNotIn("MemoryMax", mrc.systemd_unit_properties)
+        self.assertEqual(mrc.invalid_config_options(),
+                         ["cpu-weight", "memory-max"])
+
+    def test_render_systemd_file(self):
+        self.patch_object(mysql_router.ch_core.templating, "render")
+        self.patch_object(mysql_router.ch_core.host, "file_hash")
+        self.patch_object(mysql_router.MySQLRouterCharm,
+                          "systemd_unit_properties",
+                          new_callable=mock.PropertyMock,
+                          return_value={"LimitNOFILE": "65535"})
+        mrc = mysql_router.MySQLRouterCharm()
+        self.file_hash.side_effect = ["abc", "def"]
+        self.assertTrue(mrc.render_systemd_file())
+        self.assertEqual(self.render.call_args.kwargs["target"],
+                         mrc.systemd_file)
+        self.assertEqual(self.render.call_args.kwargs["context"], {
+            "name": mrc.name,
+            "working_dir": mrc.mysqlrouter_working_dir,
+            "runtime_directory": "mysqlrouter-{}".format(mrc.name),
+            "properties": {"LimitNOFILE": "65535"}})
+        self.file_hash.side_effect = ["abc", "abc"]
+        self.assertFalse(mrc.render_systemd_file())
+
+    def test_render_systemd_file_instance(self):
+        self.patch_object(mysql_router.ch_core.templating, "render")
+        self.patch_object(mysql_router.ch_core.host, "file_hash")
+        self.patch_object(mysql_router.MySQLRouterCharm,
+                          "systemd_unit_properties",
+                          new_callable=mock.PropertyMock,
+                          return_value={"LimitNOFILE": "65535"})
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.name = "keystone-mysql-router"
+        _router = mrc.router_instance(1)
+        _router.render_systemd_file()
+
+        # builtins.open is mocked, pathlib reads the real template
+        _template = pathlib.Path(__file__).parent.joinpath(
+            "../src/templates/mysqlrouter.service").read_text()
+        _unit = jinja2.Template(_template).render(
+            self.render.call_args.kwargs["context"])
+        # systemd removes the runtime directory when the service stops, so
+        # the PID files of the other instances must not live in it
+        self.assertIn(
+            "RuntimeDirectory=mysqlrouter-keystone-mysql-router-1\n", _unit)
+        self.assertEqual(
+            _router.mysqlrouter_pid_file,
+            "/run/mysqlrouter-keystone-mysql-router-1/mysqlrouter.pid")
+        self.assertEqual(
+            mrc.mysqlrouter_pid_file,
+            "/run/mysqlrouter-keystone-mysql-router/mysqlrouter.pid")
+        self.assertIn("ExecStart={}/start.sh\n".format(
+            _router.mysqlrouter_working_dir), _unit)
+        self.assertIn("LimitNOFILE=65535\n", _unit)
+
+    def test_mysqlrouter_nofile_limit(self):
+        self.patch_object(mysql_router.ch_core.hookenv, "log")
+        self.patch_object(mysql_router, "kernel_nr_open")
+        self.kernel_nr_open.return_value = 1048576
+        mrc = mysql_router.MySQLRouterCharm()
+
+        # The default budget keeps the historical limit
+        self.cmp_pkgrevno.return_value = 1
+        mrc.options.max_connections = 1024
+        self.assertEqual(mrc.mysqlrouter_nofile_limit,
+                         mysql_router.MIN_NOFILE_LIMIT)
+
+        # max_total_connections
+        mrc.options.max_connections = 100000
+        self.assertEqual(mrc.mysqlrouter_nofile_limit, 201024)
+
+        # max_connections of each route
+        self.cmp_pkgrevno.return_value = -1
+        mrc.options.max_connections = 50000
+        self.assertEqual(mrc.mysqlrouter_nofile_limit, 401024)
+        self.assertNotIn(
+            "WARNING", [c.args[1] for c in self.log.call_args_list])
+
+        # More than the host allows
+        self.cmp_pkgrevno.return_value = 1
+        mrc.options.max_connections = 9223372036854775807
+        self.assertEqual(mrc.mysqlrouter_nofile_limit, 1048576)
+        self.assertEqual(self.log.call_args.args[1], "WARNING")
+
+    def test_kernel_nr_open(self):
+        with mock.patch("builtins.open",
+                        mock.mock_open(read_data="1048576\n")):
+            self.assertEqual(mysql_router.kernel_nr_open(), 1048576)
+        with mock.patch("builtins.open", side_effect=OSError):
+            self.assertIsNone(mysql_router.kernel_nr_open())
+
     def test_custom_restart_function(self):
         self.patch_object(mysql_router.ch_core.host, "service_stop")
         self.patch_object(mysql_router.ch_core.host, "service_start")
         self.service_name = "mysql-router"
         _mock_check_mysql_connection = mock.MagicMock()
 
+        self.patch_object(mysql_router.time, "monotonic")
+        self.patch_object(mysql_router.time, "sleep")
+        self.monotonic.return_value = 100.0
+
         mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.restart_ready_timeout = 60
         mrc.check_mysql_connection = _mock_check_mysql_connection
+        mrc.wait_for_router_ready = mock.MagicMock()
+        mrc.wait_for_router_ready.return_value = 0.5
 
         mrc.custom_restart_function(self.service_name)
         self.service_stop.assert_called_once_with(self.service_name)
         self.service_start.assert_called_once_with(self.service_name)
+        mrc.wait_for_router_ready.assert_called_once_with(timeout=60)
         _mock_check_mysql_connection.assert_called_once()
 
+        # Not ready in time: fail without checking the connection. The
+        # MySQLdb exceptions are mocked, so bypass the tenacity retries.
+        self.service_start.reset_mock()
+        _mock_check_mysql_connection.reset_mock()
+        mrc.wait_for_router_ready.reset_mock()
+        mrc.wait_for_router_ready.return_value = None
+        self.monotonic.return_value = 130.0
+        with self.assertRaises(mysql_router.RouterNotReadyError):
+            mysql_router.MySQLRouterCharm._restart_and_check.__wrapped__(
+                mrc, self.service_name, deadline=160.0)
+        self.service_start.assert_called_once_with(self.service_name)
+        mrc.wait_for_router_ready.assert_called_once_with(timeout=30.0)
+        _mock_check_mysql_connection.assert_not_called()
+
+    def test_stop_at_deadline(self):
+        self.patch_object(mysql_router.time, "monotonic")
+        self.monotonic.return_value = 100.0
+        _state = mock.MagicMock()
+        _state.kwargs = {}
+        self.assertFalse(mysql_router.stop_at_deadline(_state))
+        _state.kwargs = {"deadline": 100.5}
+        self.assertFalse(mysql_router.stop_at_deadline(_state))
+        _state.kwargs = {"deadline": 100.0}
+        self.assertTrue(mysql_router.stop_at_deadline(_state))
+
+    def test_wait_until_deadline(self):
+        self.patch_object(mysql_router.time, "monotonic")
+        self.monotonic.return_value = 100.0
+        _wait = mysql_router.wait_until_deadline(lambda retry_state: 10)
+        _state = mock.MagicMock()
+        _state.kwargs = {}
+        self.assertEqual(_wait(_state), 10)
+        _state.kwargs = {"deadline": 200.0}
+        self.assertEqual(_wait(_state), 10)
+        # Never sleep past the deadline
+        _state.kwargs = {"deadline": 102.5}
+        self.assertEqual(_wait(_state), 2.5)
+        _state.kwargs = {"deadline": 99.0}
+        self.assertEqual(_wait(_state), 0)
+
+    def test_benchmark_targets(self):
+        self.endpoint_from_flag.return_value = self.db_router
+        self.db_router.db_host.return_value = '"10.10.10.60"'
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.base_port = 3306
+
+        self.assertEqual(mrc.benchmark_targets(), {
+            "rw": {"host": "127.0.0.1", "port": 3306},
+            "ro": {"host": "127.0.0.1", "port": 3307},
+            "rw-socket": {"unix_socket": mrc.mysqlrouter_socket},
+            "ro-socket": {"unix_socket": mrc.mysqlrouter_ro_socket},
+            "direct": {"host": "10.10.10.60", "port": 3306}})
+
+        # Local stand-in
+        self.assertEqual(
+            mrc.benchmark_targets(
+                address="127.0.0.2", rw_port=13306, ro_port=13307,
+                sockets=False, direct_address="127.0.0.3",
+                direct_port=13308),
+            {"rw": {"host": "127.0.0.2", "port": 13306},
+             "ro": {"host": "127.0.0.2", "port": 13307},
+             "direct": {"host": "127.0.0.3", "port": 13308}})
+        self.assertNotIn(
+            "direct", mrc.benchmark_targets(sockets=False, direct=False))
+
+        # The cluster address is unknown without the db-router relation
+        self.endpoint_from_flag.return_value = None
+        self.assertNotIn("direct", mrc.benchmark_targets())
+
+    def test_benchmark_router(self):
+        self.patch_object(mysql_router.router_benchmark, "benchmark")
+        mrc = mysql_router.MySQLRouterCharm()
+
+        def _result(connect_ms, query_ms):
+            return {"connect": {"p50_ms": connect_ms},
+                    "query": {"p50_ms": query_ms}}
+
+        # Benchmarked in order: direct, ro, rw
+        self.benchmark.side_effect = [
+            _result(1.0, 0.25), _result(1.5, None), _result(3.0, 0.75)]
+        with mock.patch.object(
+                mysql_router.MySQLRouterCharm, "db_router_password",
+                new_callable=mock.PropertyMock, return_value="pass"):
+            _results = mrc.benchmark_router(
+                {"rw": {"host": "127.0.0.1", "port": 3306},
+                 "direct": {"host": "10.10.10.60", "port": 3306},
+                 "ro": {"host": "127.0.0.1", "port": 3307}},
+                iterations=10, concurrency=2, time_limit=5)
+
+        self.assertEqual(_results["rw"]["overhead_p50_ms"],
+                         {"connect": 2.0, "query": 0.5})
+        self.assertEqual(_results["ro"]["overhead_p50_ms"],
+                         {"connect": 0.5})
+        self.assertNotIn("overhead_p50_ms", _results["direct"])
+        _connect = self.benchmark.call_args_list[0][0][0]
+        self.assertEqual(_connect.func, mysql_router.mysql.MySQLdb.connect)
+        self.assertEqual(_connect.keywords, {
+            "user": mrc.db_router_user, "passwd": "pass",
+            "connect_timeout": mrc.mysql_connect_timeout,
+            "host": "10.10.10.60", "port": 3306})
+        self.benchmark.assert_called_with(
+            mock.ANY, iterations=10, concurrency=2, time_limit=5)
+
+        # No credentials without the db-router relation
+        self.endpoint_from_flag.return_value = None
+        self.benchmark.reset_mock()
+        with self.assertRaises(ValueError):
+            mrc.benchmark_router({"rw": {"unix_socket": "/tmp/mysql.sock"}})
+        self.benchmark.assert_not_called()
+
+    def test_custom_restart_function_records(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.restart_ready_timeout = 60
+        mrc._restart_and_check = mock.MagicMock()
+
+        mrc.apply_config_changes([("logger", "level")])
+        mrc._restart_and_check.assert_called_once_with(
+            mrc.name, deadline=mock.ANY)
+        self.assertEqual(
+            [(r["service"], r["reason"])
+             for r in _kv[mysql_router.PERF_RESTARTS_KEY]],
+            [(mrc.name, "config-changed: logger.level")])
+        self.assertEqual(
+            [(s["phase"], s["ok"]) for s in _kv[mysql_router.PERF_SPANS_KEY]],
+            [("restart", True)])
+
+        # Failed restarts are recorded too
+        mrc._restart_and_check.side_effect = FakeException
+        with self.assertRaises(FakeException):
+            mrc.custom_restart_function(mrc.name)
+        self.assertEqual(_kv[mysql_router.PERF_RESTARTS_KEY][-1]["reason"],
+                         "config-changed: logger.level")
+        self.assertEqual(
+            [(s["phase"], s["ok"]) for s in _kv[mysql_router.PERF_SPANS_KEY]],
+            [("restart", True), ("restart", False)])
+
+    def test_timing_span(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+
+        @mysql_router.timed("phase")
+        def _phase(value):
+            return value
+
+        self.assertEqual(_phase("result"), "result")
+        _span = _kv[mysql_router.PERF_SPANS_KEY][0]
+        self.assertEqual(_span["phase"], "phase")
+        self.assertTrue(_span["ok"])
+        self.assertGreaterEqual(_span["duration"], 0)
+
+        # The ring buffer is bounded
+        for _ in range(mysql_router.PERF_HISTORY_LENGTH + 5):
+            _phase(None)
+        self.assertEqual(len(_kv[mysql_router.PERF_SPANS_KEY]),
+                         mysql_router.PERF_HISTORY_LENGTH)
+
+    def test_perf_report(self):
+        _kv = FakeKV()
+        self.patch_object(mysql_router.ch_core.unitdata, "kv",
+                          return_value=_kv)
+        self.assertEqual(
+            mysql_router.perf_report(),
+            {"phases": {},
+             "restarts": {"count": 0, "reasons": {}, "recent": []}})
+
+        _kv[mysql_router.PERF_SPANS_KEY] = [
+            {"phase": "start", "start": 1, "duration": float(d), "ok": True}
+            for d in range(1, 21)]
+        _kv[mysql_router.PERF_SPANS_KEY].append(
+            {"phase": "bootstrap", "start": 1, "duration": 30.0, "ok": False})
+        _restart = {"time": 1, "service": "foo", "reason": "upgrade-charm"}
+        _kv[mysql_router.PERF_RESTARTS_KEY] = [_restart, _restart]
+
+        _report = mysql_router.perf_report()
+        self.assertEqual(
+            _report["phases"]["start"],
+            {"count": 20, "failed": 0, "p50": 10.0, "p95": 19.0, "max": 20.0})
+        self.assertEqual(
+            _report["phases"]["bootstrap"],
+            {"count": 1, "failed": 1, "p50": 30.0, "p95": 30.0, "max": 30.0})
+        self.assertEqual(_report["restarts"]["count"], 2)
+        self.assertEqual(_report["restarts"]["reasons"], {"upgrade-charm": 2})
+
+    def test_wait_for_router_ready(self):
+        self.patch_object(mysql_router, "time")
+        self.patch_object(mysql_router, "router_endpoint_ready")
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.base_port = 3306
+
+        # Ready on the third poll
+        self.time.monotonic.side_effect = [100.0, 100.0, 100.05, 100.15]
+        self.router_endpoint_ready.side_effect = [False, False, True]
+        self.assertAlmostEqual(mrc.wait_for_router_ready(timeout=5), 0.15)
+        self.time.sleep.assert_has_calls([mock.call(0.05), mock.call(0.1)])
+        # Only the unix socket is polled, never the TCP ports
+        self.router_endpoint_ready.assert_has_calls(
+            [mock.call(mrc.mysqlrouter_socket)] * 3)
+
+        # Budget exhausted
+        self.time.reset_mock()
+        self.time.monotonic.side_effect = [100.0, 100.5, 101.0]
+        self.router_endpoint_ready.side_effect = None
+        self.router_endpoint_ready.return_value = False
+        self.assertIsNone(mrc.wait_for_router_ready(timeout=1))
+        self.time.sleep.assert_called_once_with(0.05)
+
+    def test_router_endpoint_ready(self):
+        self.patch_object(mysql_router.router_probe, "open_connection")
+        _sock = self.open_connection.return_value
+
+        self.assertTrue(
+            mysql_router.router_endpoint_ready("127.0.0.1", 3306))
+        self.open_connection.assert_called_once_with("127.0.0.1", 3306, 1.0)
+        _sock.close.assert_called_once_with()
+
+        self.open_connection.side_effect = OSError
+        self.assertFalse(
+            mysql_router.router_endpoint_ready("/var/lib/mysql/a/mysql.sock"))
+
     def test_upgrade_charm_lp1927981(self):
         # test fix for Bug LP#1927981
         current_config = {
@@ -994,11 +2831,14 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.patch_object(
             mysql_router.MySQLRouterCharm, '_get_config_parameters',
             return_value=fake_params)
+        self.patch_object(mysql_router.MySQLRouterCharm,
+                          'update_systemd_unit')
         mock_update_config_params = mock.MagicMock()
         self.patch_object(mysql_router.configparser, "ConfigParser",
                           return_value=fake_config)
 
         mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.router_instances = 1
         mrc.update_config_parameters = mock_update_config_params
         # should not throw a key error.
         mrc.upgrade_charm()
@@ -1007,6 +2847,28 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         mock_update_config_params.assert_called_once_with(
             fake_params, config=fake_config)
 
+    def test_upgrade_charm_systemd_unit(self):
+        fake_config = FakeConfigParser(
+            {"DEFAULT": {"unknown_config_option": "warning"}})
+        self.patch_object(mysql_router.charms_openstack.charm.OpenStackCharm,
+                          'upgrade_charm')
+        self.patch_object(
+            mysql_router.MySQLRouterCharm, '_get_config_parameters',
+            return_value={})
+        self.patch_object(mysql_router.configparser, "ConfigParser",
+                          return_value=fake_config)
+        _calls = mock.MagicMock()
+        mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.router_instances = 1
+        mrc.update_systemd_unit = _calls.update_systemd_unit
+        mrc.update_config_parameters = _calls.update_config_parameters
+
+        # The new pid_file needs the RuntimeDirectory of the new unit
+        mrc.upgrade_charm()
+        self.assertEqual(_calls.mock_calls, [
+            mock.call.update_systemd_unit(),
+            mock.call.update_config_parameters({}, config=fake_config)])
+
     def test_upgrade_charm_lp1971565(self):
         # test fix for Bug LP#1971565
         current_config = {
@@ -1028,11 +2890,14 @@ class TestMySQLRouterCharm(test_utils.PatchHelper):
         self.patch_object(
             mysql_router.MySQLRouterCharm, '_get_config_parameters',
             return_value=fake_params)
+        self.patch_object(mysql_router.MySQLRouterCharm,
+                          'update_systemd_unit')
         mock_update_config_params = mock.MagicMock()
         self.patch_object(mysql_router.configparser, "ConfigParser",
                           return_value=fake_config)
 
         mrc = mysql_router.MySQLRouterCharm()
+        mrc.options.router_instances = 1
         mrc.update_config_parameters = mock_update_config_params
         mrc.upgrade_charm()
         self.assertIn('metadata_cache:foo', fake_config)
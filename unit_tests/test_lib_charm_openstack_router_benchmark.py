@@ -0,0 +1,144 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+import charms_openstack.test_utils as test_utils
+
+import charm.openstack.router_benchmark as router_benchmark
+
+
+class FakeCursor(object):
+
+    def __init__(self, server):
+        self.server = server
+
+    def execute(self, query):
+        if self.server.fail_queries:
+            raise RuntimeError("query failed")
+        with self.server.lock:
+            self.server.queries.append(query)
+
+    def fetchall(self):
+        return ((1,),)
+
+    def close(self):
+        pass
+
+
+class FakeConnection(object):
+
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self):
+        return FakeCursor(self.server)
+
+    def close(self):
+        with self.server.lock:
+            self.server.open -= 1
+
+
+class FakeServer(object):
+    """In-process stand-in for a MySQL endpoint."""
+
+    def __init__(self, refuse=False, fail_queries=False):
+        self.refuse = refuse
+        self.fail_queries = fail_queries
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.open = 0
+        self.queries = []
+
+    def connect(self):
+        if self.refuse:
+            raise OSError("Connection refused")
+        with self.lock:
+            self.connections += 1
+            self.open += 1
+        return FakeConnection(self)
+
+
+class TestRouterBenchmark(test_utils.PatchHelper):
+
+    def test_percentile(self):
+        self.assertIsNone(router_benchmark.percentile([], 50))
+        _values = list(range(1, 101))
+        self.assertEqual(router_benchmark.percentile(_values, 50), 50)
+        self.assertEqual(router_benchmark.percentile(_values, 95), 95)
+        self.assertEqual(router_benchmark.percentile(_values, 100), 100)
+        self.assertEqual(router_benchmark.percentile([3], 0), 3)
+
+    def test_summarise(self):
+        self.assertEqual(
+            router_benchmark.summarise([0.001, 0.003, 0.002], errors=1),
+            {"count": 3, "errors": 1, "p50_ms": 2.0, "p95_ms": 3.0,
+             "p99_ms": 3.0, "max_ms": 3.0})
+        self.assertEqual(
+            router_benchmark.summarise([]),
+            {"count": 0, "errors": 0, "p50_ms": None, "p95_ms": None,
+             "p99_ms": None, "max_ms": None})
+
+    def test_benchmark(self):
+        _server = FakeServer()
+        _result = router_benchmark.benchmark(
+            _server.connect, iterations=20, concurrency=4, time_limit=60)
+        self.assertEqual(_result["connect"]["count"], 20)
+        self.assertEqual(_result["query"]["count"], 20)
+        self.assertEqual(_result["throughput"]["concurrency"], 4)
+        self.assertEqual(_result["throughput"]["errors"], 0)
+        self.assertGreater(_result["throughput"]["connections_per_second"], 0)
+        self.assertFalse(_result["timed_out"])
+        self.assertNotIn("last_error", _result)
+        # connect + query connection + throughput connections
+        self.assertEqual(_server.connections, 20 + 1 + 20)
+        self.assertEqual(len(_server.queries), 20 + 20)
+        # Every connection has been closed
+        self.assertEqual(_server.open, 0)
+
+    def test_benchmark_errors(self):
+        _result = router_benchmark.benchmark(
+            FakeServer(refuse=True).connect, iterations=5, concurrency=2)
+        self.assertEqual(_result["connect"],
+                         router_benchmark.summarise([], 5))
+        self.assertEqual(_result["query"]["errors"], 1)
+        self.assertEqual(_result["throughput"]["errors"], 5)
+        self.assertEqual(_result["last_error"], "Connection refused")
+
+        _server = FakeServer(fail_queries=True)
+        _result = router_benchmark.benchmark(
+            _server.connect, iterations=5, concurrency=2)
+        self.assertEqual(_result["connect"]["count"], 5)
+        self.assertEqual(_result["query"]["errors"], 5)
+        self.assertEqual(_result["throughput"]["errors"], 5)
+        self.assertEqual(_result["last_error"], "query failed")
+        self.assertEqual(_server.open, 0)
+
+    def test_benchmark_time_limit(self):
+        _server = FakeServer()
+        _result = router_benchmark.benchmark(
+            _server.connect, iterations=50, concurrency=2, time_limit=-1)
+        self.assertEqual(_result["connect"]["count"], 0)
+        self.assertEqual(_result["throughput"]["connections_per_second"], 0)
+        self.assertTrue(_result["timed_out"])
+        # Only the connection for the query measurement has been opened
+        self.assertEqual(_server.connections, 1)
+
+    def test_benchmark_bounds(self):
+        for kwargs in ({"iterations": 0},
+                       {"iterations": router_benchmark.MAX_ITERATIONS + 1},
+                       {"concurrency": 0},
+                       {"concurrency": router_benchmark.MAX_CONCURRENCY + 1}):
+            with self.assertRaises(ValueError):
+                router_benchmark.benchmark(FakeServer().connect, **kwargs)
@@ -0,0 +1,237 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import http.server
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import charms_openstack.test_utils as test_utils
+
+import charm.openstack.router_exporter as router_exporter
+
+
+_RESOURCES = {
+    "/router/status": {
+        "processId": 1234, "productEdition": "MySQL Community - GPL",
+        "timeStarted": "2026-01-01T00:00:00.000000Z",
+        "version": "8.0.36", "hostname": "juju-1"},
+    "/routes": {"items": [{"name": "bootstrap_rw"},
+                          {"name": "bootstrap_ro"}]},
+    "/routes/bootstrap_rw/health": {"isAlive": True},
+    "/routes/bootstrap_rw/status": {
+        "activeConnections": 3, "totalConnections": 120, "blockedHosts": 0},
+    "/routes/bootstrap_ro/health": {"isAlive": False},
+    "/routes/bootstrap_ro/status": {
+        "activeConnections": 0, "totalConnections": 7, "blockedHosts": 1},
+    "/metadata": {"items": [{"name": "jujuCluster"}]},
+    "/metadata/jujuCluster/status": {
+        "refreshFailed": 2, "refreshSucceeded": 40,
+        "timeLastRefreshSucceeded": "2026-01-01T00:01:00.500000Z",
+        "lastRefreshHostname": "10.0.0.10", "lastRefreshPort": 3306},
+}
+
+
+class FakeRestHandler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        expected = "Basic {}".format(base64.b64encode(
+            b"exporter:secret").decode("ascii"))
+        path = self.path[len(router_exporter.REST_API_PATH):]
+        if self.headers.get("Authorization") != expected:
+            status, body = 401, b""
+        elif (not self.path.startswith(router_exporter.REST_API_PATH) or
+                path not in server.resources):
+            status, body = 404, b""
+        else:
+            status = 200
+            body = json.dumps(server.resources[path]).encode("UTF-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeRestServer(object):
+    """Router REST API served from a thread on an ephemeral port."""
+
+    def __init__(self, resources=None):
+        self.server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0), FakeRestHandler)
+        self.server.daemon_threads = True
+        self.server.resources = resources or _RESOURCES
+        self.server.requests = []
+        self.port = self.server.server_address[1]
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class TestRouterExporter(test_utils.PatchHelper):
+
+    def test_parse_timestamp(self):
+        self.assertEqual(
+            router_exporter.parse_timestamp("1970-01-01T00:01:00.500000Z"),
+            60.5)
+        self.assertEqual(
+            router_exporter.parse_timestamp("1970-01-01T00:01:00Z"), 60)
+        for value in (None, "", "yesterday"):
+            self.assertIsNone(router_exporter.parse_timestamp(value))
+
+    def test_parse_target(self):
+        self.assertEqual(router_exporter.parse_target("r=127.0.0.1:8443"),
+                         ("r", "127.0.0.1", 8443))
+        for spec in ("r=/var/lib/mysql/r/mysql.sock", "r=127.0.0.1", "r"):
+            with self.assertRaises(ValueError):
+                router_exporter.parse_target(spec)
+
+    def test_scrape(self):
+        with FakeRestServer() as rest:
+            _samples = router_exporter.scrape(
+                [("r", "127.0.0.1", rest.port)], "exporter", "secret", 5)
+        _samples = {
+            (metric, tuple(sorted(labels.items()))): value
+            for metric, labels, value in _samples}
+        self.assertEqual(_samples.pop(
+            ("mysqlrouter_up", (("router", "r"),))), 1)
+        self.assertGreaterEqual(_samples.pop(
+            ("mysqlrouter_scrape_duration_seconds", (("router", "r"),))), 0)
+        _rw = (("route", "bootstrap_rw"), ("router", "r"))
+        _ro = (("route", "bootstrap_ro"), ("router", "r"))
+        _cache = (("metadata", "jujuCluster"), ("router", "r"))
+        self.assertEqual(_samples, {
+            ("mysqlrouter_info", (("router", "r"), ("version", "8.0.36"))): 1,
+            ("mysqlrouter_start_time_seconds", (("router", "r"),)):
+                1767225600.0,
+            ("mysqlrouter_route_up", _rw): 1,
+            ("mysqlrouter_route_active_connections", _rw): 3,
+            ("mysqlrouter_route_connections_total", _rw): 120,
+            ("mysqlrouter_route_blocked_hosts", _rw): 0,
+            ("mysqlrouter_route_up", _ro): 0,
+            ("mysqlrouter_route_active_connections", _ro): 0,
+            ("mysqlrouter_route_connections_total", _ro): 7,
+            ("mysqlrouter_route_blocked_hosts", _ro): 1,
+            ("mysqlrouter_metadata_refresh_succeeded_total", _cache): 40,
+            ("mysqlrouter_metadata_refresh_failed_total", _cache): 2,
+            ("mysqlrouter_metadata_last_refresh_succeeded_"
+             "timestamp_seconds", _cache): 1767225660.5,
+        })
+
+    def test_scrape_errors(self):
+        # Wrong credentials
+        with FakeRestServer() as rest:
+            _samples = router_exporter.scrape(
+                [("r", "127.0.0.1", rest.port)], "exporter", "wrong", 5)
+        self.assertEqual([(m, v) for m, _, v in _samples
+                          if m != "mysqlrouter_scrape_duration_seconds"],
+                         [("mysqlrouter_up", 0)])
+
+        # Missing resource and unreachable second instance
+        _resources = dict(_RESOURCES)
+        _resources.pop("/routes/bootstrap_ro/status")
+        with FakeRestServer(_resources) as rest:
+            _port = rest.port
+            _samples = router_exporter.scrape(
+                [("r", "127.0.0.1", _port)], "exporter", "secret", 5)
+        self.assertIn(("mysqlrouter_up", {"router": "r"}, 0), _samples)
+        _samples = router_exporter.scrape(
+            [("r-1", "127.0.0.1", _port)], "exporter", "secret", 1)
+        self.assertIn(("mysqlrouter_up", {"router": "r-1"}, 0), _samples)
+
+    def test_format_metrics(self):
+        self.assertEqual(router_exporter.format_metrics([
+            ("mysqlrouter_route_active_connections",
+             {"router": "r", "route": 'a"b'}, 3),
+            ("mysqlrouter_up", {"router": "r"}, 1),
+            ("mysqlrouter_route_active_connections",
+             {"router": "r", "route": "c"}, 0),
+        ]), "\n".join([
+            "# HELP mysqlrouter_up Whether the router REST API could be "
+            "scraped.",
+            "# TYPE mysqlrouter_up gauge",
+            'mysqlrouter_up{router="r"} 1',
+            "# HELP mysqlrouter_route_active_connections Client connections "
+            "currently open on the route.",
+            "# TYPE mysqlrouter_route_active_connections gauge",
+            'mysqlrouter_route_active_connections{route="a\\"b",router="r"} '
+            '3',
+            'mysqlrouter_route_active_connections{route="c",router="r"} 0',
+        ]) + "\n")
+
+    def test_make_server(self):
+        with FakeRestServer() as rest:
+            _server = router_exporter.make_server(
+                "127.0.0.1", 0, [("r", "127.0.0.1", rest.port)],
+                "exporter", "secret")
+            _thread = threading.Thread(target=_server.serve_forever)
+            _thread.start()
+            try:
+                _url = "http://127.0.0.1:{}".format(
+                    _server.server_address[1])
+                with urllib.request.urlopen(_url + "/metrics") as response:
+                    self.assertEqual(response.status, 200)
+                    _body = response.read().decode("UTF-8")
+                with self.assertRaises(urllib.error.HTTPError):
+                    urllib.request.urlopen(_url + "/")
+            finally:
+                _server.shutdown()
+                _server.server_close()
+                _thread.join()
+        self.assertIn('mysqlrouter_up{router="r"} 1\n', _body)
+        self.assertIn('mysqlrouter_route_connections_total{'
+                      'route="bootstrap_rw",router="r"} 120\n', _body)
+        # Every resource is requested once per scrape
+        self.assertEqual(len(rest.server.requests), 8)
+
+    def test_make_server_ipv6(self):
+        try:
+            _server = router_exporter.make_server(
+                "::1", 0, [("r", "127.0.0.1", 8443)], "exporter", "secret")
+        except OSError:
+            self.skipTest("IPv6 is not available")
+        _server.server_close()
+        self.assertIsInstance(_server, router_exporter.MetricsServer6)
+
+    def test_main(self):
+        self.patch_object(router_exporter, "make_server")
+        with mock.patch("builtins.open",
+                        mock.mock_open(read_data="secret\n")) as _open:
+            router_exporter.main([
+                "--port", "9152", "--user", "exporter",
+                "--password-file", "/var/lib/mysql/r-exporter.passwd",
+                "r=127.0.0.1:8443"])
+        _open.assert_called_once_with("/var/lib/mysql/r-exporter.passwd")
+        # Only localhost unless an address is given
+        self.make_server.assert_called_once_with(
+            "127.0.0.1", 9152, [("r", "127.0.0.1", 8443)], "exporter",
+            "secret", 5.0)
+        self.make_server.return_value.serve_forever.assert_called_once_with()
@@ -0,0 +1,75 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+
+import charms_openstack.test_utils as test_utils
+
+import charm.openstack.router_monitor as router_monitor
+
+
+class TestRouterMonitor(test_utils.PatchHelper):
+
+    def test_parse_endpoint(self):
+        self.assertEqual(
+            router_monitor.parse_endpoint("rw=127.0.0.1:3306"),
+            ("rw", "127.0.0.1", 3306))
+        self.assertEqual(
+            router_monitor.parse_endpoint("rw_sock=/var/lib/mysql/a/m.sock"),
+            ("rw_sock", "/var/lib/mysql/a/m.sock", None))
+        for spec in ("rw", "=127.0.0.1:3306", "rw=127.0.0.1", "rw="):
+            with self.assertRaises(ValueError):
+                router_monitor.parse_endpoint(spec)
+
+    def test_summarise(self):
+        history = [
+            {"ok": True, "latency_ms": 1.0},
+            {"ok": True, "latency_ms": 3.0},
+            {"ok": False, "latency_ms": 5000.0, "error": "timed out"},
+            {"ok": False, "latency_ms": 2.0, "error": "refused"},
+        ]
+        self.assertEqual(
+            router_monitor.summarise(history),
+            {"ok": False, "latency_ms": 2.0, "error": "refused",
+             "consecutive_failures": 2, "probes": 4, "success_ratio": 0.5,
+             "latency_ms_max": 3.0, "latency_ms_median": 3.0})
+
+    def test_run_once(self):
+        self.patch_object(router_monitor.router_probe, "read_handshake")
+        self.read_handshake.side_effect = [
+            {"server_version": "8.0.36-router"},
+            ConnectionRefusedError("refused"),
+        ]
+        histories = {}
+        status = router_monitor.run_once(
+            [("rw", "127.0.0.1", 3306), ("ro", "127.0.0.1", 3307)],
+            histories, 10, 5)
+        self.assertEqual(status["interval"], 10)
+        self.assertTrue(status["endpoints"]["rw"]["ok"])
+        self.assertEqual(status["endpoints"]["rw"]["server_version"],
+                         "8.0.36-router")
+        self.assertFalse(status["endpoints"]["ro"]["ok"])
+        self.assertEqual(status["endpoints"]["ro"]["error"], "refused")
+        self.assertEqual(status["endpoints"]["ro"]["consecutive_failures"], 1)
+        self.assertEqual(len(histories["rw"]), 1)
+
+    def test_write_status(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "monitor.json")
+            router_monitor.write_status(path, {"timestamp": 1})
+            with open(path) as f:
+                self.assertEqual(json.load(f), {"timestamp": 1})
+            self.assertFalse(os.path.exists("{}.tmp".format(path)))
@@ -0,0 +1,103 @@
+# Copyright 2026 Canonical Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+import charms_openstack.test_utils as test_utils
+
+import charm.openstack.router_probe as router_probe
+
+
+def _handshake(version=b"8.0.36-router", connection_id=42):
+    payload = (bytes([router_probe.PROTOCOL_VERSION]) + version + b"\0" +
+               connection_id.to_bytes(4, "little") + b"salt\0rest")
+    return len(payload).to_bytes(3, "little") + b"\0" + payload
+
+
+def _error(code, message, sqlstate=b"HY000"):
+    payload = (bytes([router_probe.ERR_PACKET]) +
+               code.to_bytes(2, "little") + b"#" + sqlstate + message)
+    return len(payload).to_bytes(3, "little") + b"\0" + payload
+
+
+class TestRouterProbe(test_utils.PatchHelper):
+
+    def setUp(self):
+        super().setUp()
+        self.patch_object(router_probe, "socket")
+        self.sock = self.socket.socket.return_value
+
+    def _serve(self, data, chunk=5):
+        buf = bytearray(data)
+
+        def _recv(length):
+            out = bytes(buf[:min(length, chunk)])
+            del buf[:len(out)]
+            return out
+
+        self.sock.recv.side_effect = _recv
+
+    def test_parse_handshake(self):
+        self.assertEqual(
+            router_probe.parse_handshake(_handshake()[4:]),
+            {"protocol_version": 10,
+             "server_version": "8.0.36-router",
+             "connection_id": 42})
+
+    def test_parse_handshake_error_packet(self):
+        with self.assertRaises(router_probe.HandshakeError) as cm:
+            router_probe.parse_handshake(
+                _error(2003, b"Can't connect to remote MySQL server")[4:])
+        self.assertEqual(cm.exception.code, 2003)
+        self.assertEqual(str(cm.exception),
+                         "Can't connect to remote MySQL server")
+
+    def test_parse_handshake_invalid(self):
+        for payload in (b"", b"\x09abc\0", b"\x0a8.0.36", b"\x0a8.0\0\x01"):
+            with self.assertRaises(router_probe.HandshakeError):
+                router_probe.parse_handshake(payload)
+
+    def test_open_connection(self):
+        self.assertEqual(
+            router_probe.open_connection("127.0.0.1", "3306", timeout=2),
+            self.sock)
+        self.socket.socket.assert_called_once_with(
+            self.socket.AF_INET, self.socket.SOCK_STREAM)
+        self.sock.settimeout.assert_called_once_with(2)
+        self.sock.connect.assert_called_once_with(("127.0.0.1", 3306))
+
+        self.socket.socket.reset_mock()
+        self.sock.connect.side_effect = OSError
+        with self.assertRaises(OSError):
+            router_probe.open_connection("/var/lib/mysql/a/mysql.sock")
+        self.socket.socket.assert_called_once_with(
+            self.socket.AF_UNIX, self.socket.SOCK_STREAM)
+        self.sock.close.assert_called_once_with()
+
+    def test_read_handshake(self):
+        self._serve(_handshake(connection_id=7))
+        self.assertEqual(
+            router_probe.read_handshake("127.0.0.1", 3306),
+            {"protocol_version": 10,
+             "server_version": "8.0.36-router",
+             "connection_id": 7})
+        self.sock.close.assert_called_once_with()
+
+    def test_read_handshake_closed(self):
+        self.sock.recv.side_effect = [b"\x10\0", b""]
+        with self.assertRaises(router_probe.HandshakeError):
+            router_probe.read_handshake("127.0.0.1", 3306)
+        self.sock.close.assert_called_once_with()
+        self.assertEqual(self.sock.recv.mock_calls,
+                         [mock.call(4), mock.call(2)])